@@ -0,0 +1,52 @@
+import sys
+import time
+import tracemalloc
+
+from stimpl.arena import build_arena, evaluate_arena
+from stimpl.expression import *
+from stimpl.runtime import evaluate, EmptyState
+
+"""
+Memory used by large generated ASTs, as slotted node objects and as an
+Arena, plus the time to evaluate each form. Run from the repository root:
+
+    python -m benchmarks.bench_ast_memory
+"""
+
+
+def generate(statements):
+    names = [f"v{index}" for index in range(100)]
+    return Program(
+        *[Assign(Variable(names[index % 100]), IntLiteral(index)) for index in range(100)],
+        *[Assign(Variable(names[index % 100]),
+                 Add(Variable(names[(index + 1) % 100]),
+                     Multiply(IntLiteral(index), IntLiteral(2))))
+          for index in range(statements)])
+
+
+def traced(build):
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(run):
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    program, tree_size = traced(lambda: generate(statements))
+    arena, arena_size = traced(lambda: build_arena(program))
+
+    print(f"{len(arena)} nodes")
+    print(f"  slotted tree {tree_size / 2**20:8.1f} MiB  "
+          f"{tree_size / len(arena):6.1f} B/node  "
+          f"evaluate {timed(lambda: evaluate(program, EmptyState())):6.3f}s")
+    print(f"  arena        {arena_size / 2**20:8.1f} MiB  "
+          f"{arena_size / len(arena):6.1f} B/node  "
+          f"evaluate {timed(lambda: evaluate_arena(arena)):6.3f}s")
@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+
+from stimpl.batch import run_many
+from stimpl.expression import *
+from stimpl.output import NullSink
+from stimpl.runtime import run_stimpl
+
+"""
+Throughput of many small independent programs: one after the other with
+run_stimpl, and with run_many dispatching one program per message and in
+chunks. Run from the repository root:
+
+    python -m benchmarks.bench_batch [programs] [workers]
+"""
+
+
+def generate(count):
+    return [Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("total"), IntLiteral(index)),
+        While(Lt(Variable("i"), IntLiteral(index % 50)),
+              Sequence(
+                  Assign(Variable("total"), Add(Variable("total"), Variable("i"))),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))),
+        Variable("total"))
+        for index in range(count)]
+
+
+def timed(run):
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    programs = generate(count)
+    print(f"{count} programs, {workers} workers")
+    print(f"  run_stimpl, serially    {timed(lambda: [run_stimpl(program, output=NullSink()) for program in programs]):8.3f}s")
+    print(f"  run_many, 1 per message {timed(lambda: list(run_many(programs, workers, chunk_size=1))):8.3f}s")
+    print(f"  run_many, chunked       {timed(lambda: list(run_many(programs, workers))):8.3f}s")
@@ -0,0 +1,55 @@
+import sys
+import tempfile
+import time
+
+from stimpl.arena import build_arena
+from stimpl.bytecode import compile_bytecode
+from stimpl.cache import ProgramCache
+from stimpl.expression import *
+
+"""
+Time to get a generated program at process start: rebuilding it from
+Python, loading it from a ProgramCache, and getting its bytecode by
+compiling it or by loading the cached CodeObject, and likewise for its
+Arena. Reports the best of
+several runs. Run from the repository root:
+
+    python -m benchmarks.bench_cache
+"""
+
+
+def generate(statements):
+    names = [f"v{index}" for index in range(100)]
+    return Program(
+        *[Assign(Variable(names[index % 100]), IntLiteral(index)) for index in range(100)],
+        *[Assign(Variable(names[index % 100]),
+                 Add(Variable(names[(index + 1) % 100]),
+                     Multiply(IntLiteral(index), IntLiteral(2))))
+          for index in range(statements)])
+
+
+def best(run, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ProgramCache(directory)
+        program = generate(statements)
+        key = cache.store(program)
+        cache.load_bytecode(key)
+        cache.load_arena(key)
+
+        print(f"{statements} statements")
+        print(f"  rebuild program      {best(lambda: generate(statements)):8.3f}s")
+        print(f"  load program         {best(lambda: cache.load(key)):8.3f}s")
+        print(f"  compile bytecode     {best(lambda: compile_bytecode(generate(statements))):8.3f}s")
+        print(f"  load bytecode        {best(lambda: cache.load_bytecode(key)):8.3f}s")
+        print(f"  build arena          {best(lambda: build_arena(generate(statements))):8.3f}s")
+        print(f"  load arena           {best(lambda: cache.load_arena(key)):8.3f}s")
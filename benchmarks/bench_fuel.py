@@ -0,0 +1,73 @@
+import sys
+import time
+
+from stimpl.expression import *
+from stimpl.fuel import FuelMeter, metering
+from stimpl.runtime import evaluate, EmptyState
+
+"""
+The cost of fuel metering on loop-heavy programs: evaluate without a
+meter, with a meter that has fuel to spare, and with one that also
+checkpoints every 1000 iterations. Run from the repository root:
+
+    python -m benchmarks.bench_fuel [iterations]
+"""
+
+
+def counting_loop(limit):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(limit)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))),
+        Variable("i"))
+
+
+def nested_loops(limit):
+    inner = 10
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("total"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(limit // inner)),
+              Sequence(
+                  Assign(Variable("j"), IntLiteral(0)),
+                  While(Lt(Variable("j"), IntLiteral(inner)),
+                        Sequence(
+                            Assign(Variable("total"), Add(Variable("total"), Variable("j"))),
+                            Assign(Variable("j"), Add(Variable("j"), IntLiteral(1))))),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))),
+        Variable("total"))
+
+
+def metered(program, meter_factory):
+    def run():
+        with metering(meter_factory()):
+            evaluate(program, EmptyState())
+    return run
+
+
+def best_times(runs, rounds=100):
+    # Rounds alternate between the variants so that they see the same
+    # machine load.
+    best = [float("inf")] * len(runs)
+    for _ in range(rounds):
+        for index, run in enumerate(runs):
+            start = time.perf_counter()
+            run()
+            best[index] = min(best[index], time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    for name, program in (("counting loop", counting_loop(iterations)),
+                          ("nested loops", nested_loops(iterations))):
+        # The first run quickens the program's operators.
+        evaluate(program, EmptyState())
+        baseline, fuel, checkpointed = best_times([
+            lambda: evaluate(program, EmptyState()),
+            metered(program, lambda: FuelMeter(10 * iterations)),
+            metered(program, lambda: FuelMeter(10 * iterations, lambda steps, state: None, 1000))])
+        print(f"{name}, {iterations} iterations")
+        print(f"  no meter        {baseline:7.3f}s")
+        print(f"  fuel            {fuel:7.3f}s  ({(fuel / baseline - 1) * 100:+.1f}%)")
+        print(f"  fuel+checkpoint {checkpointed:7.3f}s  ({(checkpointed / baseline - 1) * 100:+.1f}%)")
@@ -0,0 +1,72 @@
+import time
+
+from stimpl.expression import *
+from stimpl.fuse import fuse
+from stimpl.runtime import evaluate, EmptyState
+
+"""
+Compare loop-heavy programs before and after fusing common idioms, on the
+tree evaluator. Reports the best of several runs of CPU time. Run from the
+repository root:
+
+    python -m benchmarks.bench_fuse
+"""
+
+
+def counting_loop(iterations):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))))
+
+
+def accumulating_loop(iterations):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("total"), IntLiteral(0)),
+        Assign(Variable("odd"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Sequence(
+                  Assign(Variable("total"), Add(Variable("total"), Variable("i"))),
+                  Assign(Variable("half"), Divide(Variable("i"), IntLiteral(2))),
+                  If(Gte(Variable("half"), IntLiteral(10)),
+                     Assign(Variable("odd"), Add(Variable("odd"), IntLiteral(1))),
+                     Ren()),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))))
+
+
+def nested_loops(outer, inner):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("total"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(outer)),
+              Sequence(
+                  Assign(Variable("j"), IntLiteral(0)),
+                  While(Lt(Variable("j"), IntLiteral(inner)),
+                        Sequence(
+                            Assign(Variable("total"), Add(Variable("total"), Variable("j"))),
+                            Assign(Variable("j"), Add(Variable("j"), IntLiteral(1))))),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))))
+
+
+def measure(program):
+    best = None
+    for _ in range(5):
+        start = time.process_time()
+        evaluate(program, EmptyState())
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == '__main__':
+    workloads = [
+        ("counting loop (30k)", counting_loop(30_000)),
+        ("accumulating loop (10k)", accumulating_loop(10_000)),
+        ("nested loops (100 x 100)", nested_loops(100, 100)),
+    ]
+    for name, program in workloads:
+        fused, count = fuse(program)
+        print(f"{name}: {count} nodes fused")
+        print(f"  plain  {measure(program):8.3f}s")
+        print(f"  fused  {measure(fused):8.3f}s")
@@ -0,0 +1,54 @@
+import sys
+import time
+import tracemalloc
+
+from stimpl.expression import *
+from stimpl.hashcons import hash_cons
+from stimpl.runtime import evaluate, EmptyState
+
+"""
+Memory used by generated programs with repeated subtrees, as a tree and
+after hash-consing, plus the time to hash-cons and to evaluate each form.
+Run from the repository root:
+
+    python -m benchmarks.bench_hashcons
+"""
+
+
+def generate(statements, distinct):
+    names = [f"v{index}" for index in range(10)]
+    return Program(
+        *[Assign(Variable(name), IntLiteral(0)) for name in names],
+        *[Assign(Variable(names[index % 10]),
+                 Add(Variable(names[(index + 1) % 10]),
+                     Multiply(IntLiteral(index % distinct), Subtract(IntLiteral(3), IntLiteral(2)))))
+          for index in range(statements)])
+
+
+def traced(build):
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    for distinct in (10, 1000, statements):
+        tree, tree_size = traced(lambda: generate(statements, distinct))
+        (dag, nodes), elapsed = timed(lambda: hash_cons(tree))
+        del tree, dag
+        (dag, nodes), dag_size = traced(lambda: hash_cons(generate(statements, distinct)))
+
+        print(f"{statements} statements, {distinct} distinct literals: {nodes} distinct nodes")
+        print(f"  tree        {tree_size / 2**20:8.1f} MiB")
+        print(f"  hash-consed {dag_size / 2**20:8.1f} MiB  "
+              f"hash-cons {elapsed:6.3f}s  "
+              f"evaluate {timed(lambda: evaluate(dag, EmptyState()))[1]:6.3f}s")
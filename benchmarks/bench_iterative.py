@@ -0,0 +1,69 @@
+import sys
+import time
+
+from stimpl.expression import *
+from stimpl.machine import evaluate_iterative
+from stimpl.runtime import evaluate, EmptyState
+
+"""
+Compare the recursive evaluator with the explicit-stack one.
+
+Deep trees are nested Adds and Sequences; the recursive evaluator needs a
+raised recursion limit to handle them at all and fails beyond a few
+thousand levels. Wide trees are long Programs and loop-heavy code. Run from
+the repository root:
+
+    python -m benchmarks.bench_iterative
+"""
+
+
+def deep_add(depth):
+    program = IntLiteral(0)
+    for _ in range(depth):
+        program = Add(program, IntLiteral(1))
+    return program
+
+
+def deep_sequence(depth):
+    program = Assign(Variable("x"), IntLiteral(1))
+    for _ in range(depth):
+        program = Sequence(program)
+    return program
+
+
+def wide_program(width):
+    return Program(*[Assign(Variable(f"v{index % 100}"), Add(IntLiteral(index), IntLiteral(1)))
+                     for index in range(width)])
+
+
+def counting_loop(iterations):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))))
+
+
+def measure(evaluator, program):
+    start = time.perf_counter()
+    try:
+        evaluator(program, EmptyState())
+    except RecursionError:
+        return None
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    sys.setrecursionlimit(20_000)
+    workloads = [
+        ("deep Add (2k)", deep_add(2_000)),
+        ("deep Add (200k)", deep_add(200_000)),
+        ("deep Sequence (200k)", deep_sequence(200_000)),
+        ("wide Program (200k)", wide_program(200_000)),
+        ("counting loop (50k)", counting_loop(50_000)),
+    ]
+    for name, program in workloads:
+        print(name)
+        for evaluator_name, evaluator in (("recursive", evaluate), ("iterative", evaluate_iterative)):
+            elapsed = measure(evaluator, program)
+            result = "RecursionError" if elapsed is None else f"{elapsed:8.3f}s"
+            print(f"  {evaluator_name:<10} {result}")
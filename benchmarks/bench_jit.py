@@ -0,0 +1,43 @@
+import time
+
+from stimpl.expression import *
+from stimpl.jit import JIT
+from stimpl.runtime import run_stimpl
+
+"""
+Compare the tree evaluator with tiered execution of hot While loops. Run
+from the repository root:
+
+    python -m benchmarks.bench_jit
+"""
+
+
+def nested_loops(outer, inner):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("total"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(outer)),
+              Sequence(
+                  Assign(Variable("j"), IntLiteral(0)),
+                  While(Lt(Variable("j"), IntLiteral(inner)),
+                        Sequence(
+                            Assign(Variable("total"), Add(Variable("total"), Variable("j"))),
+                            Assign(Variable("j"), Add(Variable("j"), IntLiteral(1))))),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))),
+        Variable("total"))
+
+
+def measure(program, engine, jit=None):
+    start = time.perf_counter()
+    run_stimpl(program, engine=engine, jit=jit)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    for name, program in (("nested loops 200 x 200", nested_loops(200, 200)),
+                          ("nested loops 20 x 2000", nested_loops(20, 2000))):
+        print(name)
+        print(f"  tree  {measure(program, 'tree'):8.3f}s")
+        jit = JIT()
+        print(f"  jit   {measure(program, 'jit', jit):8.3f}s")
+        print(jit.report())
@@ -0,0 +1,43 @@
+import sys
+import time
+
+from stimpl.expression import *
+from stimpl.lanes import run_lanes
+from stimpl.runtime import evaluate, EmptyState
+from stimpl.types import *
+
+"""
+One program over many inputs: evaluate once per input, and run_lanes
+over all of them at once. The program counts the steps of the Collatz
+sequence from n, so lanes leave its loop at different iterations. Run
+from the repository root:
+
+    python -m benchmarks.bench_lanes [lanes]
+"""
+
+PROGRAM = Program(
+    Assign(Variable("steps"), IntLiteral(0)),
+    While(Gt(Variable("n"), IntLiteral(1)),
+          Sequence(
+              If(Eq(Multiply(Divide(Variable("n"), IntLiteral(2)), IntLiteral(2)), Variable("n")),
+                 Assign(Variable("n"), Divide(Variable("n"), IntLiteral(2))),
+                 Assign(Variable("n"), Add(Multiply(Variable("n"), IntLiteral(3)), IntLiteral(1)))),
+              Assign(Variable("steps"), Add(Variable("steps"), IntLiteral(1))))),
+    Variable("steps"))
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    scalar_time, expected = timed(lambda: [
+        evaluate(PROGRAM, EmptyState().set_value("n", n, INTEGER))[0] for n in range(1, count + 1)])
+    lanes_time, results = timed(lambda: run_lanes(PROGRAM, [{"n": n} for n in range(1, count + 1)]))
+    assert expected == [result.value for result in results]
+    print(f"{count} lanes, up to {max(expected)} iterations")
+    print(f"  evaluate, per input {scalar_time:8.3f}s")
+    print(f"  run_lanes           {lanes_time:8.3f}s  ({scalar_time / lanes_time:.1f}x)")
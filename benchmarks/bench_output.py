@@ -0,0 +1,39 @@
+import contextlib
+import os
+import time
+
+from stimpl.expression import *
+from stimpl.output import BufferedSink, NullSink, StdoutSink
+from stimpl.runtime import run_stimpl
+
+"""
+Compare output sinks on a print-heavy loop.
+
+stdout is redirected to os.devnull so that the terminal does not dominate
+the measurement. Run from the repository root:
+
+    python -m benchmarks.bench_output
+"""
+
+
+def printing_loop(iterations):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Print(Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))))
+
+
+def measure(program, engine, sink):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        run_stimpl(program, engine=engine, output=sink)
+        return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    program = printing_loop(200_000)
+    print("printing loop (200k)")
+    for engine in ("tree", "vm"):
+        for name, sink in (("print()", StdoutSink()), ("buffered", BufferedSink()),
+                           ("null", NullSink())):
+            print(f"  {engine:<5} {name:<9} {measure(program, engine, sink):8.3f}s")
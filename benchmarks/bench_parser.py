@@ -0,0 +1,62 @@
+import sys
+import time
+
+import stimpl.expression
+from stimpl.expression import *
+from stimpl.parser import parse, unparse
+
+"""
+Time to load generated program text with parse and with eval(), and how
+deeply each can nest. Reports the best of several runs. Run from the
+repository root:
+
+    python -m benchmarks.bench_parser
+"""
+
+
+def generate(statements):
+    names = [f"v{index}" for index in range(100)]
+    return Program(
+        *[Assign(Variable(names[index % 100]), IntLiteral(index)) for index in range(100)],
+        *[Assign(Variable(names[index % 100]),
+                 Add(Variable(names[(index + 1) % 100]),
+                     Multiply(IntLiteral(index), FloatingPointLiteral(index / 7))))
+          for index in range(statements)],
+        Print(StringLiteral("done\n")))
+
+
+def best(run, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def deepest(load, limit=1 << 16):
+    loaded = 0
+    depth = 1
+    while depth <= limit:
+        try:
+            load("Not(" * depth + "BooleanLiteral(True)" + ")" * depth)
+        except (SyntaxError, RecursionError, MemoryError):
+            break
+        loaded = depth
+        depth *= 2
+    return loaded
+
+
+def eval_load(text):
+    return eval(text, vars(stimpl.expression))
+
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    text = unparse(generate(statements))
+    print(f"{statements} statements, {len(text) / 2**20:.1f} MiB of text")
+    print(f"  parse  {best(lambda: parse(text)):8.3f}s")
+    print(f"  eval   {best(lambda: eval_load(text)):8.3f}s")
+    print("deepest nesting loaded, in powers of two up to 65536")
+    print(f"  parse  {deepest(parse):8}")
+    print(f"  eval   {deepest(eval_load):8}")
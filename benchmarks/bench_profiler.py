@@ -0,0 +1,37 @@
+import time
+
+from stimpl.expression import *
+from stimpl.profiler import Profile
+from stimpl.runtime import run_stimpl
+
+"""
+Measure the cost of profiling on a loop-heavy program. Runs with profiling
+off should take the same time before and after a profiled run. Run from
+the repository root:
+
+    python -m benchmarks.bench_profiler
+"""
+
+
+def counting_loop(iterations):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))))
+
+
+def measure(program, profile=None):
+    start = time.perf_counter()
+    run_stimpl(program, profile=profile)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    program = counting_loop(50_000)
+    print("counting loop (50k)")
+    print(f"  off        {measure(program):8.3f}s")
+    profile = Profile()
+    print(f"  on         {measure(program, profile):8.3f}s")
+    print(f"  off again  {measure(program):8.3f}s")
+    print()
+    print(profile.report(limit=8))
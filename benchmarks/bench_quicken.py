@@ -0,0 +1,53 @@
+import time
+
+import stimpl.runtime
+from stimpl.expression import *
+from stimpl.runtime import evaluate, EmptyState
+
+"""
+Measure quickening in the tree evaluator. The generic runs empty the table
+of specialized operations, so no node is ever quickened. Reports the best
+of several runs of CPU time. Run from the repository root:
+
+    python -m benchmarks.bench_quicken
+"""
+
+
+def arithmetic_loop(iterations):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("total"), FloatingPointLiteral(0.0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Sequence(
+                  Assign(Variable("total"), Add(Variable("total"), FloatingPointLiteral(0.5))),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))))
+
+
+def comparison_loop(iterations):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Ne(Variable("i"), IntLiteral(iterations)),
+              Sequence(
+                  Assign(Variable("b"), Gte(Variable("i"), IntLiteral(5))),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))))
+
+
+def measure(program, quicken):
+    operations = stimpl.runtime._QUICKENED
+    if not quicken:
+        stimpl.runtime._QUICKENED = {}
+    try:
+        start = time.process_time()
+        evaluate(program, EmptyState())
+        return time.process_time() - start
+    finally:
+        stimpl.runtime._QUICKENED = operations
+
+
+if __name__ == '__main__':
+    for name, generator in (("arithmetic loop (30k)", arithmetic_loop),
+                            ("comparison loop (30k)", comparison_loop)):
+        print(name)
+        for label, quicken in (("generic", False), ("quickened", True)):
+            best = min(measure(generator(30_000), quicken) for _ in range(10))
+            print(f"  {label:<10} {best:8.3f}s")
@@ -0,0 +1,86 @@
+import asyncio
+import sys
+import time
+
+from stimpl.expression import *
+from stimpl.machine import evaluate_iterative
+from stimpl.output import NullSink
+from stimpl.runtime import EmptyState
+from stimpl.scheduler import Scheduler, run_stimpl_async
+
+"""
+A shared worker running a few long programs and many short ones. Run one
+after the other, every short program submitted after a long one waits for
+it; on a Scheduler they take their slices in turn. Reports total time and
+the latency of the short programs, then the cost of slicing a single
+program at several slice sizes. Run from the repository root:
+
+    python -m benchmarks.bench_scheduler [long iterations]
+"""
+
+
+def counting_program(limit):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(limit)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))),
+        Variable("i"))
+
+
+def workload(long_iterations):
+    # One long program in front of every 50 short ones.
+    return [counting_program(long_iterations if index % 51 == 0 else 20) for index in range(204)]
+
+
+def percentile(latencies, fraction):
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+
+def report(label, total, latencies):
+    print(f"  {label:12} total {total:7.3f}s   short p50 {percentile(latencies, 0.5) * 1000:8.1f}ms"
+          f"   p99 {percentile(latencies, 0.99) * 1000:8.1f}ms")
+
+
+def one_after_another(programs):
+    start = time.perf_counter()
+    latencies = []
+    for index, program in enumerate(programs):
+        evaluate_iterative(program, EmptyState())
+        if index % 51:
+            latencies.append(time.perf_counter() - start)
+    return time.perf_counter() - start, latencies
+
+
+async def scheduled(programs):
+    scheduler = Scheduler()
+    start = time.perf_counter()
+    latencies = []
+    tasks = []
+    for index, program in enumerate(programs):
+        task = scheduler.submit(program, output=NullSink())
+        if index % 51:
+            task.add_done_callback(lambda task: latencies.append(time.perf_counter() - start))
+        tasks.append(task)
+    await asyncio.wait(tasks)
+    return time.perf_counter() - start, latencies
+
+
+if __name__ == '__main__':
+    long_iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    programs = workload(long_iterations)
+    print(f"4 programs of {long_iterations} iterations, 200 of 20")
+    report("in turn", *one_after_another(programs))
+    report("Scheduler", *asyncio.run(scheduled(programs)))
+
+    program = counting_program(long_iterations)
+    start = time.perf_counter()
+    evaluate_iterative(program, EmptyState())
+    baseline = time.perf_counter() - start
+    print(f"one program of {long_iterations} iterations")
+    print(f"  Machine.run          {baseline:7.3f}s")
+    for slice_steps in (100, 1000, 10_000):
+        start = time.perf_counter()
+        asyncio.run(run_stimpl_async(program, slice_steps=slice_steps, output=NullSink()))
+        elapsed = time.perf_counter() - start
+        print(f"  slices of {slice_steps:<6}     {elapsed:7.3f}s  ({(elapsed / baseline - 1) * 100:+.1f}%)")
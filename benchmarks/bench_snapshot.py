@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import time
+
+from stimpl.checkpoint import run_checkpointed
+from stimpl.expression import *
+from stimpl.machine import Machine
+from stimpl.serialize import load_serialized, serialize, write_serialized
+
+"""
+The size of Machine snapshots and the cost of writing and loading them,
+for programs paused with more and more variables bound, then the cost of
+run_checkpointed over a plain Machine.run at several snapshot intervals.
+Run from the repository root:
+
+    python -m benchmarks.bench_snapshot [iterations]
+"""
+
+
+def many_variables(count):
+    # Binds count variables, then loops forever over them.
+    return Program(
+        *[Assign(Variable(f"v{index}"), IntLiteral(index * 1_000_003)) for index in range(count)],
+        Assign(Variable("i"), IntLiteral(0)),
+        While(BooleanLiteral(True),
+              Assign(Variable("i"), Add(Variable("i"), Variable(f"v{count - 1}")))))
+
+
+def summing_program(limit):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("total"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(limit)),
+              Sequence(
+                  Assign(Variable("total"), Add(Variable("total"), Multiply(Variable("i"), Variable("i")))),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))),
+        Variable("total"))
+
+
+def best_of(run, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "job.snapshot")
+
+        print("snapshots")
+        for count in (10, 1_000, 10_000):
+            machine = Machine(many_variables(count))
+            machine.run(count * 4 + 1_000)
+            size = len(serialize(machine))
+            write_time = best_of(lambda: write_serialized(path, machine))
+            load_time = best_of(lambda: load_serialized(path))
+            print(f"  {count:6} variables  {size / 1024:9.1f} KiB  write {write_time * 1000:7.2f}ms"
+                  f"  load {load_time * 1000:7.2f}ms")
+
+        os.unlink(path)
+        program = summing_program(iterations)
+        machine = Machine(program)
+        start = time.perf_counter()
+        machine.run()
+        baseline = time.perf_counter() - start
+        print(f"{machine.steps} steps")
+        print(f"  Machine.run               {baseline:7.3f}s")
+        for interval in (1_000, 10_000, 100_000):
+            start = time.perf_counter()
+            run_checkpointed(program, path, interval=interval)
+            elapsed = time.perf_counter() - start
+            print(f"  snapshot every {interval:<8}  {elapsed:7.3f}s  ({(elapsed / baseline - 1) * 100:+.1f}%)")
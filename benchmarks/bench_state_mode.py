@@ -0,0 +1,55 @@
+import time
+import tracemalloc
+
+from stimpl.expression import *
+from stimpl.runtime import run_stimpl
+
+"""
+Compare the persistent and mutable state modes on loop-heavy programs.
+
+Reports wall time and peak traced memory. Run from the repository root:
+
+    python -m benchmarks.bench_state_mode
+"""
+
+
+def counting_loop(iterations):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))))
+
+
+def many_variables_loop(variables, iterations):
+    names = [f"v{index}" for index in range(variables)]
+    return Program(
+        *[Assign(Variable(name), IntLiteral(0)) for name in names],
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Sequence(
+                  *[Assign(Variable(name), Add(Variable(name), Variable("i"))) for name in names],
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))))
+
+
+def measure(program, state_mode):
+    start = time.perf_counter()
+    run_stimpl(program, state_mode=state_mode)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    run_stimpl(program, state_mode=state_mode)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == '__main__':
+    workloads = [
+        ("counting loop (100k)", counting_loop(100_000)),
+        ("200 variables x 500 iterations", many_variables_loop(200, 500)),
+    ]
+    for name, program in workloads:
+        print(name)
+        for state_mode in ("persistent", "mutable"):
+            elapsed, peak = measure(program, state_mode)
+            print(f"  {state_mode:<10} {elapsed:8.3f}s  peak {peak / 1024:10.1f} KiB")
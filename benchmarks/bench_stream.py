@@ -0,0 +1,85 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from stimpl.expression import *
+from stimpl.output import OutputSink, redirect_output
+from stimpl.parser import parse_file, unparse
+from stimpl.runtime import evaluate, EmptyState
+from stimpl.stream import run_stream
+
+"""
+Peak memory and time to first output when running a large generated
+program file, loading the whole program first and streaming it one
+top-level expression at a time. Run from the repository root:
+
+    python -m benchmarks.bench_stream
+"""
+
+
+class FirstLineSink(OutputSink):
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.first = None
+        self.lines = 0
+
+    def write_line(self, line: str) -> None:
+        if self.first is None:
+            self.first = time.perf_counter() - self.start
+        self.lines += 1
+
+
+def write_program(path, statements):
+    # Written one statement at a time so that the whole program is never
+    # in memory here either.
+    names = [f"v{index}" for index in range(100)]
+    with open(path, "w") as stream:
+        stream.write("Program(\n")
+        for index in range(100):
+            stream.write(unparse(Assign(Variable(names[index]), IntLiteral(index))) + ",\n")
+        for index in range(statements):
+            statement = Assign(Variable(names[index % 100]),
+                               Add(Variable(names[(index + 1) % 100]),
+                                   Multiply(IntLiteral(index), IntLiteral(2))))
+            if index % 1000 == 0:
+                statement = Print(statement)
+            stream.write(unparse(statement) + ",\n")
+        stream.write("Ren())\n")
+
+
+def measure(run):
+    # Memory and time are measured in separate runs: tracing allocations
+    # slows evaluation down several times over.
+    tracemalloc.start()
+    with redirect_output(FirstLineSink()):
+        run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    sink = FirstLineSink()
+    with redirect_output(sink):
+        run()
+    total = time.perf_counter() - sink.start
+    return peak, sink.first, total
+
+
+if __name__ == '__main__':
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "program.stimpl")
+        write_program(path, statements)
+        print(f"{statements} statements, {os.path.getsize(path) / 2**20:.1f} MiB")
+
+        def load_then_run():
+            evaluate(parse_file(path), EmptyState())
+
+        def stream():
+            with open(path) as source:
+                run_stream(source)
+
+        for name, run in (("load then run", load_then_run), ("stream", stream)):
+            peak, first, total = measure(run)
+            print(f"  {name:<14} peak {peak / 2**20:8.1f} MiB  "
+                  f"first output {first:7.3f}s  total {total:7.3f}s")
@@ -0,0 +1,51 @@
+import time
+
+from stimpl.bytecode import compile_bytecode
+from stimpl.expression import *
+from stimpl.runtime import evaluate, EmptyState
+from stimpl.transpile import transpile, run_transpiled
+from stimpl.vm import run_vm
+
+"""
+Compare the transpiled Python function with the tree evaluator and the VM.
+
+Translation happens once and is timed separately from running. Run from
+the repository root:
+
+    python -m benchmarks.bench_transpile
+"""
+
+
+def counting_loop(iterations):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("total"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Sequence(
+                  If(Eq(Divide(Variable("i"), IntLiteral(2)), Divide(Add(Variable("i"), IntLiteral(1)), IntLiteral(2))),
+                     Assign(Variable("total"), Add(Variable("total"), Variable("i"))),
+                     Ren()),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))),
+        Variable("total"))
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    program = counting_loop(50_000)
+    print("counting loop with branch (50k)")
+
+    _, elapsed = timed(lambda: evaluate(program, EmptyState()))
+    print(f"  tree        {elapsed:8.3f}s")
+
+    code_object, compile_time = timed(lambda: compile_bytecode(program))
+    _, elapsed = timed(lambda: run_vm(code_object))
+    print(f"  vm          {elapsed:8.3f}s  (compile {compile_time * 1000:.2f}ms)")
+
+    transpiled, transpile_time = timed(lambda: transpile(program))
+    _, elapsed = timed(lambda: run_transpiled(transpiled))
+    print(f"  transpiled  {elapsed:8.3f}s  (transpile {transpile_time * 1000:.2f}ms)")
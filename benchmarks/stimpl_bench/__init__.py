@@ -0,0 +1,9 @@
+"""
+stimpl-bench: a reproducible benchmark suite for STIMPL.
+
+    python -m benchmarks.stimpl_bench run --output results.json
+    python -m benchmarks.stimpl_bench compare baseline.json results.json
+"""
+
+from benchmarks.stimpl_bench.generators import *
+from benchmarks.stimpl_bench.runner import *
@@ -0,0 +1,44 @@
+import argparse
+import sys
+
+from benchmarks.stimpl_bench.generators import WORKLOADS
+from benchmarks.stimpl_bench.runner import *
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="stimpl-bench")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the suite")
+    run.add_argument("--workload", action="append", choices=sorted(WORKLOADS),
+                     help="workload to run (repeatable; default: all)")
+    run.add_argument("--engine", action="append",
+                     help="engine to run (repeatable; default: tree)")
+    run.add_argument("--scale", type=float, default=1.0)
+    run.add_argument("--warmup", type=int, default=1)
+    run.add_argument("--repetitions", type=int, default=5)
+    run.add_argument("--output", help="save the results to this JSON file")
+
+    compare = commands.add_parser("compare", help="compare two saved runs")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.05)
+
+    arguments = parser.parse_args(argv)
+
+    if arguments.command == "run":
+        suite = run_suite(arguments.workload, arguments.engine or ["tree"],
+                          arguments.scale, arguments.warmup, arguments.repetitions)
+        print(format_suite(suite))
+        if arguments.output:
+            save_results(suite, arguments.output)
+        return 0
+
+    comparisons = compare_results(load_results(arguments.baseline),
+                                  load_results(arguments.current), arguments.threshold)
+    print(format_comparison(comparisons))
+    return 1 if any(comparison["verdict"] == "regression" for comparison in comparisons) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
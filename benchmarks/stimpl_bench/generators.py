@@ -0,0 +1,106 @@
+from stimpl.expression import *
+
+"""
+Workload generators.
+
+Each generator builds a STIMPL program from a few size parameters. WORKLOADS
+maps a workload name to its generator and default parameters; the defaults
+are sized so that one run of each takes on the order of 0.1s with the tree
+engine.
+"""
+
+
+def counting_loop(iterations: int) -> Expr:
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))))
+
+
+def nested_while(outer: int, inner: int) -> Expr:
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("j"), IntLiteral(0)),
+        Assign(Variable("total"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(outer)),
+              Sequence(
+                  Assign(Variable("j"), IntLiteral(0)),
+                  While(Lt(Variable("j"), IntLiteral(inner)),
+                        Sequence(
+                            Assign(Variable("total"), Add(Variable("total"), Variable("j"))),
+                            Assign(Variable("j"), Add(Variable("j"), IntLiteral(1))))),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))),
+        Variable("total"))
+
+
+def many_variables(variables: int, iterations: int) -> Expr:
+    names = [f"v{index}" for index in range(variables)]
+    return Program(
+        *[Assign(Variable(name), IntLiteral(0)) for name in names],
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Sequence(
+                  *[Assign(Variable(name), Add(Variable(name), Variable("i"))) for name in names],
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))))
+
+
+def deep_expression(depth: int, repetitions: int) -> Expr:
+    """
+    A balanced tree of arithmetic depth levels deep, evaluated repetitions
+    times.
+    """
+    def build(level):
+        if level == 0:
+            return Variable("x")
+        operator = Add if level % 2 else Multiply
+        return operator(build(level - 1), build(level - 1))
+
+    return Program(
+        Assign(Variable("x"), IntLiteral(1)),
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(repetitions)),
+              Sequence(
+                  Assign(Variable("y"), build(depth)),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))))
+
+
+def string_building(iterations: int) -> Expr:
+    return Program(
+        Assign(Variable("s"), StringLiteral("")),
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Sequence(
+                  Assign(Variable("s"), Add(Variable("s"), StringLiteral("ab"))),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))),
+        Variable("s"))
+
+
+def print_heavy(iterations: int) -> Expr:
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Sequence(
+                  Print(Variable("i")),
+                  Print(Ren()),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))))
+
+
+WORKLOADS = {
+    "counting_loop": (counting_loop, {"iterations": 10_000}),
+    "nested_while": (nested_while, {"outer": 100, "inner": 50}),
+    "many_variables": (many_variables, {"variables": 50, "iterations": 200}),
+    "deep_expression": (deep_expression, {"depth": 8, "repetitions": 50}),
+    "string_building": (string_building, {"iterations": 5_000}),
+    "print_heavy": (print_heavy, {"iterations": 5_000}),
+}
+
+
+def generate(name: str, scale: float = 1.0) -> Expr:
+    """
+    Build the named workload with its default parameters; scale multiplies
+    the iteration counts.
+    """
+    generator, parameters = WORKLOADS[name]
+    scaled = {key: value if key in ("depth", "variables") else max(1, int(value * scale))
+              for key, value in parameters.items()}
+    return generator(**scaled)
@@ -0,0 +1,165 @@
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from benchmarks.stimpl_bench.generators import WORKLOADS, generate
+from stimpl.output import NullSink
+from stimpl.profiler import Profile
+from stimpl.runtime import run_stimpl
+
+"""
+Benchmark runner.
+
+run_workload runs one program through run_stimpl: warmup runs first, then
+timed repetitions. Printed output goes to a NullSink. Every result records
+
+  - nodes: the number of node evaluations one run performs (counted once
+    with the profiler, after the other runs, so it is the same for every
+    engine);
+  - latency percentiles over the repetitions, in seconds;
+  - throughput: nodes divided by the median latency;
+  - peak traced memory of one extra run, in bytes.
+
+Results are plain dicts so that a whole suite can be saved as JSON and
+compared with compare_results.
+"""
+
+FORMAT_VERSION = 1
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    position = fraction * (len(ordered) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def count_evaluations(program) -> int:
+    profile = Profile()
+    run_stimpl(program, output=NullSink(), profile=profile)
+    return sum(stats.count for stats in profile.by_type.values())
+
+
+def run_workload(name: str, program, engine: str = "tree", warmup: int = 1,
+                 repetitions: int = 5, **options) -> Dict[str, Any]:
+    for _ in range(warmup):
+        run_stimpl(program, engine=engine, output=NullSink(), **options)
+
+    samples = []
+    for _ in range(repetitions):
+        gc.collect()
+        start = time.perf_counter()
+        run_stimpl(program, engine=engine, output=NullSink(), **options)
+        samples.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run_stimpl(program, engine=engine, output=NullSink(), **options)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Counted last, so that the timed runs never follow a profiled one.
+    nodes = count_evaluations(program)
+
+    median = _percentile(samples, 0.5)
+    return {
+        "workload": name,
+        "engine": engine,
+        "options": options,
+        "nodes": nodes,
+        "repetitions": repetitions,
+        "latency": {
+            "min": min(samples),
+            "p50": median,
+            "p90": _percentile(samples, 0.9),
+            "p99": _percentile(samples, 0.99),
+            "mean": statistics.fmean(samples),
+        },
+        "nodes_per_second": nodes / median if median else 0.0,
+        "peak_memory": peak_memory,
+    }
+
+
+def run_suite(workloads: Optional[List[str]] = None, engines: Optional[List[str]] = None,
+              scale: float = 1.0, warmup: int = 1, repetitions: int = 5) -> Dict[str, Any]:
+    results = []
+    for name in workloads or list(WORKLOADS):
+        program = generate(name, scale)
+        for engine in engines or ["tree"]:
+            results.append(run_workload(name, program, engine, warmup, repetitions))
+    return {
+        "version": FORMAT_VERSION,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "scale": scale,
+        "results": results,
+    }
+
+
+def save_results(suite: Dict[str, Any], path: str) -> None:
+    with open(path, "w") as stream:
+        json.dump(suite, stream, indent=2)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path) as stream:
+        suite = json.load(stream)
+    if suite.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported benchmark results version: {suite.get('version')}")
+    return suite
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = 0.05) -> List[Dict[str, Any]]:
+    """
+    Pair up results by workload and engine and compare their median
+    latencies. A change is a regression (or an improvement) when the
+    median moves by more than threshold, as a fraction of the baseline.
+    """
+    baseline_results = {(result["workload"], result["engine"]): result
+                        for result in baseline["results"]}
+    comparisons = []
+    for result in current["results"]:
+        key = (result["workload"], result["engine"])
+        if key not in baseline_results:
+            continue
+        before = baseline_results[key]["latency"]["p50"]
+        after = result["latency"]["p50"]
+        change = (after - before) / before if before else 0.0
+        if change > threshold:
+            verdict = "regression"
+        elif change < -threshold:
+            verdict = "improvement"
+        else:
+            verdict = "unchanged"
+        comparisons.append({"workload": key[0], "engine": key[1],
+                            "before": before, "after": after,
+                            "change": change, "verdict": verdict})
+    return comparisons
+
+
+def format_suite(suite: Dict[str, Any]) -> str:
+    lines = [f"{'workload':<18}{'engine':<10}{'nodes':>10}{'p50':>10}{'p90':>10}"
+             f"{'nodes/s':>12}{'peak KiB':>11}"]
+    for result in suite["results"]:
+        latency = result["latency"]
+        lines.append(f"{result['workload']:<18}{result['engine']:<10}{result['nodes']:>10}"
+                     f"{latency['p50']:>10.4f}{latency['p90']:>10.4f}"
+                     f"{result['nodes_per_second']:>12.0f}{result['peak_memory'] / 1024:>11.1f}")
+    return "\n".join(lines)
+
+
+def format_comparison(comparisons: List[Dict[str, Any]]) -> str:
+    lines = [f"{'workload':<18}{'engine':<10}{'before':>10}{'after':>10}{'change':>9}  verdict"]
+    for comparison in comparisons:
+        lines.append(f"{comparison['workload']:<18}{comparison['engine']:<10}"
+                     f"{comparison['before']:>10.4f}{comparison['after']:>10.4f}"
+                     f"{comparison['change']:>+9.1%}  {comparison['verdict']}")
+    return "\n".join(lines)
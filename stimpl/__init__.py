@@ -1,6 +1,29 @@
 from stimpl.errors import *
 from stimpl.expression import *
+from stimpl.output import *
+from stimpl.fuel import *
+from stimpl.persistent import *
 from stimpl.runtime import *
+from stimpl.closure import *
+from stimpl.bytecode import *
+from stimpl.vm import *
+from stimpl.arena import *
+from stimpl.machine import *
+from stimpl.transpile import *
+from stimpl.jit import *
+from stimpl.typecheck import *
+from stimpl.optimize import *
+from stimpl.fuse import *
+from stimpl.hashcons import *
+from stimpl.serialize import *
+from stimpl.cache import *
+from stimpl.checkpoint import *
+from stimpl.parser import *
+from stimpl.stream import *
+from stimpl.batch import *
+from stimpl.lanes import *
+from stimpl.scheduler import *
+from stimpl.profiler import *
 from stimpl.robustness import *
 from stimpl.test import *
 from stimpl.types import *
\ No newline at end of file
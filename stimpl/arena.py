@@ -0,0 +1,232 @@
+from array import array
+from typing import Any, Optional, Tuple
+
+from stimpl.bytecode import NOT, ADD, NE, BINARY_OPCODES
+from stimpl.expression import *
+from stimpl.types import *
+from stimpl.errors import *
+from stimpl.output import print_value
+from stimpl.runtime import State, EmptyState
+from stimpl.vm import binary_operation
+
+"""
+Arena-allocated programs.
+
+An Arena stores a whole program as parallel arrays indexed by node number:
+the kind of each node and up to two integer operands. Children are always
+stored before their parents, so node numbers double as a post-order.
+
+  kind            first            second
+  NODE_LITERAL    literal pool     -
+  NODE_VARIABLE   name pool        -
+  NODE_ASSIGN     name pool        value node
+  NODE_PRINT      operand node     -
+  NOT             operand node     -
+  binary ops      left node        right node
+  NODE_SEQUENCE   children start   children count
+  NODE_IF         condition node   children start (then, else)
+  NODE_WHILE      condition node   body node
+
+Binary operators and NOT use their bytecode opcodes as their kind so that
+the VM's operator implementation can be shared.
+"""
+
+NODE_LITERAL = 32
+NODE_VARIABLE = 33
+NODE_ASSIGN = 34
+NODE_PRINT = 35
+NODE_SEQUENCE = 36
+NODE_IF = 37
+NODE_WHILE = 38
+
+
+class Arena(object):
+    __slots__ = ("kinds", "first", "second", "children", "literals", "names", "root")
+
+    def __init__(self) -> None:
+        self.kinds = array("B")
+        self.first = array("q")
+        self.second = array("q")
+        self.children = array("q")
+        self.literals = []
+        self.names = []
+        self.root = -1
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __repr__(self) -> str:
+        return f"<Arena: {len(self)} nodes, {len(self.literals)} literals, {len(self.names)} names>"
+
+
+class _ArenaBuilder(object):
+    def __init__(self) -> None:
+        self.arena = Arena()
+        self.literal_indexes = {}
+        self.name_indexes = {}
+
+    def node(self, kind: int, first: int = 0, second: int = 0) -> int:
+        self.arena.kinds.append(kind)
+        self.arena.first.append(first)
+        self.arena.second.append(second)
+        return len(self.arena.kinds) - 1
+
+    def literal(self, value: Any, value_type: Type) -> int:
+        key = (value_type, type(value),
+               value.hex() if isinstance(value, float) else value)
+        if key not in self.literal_indexes:
+            self.literal_indexes[key] = len(self.arena.literals)
+            self.arena.literals.append((value, value_type))
+        return self.node(NODE_LITERAL, self.literal_indexes[key])
+
+    def name(self, variable_name: str) -> int:
+        if variable_name not in self.name_indexes:
+            self.name_indexes[variable_name] = len(self.arena.names)
+            self.arena.names.append(variable_name)
+        return self.name_indexes[variable_name]
+
+    def children(self, indexes) -> int:
+        start = len(self.arena.children)
+        self.arena.children.extend(indexes)
+        return start
+
+    def add(self, expression: Expr) -> int:
+        match expression:
+            case Ren():
+                return self.literal(None, UNIT)
+
+            case IntLiteral(literal=l):
+                return self.literal(l, INTEGER)
+
+            case FloatingPointLiteral(literal=l):
+                return self.literal(l, FLOATING_POINT)
+
+            case StringLiteral(literal=l):
+                return self.literal(l, STRING)
+
+            case BooleanLiteral(literal=l):
+                return self.literal(l, BOOLEAN)
+
+            case Print(to_print=to_print):
+                return self.node(NODE_PRINT, self.add(to_print))
+
+            case Sequence(exprs=exprs) | Program(exprs=exprs):
+                indexes = [self.add(expr) for expr in exprs]
+                return self.node(NODE_SEQUENCE, self.children(indexes), len(indexes))
+
+            case Variable(variable_name=variable_name):
+                return self.node(NODE_VARIABLE, self.name(variable_name))
+
+            case Assign(variable=variable, value=value):
+                value_index = self.add(value)
+                return self.node(NODE_ASSIGN, self.name(variable.variable_name), value_index)
+
+            case Not(expr=expr):
+                return self.node(NOT, self.add(expr))
+
+            case BinaryOperator(left=left, right=right) if type(expression) in BINARY_OPCODES:
+                left_index = self.add(left)
+                right_index = self.add(right)
+                return self.node(BINARY_OPCODES[type(expression)], left_index, right_index)
+
+            case If(condition=condition, true=true, false=false):
+                condition_index = self.add(condition)
+                branches = [self.add(true), self.add(false)]
+                return self.node(NODE_IF, condition_index, self.children(branches))
+
+            case While(condition=condition, body=body):
+                condition_index = self.add(condition)
+                return self.node(NODE_WHILE, condition_index, self.add(body))
+
+            case _:
+                raise InterpSyntaxError("Unhandled!")
+
+
+def build_arena(program: Expr) -> Arena:
+    builder = _ArenaBuilder()
+    builder.arena.root = builder.add(program)
+    return builder.arena
+
+
+def evaluate_arena(arena: Arena, state: Optional[State] = None) -> Tuple[Optional[Any], Type, State]:
+    if state is None:
+        state = EmptyState()
+
+    kinds = arena.kinds
+    first = arena.first
+    second = arena.second
+    children = arena.children
+    literals = arena.literals
+    names = arena.names
+
+    def walk(index):
+        nonlocal state
+        kind = kinds[index]
+
+        if kind == NODE_LITERAL:
+            return literals[first[index]]
+
+        if kind == NODE_VARIABLE:
+            value = state.get_value(names[first[index]])
+            if value == None:
+                raise InterpSyntaxError(
+                    f"Cannot read from {names[first[index]]} before assignment.")
+            return value
+
+        if kind >= ADD and kind <= NE:
+            left = walk(first[index])
+            return binary_operation(kind, left, walk(second[index]))
+
+        if kind == NODE_ASSIGN:
+            result = walk(second[index])
+            variable_name = names[first[index]]
+            variable_from_state = state.get_value(variable_name)
+            if variable_from_state != None and result[1] != variable_from_state[1]:
+                raise InterpTypeError(f"""Mismatched types for Assignment:
+            Cannot assign {result[1]} to {variable_from_state[1]}""")
+            state = state.set_value(variable_name, result[0], result[1])
+            return result
+
+        if kind == NODE_SEQUENCE:
+            result = UNIT_VALUE
+            start = first[index]
+            for child in range(start, start + second[index]):
+                result = walk(children[child])
+            return result
+
+        if kind == NODE_WHILE:
+            condition = first[index]
+            body = second[index]
+            while True:
+                condition_value, condition_type = walk(condition)
+                if condition_type is not BOOLEAN:
+                    raise InterpTypeError(
+                        f"Cannot use {condition_type} as a While condition.")
+                if not condition_value:
+                    return FALSE_VALUE
+                walk(body)
+
+        if kind == NODE_IF:
+            condition_value, condition_type = walk(first[index])
+            if condition_type is not BOOLEAN:
+                raise InterpTypeError(
+                    f"Cannot use {condition_type} as an If condition.")
+            branches = second[index]
+            return walk(children[branches if condition_value else branches + 1])
+
+        if kind == NOT:
+            value, value_type = walk(first[index])
+            if value_type is not BOOLEAN:
+                raise InterpTypeError(
+                    "Cannot perform logical not on non-boolean operand.")
+            return FALSE_VALUE if value else TRUE_VALUE
+
+        if kind == NODE_PRINT:
+            result = walk(first[index])
+            print_value(*result)
+            return result
+
+        raise InterpSyntaxError("Unhandled!")
+
+    value, value_type = walk(arena.root)
+    return (value, value_type, state)
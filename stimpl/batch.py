@@ -0,0 +1,171 @@
+import os
+import pickle
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from stimpl.expression import Expr
+from stimpl.output import CollectingSink
+from stimpl.runtime import run_stimpl
+from stimpl.serialize import deserialize, serialize
+from stimpl.types import *
+
+"""
+Batch execution.
+
+run_many runs many independent programs on a pool of worker processes.
+Programs are sent to the workers in their binary serialized form, in
+chunks of several programs per message so that small programs are not
+dominated by the cost of inter-process communication, and only a bounded
+number of chunks is in flight at once, so programs can come from a
+generator of any length.
+
+Each program gets a ProgramResult: its value, type, final bindings and
+printed lines, or the exception it raised. Results are yielded in
+submission order, or as they complete when ordered is False.
+
+A program that runs for longer than timeout seconds is stopped with a
+TimeoutError. Timeouts use SIGALRM in the worker, so they are only
+enforced on platforms that have it. Signal handlers can only be installed
+by the main thread, so with workers=0, run_many only accepts a timeout
+when it is called from the main thread.
+"""
+
+
+class ProgramResult(object):
+    __slots__ = ("index", "value", "type", "state", "output", "error", "elapsed")
+
+    def __init__(self, index: int, value: Optional[Any], value_type: Optional[Type],
+                 state: Optional[Dict[str, Tuple[Any, Type]]], output: List[str],
+                 error: Optional[BaseException], elapsed: float) -> None:
+        self.index = index
+        self.value = value
+        self.type = value_type
+        self.state = state
+        self.output = output
+        self.error = error
+        self.elapsed = elapsed
+
+    def unwrap(self) -> Tuple[Optional[Any], Type, Dict[str, Tuple[Any, Type]]]:
+        """
+        The program's value, type and final bindings; raises the program's
+        exception if it raised one.
+        """
+        if self.error is not None:
+            raise self.error
+        return (self.value, self.type, self.state)
+
+    def __repr__(self) -> str:
+        if self.error is not None:
+            return f"<ProgramResult {self.index}: {type(self.error).__name__}: {self.error}>"
+        return f"<ProgramResult {self.index}: ({self.value}, {self.type})>"
+
+
+def _timed_out(signum, frame) -> None:
+    raise TimeoutError("Program exceeded its time limit.")
+
+
+def _run_one(index: int, data: bytes, timeout: Optional[float], options: Dict[str, Any]) -> ProgramResult:
+    sink = CollectingSink()
+    start = time.perf_counter()
+    alarm = timeout is not None and hasattr(signal, "setitimer") \
+        and threading.current_thread() is threading.main_thread()
+    try:
+        if alarm:
+            previous = signal.signal(signal.SIGALRM, _timed_out)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            value, value_type, state = run_stimpl(deserialize(data), output=sink, **options)
+        finally:
+            if alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, previous)
+        bindings = dict(state.snapshot().bindings.items())
+        return ProgramResult(index, value, value_type, bindings, sink.lines, None,
+                             time.perf_counter() - start)
+    except Exception as error:
+        try:
+            pickle.dumps(error)
+        except Exception:
+            error = RuntimeError(f"{type(error).__name__}: {error}")
+        return ProgramResult(index, None, None, None, sink.lines, error,
+                             time.perf_counter() - start)
+
+
+def _run_chunk(chunk: List[Tuple[int, bytes]], timeout: Optional[float],
+               options: Dict[str, Any]) -> List[ProgramResult]:
+    return [_run_one(index, data, timeout, options) for index, data in chunk]
+
+
+def _chunks(programs: Iterable[Union[Expr, bytes]], chunk_size: int) -> Iterator[List[Tuple[int, bytes]]]:
+    chunk = []
+    for index, program in enumerate(programs):
+        chunk.append((index, program if isinstance(program, bytes) else serialize(program)))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_many(programs: Iterable[Union[Expr, bytes]], workers: Optional[int] = None, *,
+             ordered: bool = True, timeout: Optional[float] = None,
+             chunk_size: Optional[int] = None, engine: str = "tree",
+             state_mode: str = "persistent", typecheck: bool = False,
+             optimize: bool = False, fuse: bool = False) -> Iterator[ProgramResult]:
+    """
+    Run each program (an Expr, or bytes from stimpl.serialize.serialize)
+    with run_stimpl and the given options on workers processes, yielding a
+    ProgramResult per program. workers defaults to the number of CPUs; 0
+    runs the programs in this process, where timeout is only allowed in
+    the main thread.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 0 and timeout is not None and threading.current_thread() is not threading.main_thread():
+        raise ValueError("With workers=0, a timeout can only be enforced from the main thread.")
+    if chunk_size is None:
+        # Enough chunks to keep every worker busy to the end, each large
+        # enough to amortize its message.
+        chunk_size = 16
+        if hasattr(programs, "__len__"):
+            chunk_size = max(1, min(64, len(programs) // (max(workers, 1) * 8)))
+    options = {"engine": engine, "state_mode": state_mode, "typecheck": typecheck,
+               "optimize": optimize, "fuse": fuse}
+
+    if workers == 0:
+        for chunk in _chunks(programs, chunk_size):
+            yield from _run_chunk(chunk, timeout, options)
+        return
+
+    chunks = _chunks(programs, chunk_size)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        in_flight = set()
+        completed: Dict[int, ProgramResult] = {}
+        next_index = 0
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                else:
+                    in_flight.add(executor.submit(_run_chunk, chunk, timeout, options))
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                for result in future.result():
+                    if ordered:
+                        completed[result.index] = result
+                    else:
+                        yield result
+            while next_index in completed:
+                yield completed.pop(next_index)
+                next_index += 1
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,201 @@
+from array import array
+from typing import Any, List, Tuple
+
+from stimpl.expression import *
+from stimpl.types import *
+from stimpl.errors import *
+
+"""
+Bytecode.
+
+A program is compiled into a CodeObject: a flat array of instructions plus
+a constant pool and a name pool. Every instruction is two machine integers
+wide -- an opcode followed by its operand (0 when the opcode takes none) --
+so jump targets are plain indices into the array. Variables are resolved to
+slot indices (their position in the name pool) at compile time.
+"""
+
+PUSH_CONST = 0
+LOAD = 1
+STORE = 2
+POP = 3
+PRINT = 4
+JUMP = 5
+BRANCH_IF = 6
+BRANCH_WHILE = 7
+NOT = 8
+ADD = 9
+SUBTRACT = 10
+MULTIPLY = 11
+DIVIDE = 12
+AND = 13
+OR = 14
+LT = 15
+LTE = 16
+GT = 17
+GTE = 18
+EQ = 19
+NE = 20
+HALT = 21
+
+OPCODE_NAMES = [
+    "PUSH_CONST", "LOAD", "STORE", "POP", "PRINT", "JUMP", "BRANCH_IF",
+    "BRANCH_WHILE", "NOT", "ADD", "SUBTRACT", "MULTIPLY", "DIVIDE", "AND",
+    "OR", "LT", "LTE", "GT", "GTE", "EQ", "NE", "HALT",
+]
+
+BINARY_OPCODES = {
+    Add: ADD,
+    Subtract: SUBTRACT,
+    Multiply: MULTIPLY,
+    Divide: DIVIDE,
+    And: AND,
+    Or: OR,
+    Lt: LT,
+    Lte: LTE,
+    Gt: GT,
+    Gte: GTE,
+    Eq: EQ,
+    Ne: NE,
+}
+
+
+class CodeObject(object):
+    def __init__(self, code: array, constants: List[Tuple[Any, Type]], names: List[str]) -> None:
+        self.code = code
+        self.constants = constants
+        self.names = names
+
+    def __repr__(self) -> str:
+        return f"<CodeObject: {len(self.code) // 2} instructions, {len(self.constants)} constants, {len(self.names)} names>"
+
+
+class _Compiler(object):
+    def __init__(self) -> None:
+        self.code = array("i")
+        self.constants = []
+        self.constant_indexes = {}
+        self.names = []
+        self.slots = {}
+
+    def emit(self, opcode: int, operand: int = 0) -> int:
+        position = len(self.code)
+        self.code.append(opcode)
+        self.code.append(operand)
+        return position
+
+    def patch(self, position: int, target: int) -> None:
+        self.code[position + 1] = target
+
+    def constant(self, value: Any, value_type: Type) -> int:
+        # Key on the Python type too so that True and 1 never share an
+        # entry, and on the exact bits of floats so that 0.0 and -0.0 don't.
+        key = (type(value_type), type(value),
+               value.hex() if isinstance(value, float) else value)
+        if key not in self.constant_indexes:
+            self.constant_indexes[key] = len(self.constants)
+            self.constants.append((value, value_type))
+        return self.constant_indexes[key]
+
+    def slot(self, variable_name: str) -> int:
+        if variable_name not in self.slots:
+            self.slots[variable_name] = len(self.names)
+            self.names.append(variable_name)
+        return self.slots[variable_name]
+
+    def compile(self, expression: Expr) -> None:
+        match expression:
+            case Ren():
+                self.emit(PUSH_CONST, self.constant(None, Unit()))
+
+            case IntLiteral(literal=l):
+                self.emit(PUSH_CONST, self.constant(l, Integer()))
+
+            case FloatingPointLiteral(literal=l):
+                self.emit(PUSH_CONST, self.constant(l, FloatingPoint()))
+
+            case StringLiteral(literal=l):
+                self.emit(PUSH_CONST, self.constant(l, String()))
+
+            case BooleanLiteral(literal=l):
+                self.emit(PUSH_CONST, self.constant(l, Boolean()))
+
+            case Print(to_print=to_print):
+                self.compile(to_print)
+                self.emit(PRINT)
+
+            case Sequence(exprs=exprs) | Program(exprs=exprs):
+                if len(exprs) == 0:
+                    self.emit(PUSH_CONST, self.constant(None, Unit()))
+                for index, expr in enumerate(exprs):
+                    self.compile(expr)
+                    if index != len(exprs) - 1:
+                        self.emit(POP)
+
+            case Variable(variable_name=variable_name):
+                self.emit(LOAD, self.slot(variable_name))
+
+            case Assign(variable=variable, value=value):
+                self.compile(value)
+                self.emit(STORE, self.slot(variable.variable_name))
+
+            case Not(expr=expr):
+                self.compile(expr)
+                self.emit(NOT)
+
+            case BinaryOperator(left=left, right=right) if type(expression) in BINARY_OPCODES:
+                self.compile(left)
+                self.compile(right)
+                self.emit(BINARY_OPCODES[type(expression)])
+
+            case If(condition=condition, true=true, false=false):
+                self.compile(condition)
+                branch = self.emit(BRANCH_IF)
+                self.compile(true)
+                jump = self.emit(JUMP)
+                self.patch(branch, len(self.code))
+                self.compile(false)
+                self.patch(jump, len(self.code))
+
+            case While(condition=condition, body=body):
+                loop = len(self.code)
+                self.compile(condition)
+                branch = self.emit(BRANCH_WHILE)
+                self.compile(body)
+                self.emit(POP)
+                self.emit(JUMP, loop)
+                self.patch(branch, len(self.code))
+                self.emit(PUSH_CONST, self.constant(False, Boolean()))
+
+            case _:
+                raise InterpSyntaxError("Unhandled!")
+
+
+def compile_bytecode(program: Expr) -> CodeObject:
+    compiler = _Compiler()
+    compiler.compile(program)
+    compiler.emit(HALT)
+    return CodeObject(compiler.code, compiler.constants, compiler.names)
+
+
+def disassemble(code_object: CodeObject) -> str:
+    code = code_object.code
+    targets = set()
+    for pc in range(0, len(code), 2):
+        if code[pc] in (JUMP, BRANCH_IF, BRANCH_WHILE):
+            targets.add(code[pc + 1])
+
+    lines = []
+    for pc in range(0, len(code), 2):
+        opcode, operand = code[pc], code[pc + 1]
+        marker = ">>" if pc in targets else "  "
+        line = f"{marker} {pc:5} {OPCODE_NAMES[opcode]:<13}"
+        if opcode == PUSH_CONST:
+            value, value_type = code_object.constants[operand]
+            line += f" {operand:4} ({value!r}, {value_type})"
+        elif opcode in (LOAD, STORE):
+            line += f" {operand:4} ({code_object.names[operand]})"
+        elif opcode in (JUMP, BRANCH_IF, BRANCH_WHILE):
+            line += f" {operand:4} (to {operand})"
+        lines.append(line.rstrip())
+    return "\n".join(lines)
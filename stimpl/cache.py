@@ -0,0 +1,145 @@
+import os
+import shutil
+from contextlib import suppress
+from typing import Callable, Optional
+from urllib.parse import quote
+
+from stimpl.arena import Arena, build_arena
+from stimpl.bytecode import CodeObject, compile_bytecode
+from stimpl.expression import Expr
+from stimpl.serialize import FORMAT_VERSION, SerializationError, load_serialized, structural_digest, write_serialized
+
+"""
+Compiled-program cache.
+
+A ProgramCache is a directory of serialized programs and their compiled
+forms, addressed by the program's structural digest:
+
+  <directory>/v<FORMAT_VERSION>/<digest[:2]>/<digest>.program
+                                             <digest>.bytecode
+                                             <digest>.arena
+  <directory>/v<FORMAT_VERSION>/names/<name>    the digest a name refers to
+
+Files are written atomically and loaded with mmap, so any number of
+processes can share one cache. Entries are only ever read from the
+directory of the current format version; a file that cannot be loaded is
+treated as missing and rewritten, and prune removes the directories of
+other format versions.
+"""
+
+
+class ProgramCache(object):
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.root = os.path.join(directory, f"v{FORMAT_VERSION}")
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return f"<ProgramCache: {self.root}, {self.hits} hits, {self.misses} misses>"
+
+    def path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.{suffix}")
+
+    def _load(self, path: str):
+        try:
+            loaded = load_serialized(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except SerializationError:
+            with suppress(FileNotFoundError):
+                os.unlink(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return loaded
+
+    def _write(self, path: str, obj) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_serialized(path, obj)
+
+    def store(self, program: Expr) -> str:
+        """
+        Add program to the cache and return its key.
+        """
+        key = structural_digest(program)
+        path = self.path(key, "program")
+        if not os.path.exists(path):
+            self._write(path, program)
+        return key
+
+    def load(self, key: str) -> Optional[Expr]:
+        return self._load(self.path(key, "program"))
+
+    def _compiled(self, key: str, suffix: str, compile_program):
+        compiled = self._load(self.path(key, suffix))
+        if compiled is None:
+            program = self.load(key)
+            if program is None:
+                return None
+            compiled = compile_program(program)
+            self._write(self.path(key, suffix), compiled)
+        return compiled
+
+    def load_bytecode(self, key: str) -> Optional[CodeObject]:
+        """
+        The program's CodeObject, compiled and cached on first use; None if
+        the program is not in the cache.
+        """
+        return self._compiled(key, "bytecode", compile_bytecode)
+
+    def load_arena(self, key: str) -> Optional[Arena]:
+        """
+        The program's Arena, built and cached on first use; None if the
+        program is not in the cache.
+        """
+        return self._compiled(key, "arena", build_arena)
+
+    def name(self, name: str, key: str) -> None:
+        """
+        Make name refer to key.
+        """
+        path = os.path.join(self.root, "names", quote(name, safe=""))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as stream:
+            stream.write(key)
+        os.replace(temporary, path)
+
+    def resolve(self, name: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, "names", quote(name, safe=""))) as stream:
+                return stream.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def get_or_build(self, name: str, build: Callable[[], Expr]) -> Expr:
+        """
+        The program name refers to, loaded from the cache; on a miss, the
+        program build returns, which is then cached under name.
+        """
+        key = self.resolve(name)
+        if key is not None:
+            program = self.load(key)
+            if program is not None:
+                return program
+        program = build()
+        self.name(name, self.store(program))
+        return program
+
+    def prune(self) -> int:
+        """
+        Remove the entries of every other format version and return how
+        many version directories were removed.
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+        removed = 0
+        for entry in os.listdir(self.directory):
+            path = os.path.join(self.directory, entry)
+            if entry.startswith("v") and entry[1:].isdigit() and path != self.root \
+                    and os.path.isdir(path):
+                shutil.rmtree(path)
+                removed += 1
+        return removed
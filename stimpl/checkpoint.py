@@ -0,0 +1,68 @@
+import os
+from contextlib import suppress
+from typing import Any, Optional, Tuple
+
+from stimpl.errors import *
+from stimpl.expression import Expr
+from stimpl.machine import Machine
+from stimpl.runtime import State
+from stimpl.serialize import load_serialized, write_serialized
+from stimpl.types import *
+
+"""
+Resumable execution.
+
+run_checkpointed runs a program on a Machine and, every interval steps,
+writes a snapshot of the Machine -- its continuation and State, with the
+program -- to a file. When the file already holds a snapshot of the same
+program, the run resumes from it instead of starting over, in this process
+or any other, so a job that dies partway or runs out of steps loses at
+most interval steps of work. A resumed run reaches the same value, type
+and bindings as an uninterrupted one; lines printed after the last
+snapshot are printed again.
+
+The snapshot is removed once the program finishes.
+"""
+
+DEFAULT_INTERVAL = 100_000
+
+
+def load_machine(path: str, program: Expr) -> Optional[Machine]:
+    """
+    The Machine of the snapshot of program at path, or None if there is
+    no snapshot there.
+    """
+    try:
+        machine = load_serialized(path)
+    except FileNotFoundError:
+        return None
+    if not isinstance(machine, Machine) or machine.program != program:
+        raise ValueError(f"{path} does not hold a snapshot of this program.")
+    return machine
+
+
+def run_checkpointed(program: Expr, path: str, interval: int = DEFAULT_INTERVAL,
+                     state: Optional[State] = None,
+                     max_steps: Optional[int] = None) -> Tuple[Optional[Any], Type, State]:
+    """
+    Evaluate program like the iterative engine, snapshotting it to path
+    every interval steps, and resuming from path if a snapshot of it is
+    there; state is the initial State of a run that starts over. Raises
+    InterpBudgetError, after writing a snapshot, once the run has taken
+    max_steps steps in all without finishing.
+    """
+    if interval < 1:
+        raise ValueError("interval must be a positive number of steps.")
+    machine = load_machine(path, program)
+    if machine is None:
+        machine = Machine(program, state)
+    while True:
+        steps = interval if max_steps is None else max(0, min(interval, max_steps - machine.steps))
+        if machine.run(steps):
+            with suppress(FileNotFoundError):
+                os.unlink(path)
+            return machine.result()
+        write_serialized(path, machine)
+        if max_steps is not None and machine.steps >= max_steps:
+            raise InterpBudgetError(f"Program did not finish within {max_steps} steps.",
+                                    machine.steps, machine.state)
@@ -0,0 +1,458 @@
+import operator
+from typing import Any, Callable, Optional, Tuple
+
+from stimpl.expression import *
+from stimpl.types import *
+from stimpl.errors import *
+from stimpl.output import print_value
+from stimpl.runtime import State, EmptyState
+
+"""
+Closure compilation.
+
+compile_stimpl walks a program once and turns every node into a Python
+closure that is specialized for that node. Running the compiled program
+only calls closures -- the match cascade in evaluate is never consulted.
+
+Every closure takes an Environment and returns a (value, type) pair. The
+current State lives in the Environment so that it does not have to be
+threaded through every return value.
+"""
+
+
+class Environment(object):
+    __slots__ = ("state",)
+
+    def __init__(self, state: State) -> None:
+        self.state = state
+
+
+Compiled = Callable[[Environment], Tuple[Optional[Any], Type]]
+
+_ADDABLE = frozenset((INTEGER, STRING, FLOATING_POINT))
+_NUMERIC = frozenset((INTEGER, FLOATING_POINT))
+_COMPARABLE = frozenset((INTEGER, BOOLEAN, STRING, FLOATING_POINT))
+
+
+def _compile_ren() -> Compiled:
+    def ren(env):
+        return UNIT_VALUE
+    return ren
+
+
+def _compile_literal(literal: Any, literal_type: Type) -> Compiled:
+    result = (literal, literal_type)
+
+    def literal_closure(env):
+        return result
+    return literal_closure
+
+
+def _compile_print(to_print: Compiled) -> Compiled:
+    def print_closure(env):
+        result = to_print(env)
+        print_value(*result)
+        return result
+    return print_closure
+
+
+def _compile_sequence(exprs: Tuple[Compiled, ...]) -> Compiled:
+    if len(exprs) == 0:
+        return _compile_ren()
+    if len(exprs) == 1:
+        return exprs[0]
+
+    leading, last = exprs[:-1], exprs[-1]
+
+    def sequence(env):
+        for expr in leading:
+            expr(env)
+        return last(env)
+    return sequence
+
+
+def _compile_variable(variable_name: str) -> Compiled:
+    def variable(env):
+        value = env.state.get_value(variable_name)
+        if value == None:
+            raise InterpSyntaxError(
+                f"Cannot read from {variable_name} before assignment.")
+        return value
+    return variable
+
+
+def _compile_assign(variable_name: str, value: Compiled) -> Compiled:
+    def assign(env):
+        result = value(env)
+        value_result, value_type = result
+
+        variable_from_state = env.state.get_value(variable_name)
+        if variable_from_state != None and value_type != variable_from_state[1]:
+            raise InterpTypeError(f"""Mismatched types for Assignment:
+            Cannot assign {value_type} to {variable_from_state[1]}""")
+
+        env.state = env.state.set_value(
+            variable_name, value_result, value_type)
+        return result
+    return assign
+
+
+def _compile_add(left: Compiled, right: Compiled) -> Compiled:
+    def add(env):
+        left_result, left_type = left(env)
+        right_result, right_type = right(env)
+
+        if left_type != right_type:
+            raise InterpTypeError(f"""Mismatched types for Add:
+            Cannot add {left_type} to {right_type}""")
+        if left_type not in _ADDABLE:
+            raise InterpTypeError(f"""Cannot add {left_type}s""")
+
+        return (left_result + right_result, left_type)
+    return add
+
+
+def _compile_subtract(left: Compiled, right: Compiled) -> Compiled:
+    def subtract(env):
+        left_result, left_type = left(env)
+        right_result, right_type = right(env)
+
+        if left_type != right_type:
+            raise InterpTypeError(f"""Mismatched types for Subtract:
+            Cannot subtract {right_type} from {left_type}""")
+        if left_type not in _NUMERIC:
+            raise InterpTypeError(f"""Cannot subtract {left_type}s""")
+
+        return (left_result - right_result, left_type)
+    return subtract
+
+
+def _compile_multiply(left: Compiled, right: Compiled) -> Compiled:
+    def multiply(env):
+        left_result, left_type = left(env)
+        right_result, right_type = right(env)
+
+        if left_type != right_type:
+            raise InterpTypeError(f"""Mismatched types for Multiply:
+            Cannot multiply {left_type} and {right_type}""")
+        if left_type not in _NUMERIC:
+            raise InterpTypeError(f"""Cannot multiply {left_type}s""")
+
+        return (left_result * right_result, left_type)
+    return multiply
+
+
+def _compile_divide(left: Compiled, right: Compiled) -> Compiled:
+    def divide(env):
+        left_result, left_type = left(env)
+        right_result, right_type = right(env)
+
+        if left_type != right_type:
+            raise InterpTypeError(f"""Mismatched types for Divide:
+            Cannot divide {left_type} by {right_type}""")
+        if left_type is INTEGER:
+            if right_result == 0:
+                raise InterpMathError("Cannot divide by zero.")
+            return (left_result // right_result, left_type)
+        if left_type is FLOATING_POINT:
+            if right_result == 0:
+                raise InterpMathError("Cannot divide by zero.")
+            return (left_result / right_result, left_type)
+        raise InterpTypeError(f"""Cannot divide {left_type}s""")
+    return divide
+
+
+def _compile_and(left: Compiled, right: Compiled) -> Compiled:
+    def and_closure(env):
+        left_value, left_type = left(env)
+        right_value, right_type = right(env)
+
+        if left_type != right_type:
+            raise InterpTypeError(f"""Mismatched types for And:
+            Cannot evaluate {left_type} and {right_type}""")
+        if left_type is not BOOLEAN:
+            raise InterpTypeError(
+                "Cannot perform logical and on non-boolean operands.")
+
+        return tagged_boolean(left_value and right_value)
+    return and_closure
+
+
+def _compile_or(left: Compiled, right: Compiled) -> Compiled:
+    def or_closure(env):
+        left_value, left_type = left(env)
+        right_value, right_type = right(env)
+
+        if left_type != right_type:
+            raise InterpTypeError(f"""Mismatched types for Or:
+            Cannot evaluate {left_type} or {right_type}""")
+        if left_type is not BOOLEAN:
+            raise InterpTypeError(
+                "Cannot perform logical or on non-boolean operands.")
+
+        return tagged_boolean(left_value or right_value)
+    return or_closure
+
+
+def _compile_not(expr: Compiled) -> Compiled:
+    def not_closure(env):
+        value, value_type = expr(env)
+        if value_type is not BOOLEAN:
+            raise InterpTypeError(
+                "Cannot perform logical not on non-boolean operand.")
+        return FALSE_VALUE if value else TRUE_VALUE
+    return not_closure
+
+
+def _compile_comparison(name: str, symbol: str, compare: Callable[[Any, Any], bool], unit_result: bool, left: Compiled, right: Compiled) -> Compiled:
+    unit_value = tagged_boolean(unit_result)
+
+    def comparison(env):
+        left_value, left_type = left(env)
+        right_value, right_type = right(env)
+
+        if left_type != right_type:
+            raise InterpTypeError(f"""Mismatched types for {name}:
+            Cannot compare {left_type} and {right_type}""")
+        if left_type is UNIT:
+            return unit_value
+        if left_type not in _COMPARABLE:
+            raise InterpTypeError(
+                f"Cannot perform {symbol} on {left_type} type.")
+
+        return TRUE_VALUE if compare(left_value, right_value) else FALSE_VALUE
+    return comparison
+
+
+def _compile_if(condition: Compiled, true: Compiled, false: Compiled) -> Compiled:
+    def if_closure(env):
+        condition_value, condition_type = condition(env)
+        if condition_type is not BOOLEAN:
+            raise InterpTypeError(
+                f"Cannot use {condition_type} as an If condition.")
+        if condition_value:
+            return true(env)
+        return false(env)
+    return if_closure
+
+
+def _compile_while(condition: Compiled, body: Compiled) -> Compiled:
+    def while_closure(env):
+        while True:
+            condition_value, condition_type = condition(env)
+            if condition_type is not BOOLEAN:
+                raise InterpTypeError(
+                    f"Cannot use {condition_type} as a While condition.")
+            if not condition_value:
+                break
+            body(env)
+        return FALSE_VALUE
+    return while_closure
+
+
+def _compile_proven_binary(operation: Callable[[Any, Any], Any], result_type: Type, left: Compiled, right: Compiled) -> Compiled:
+    def proven_binary(env):
+        left_value = left(env)[0]
+        return (operation(left_value, right(env)[0]), result_type)
+    return proven_binary
+
+
+def _compile_proven_predicate(predicate: Callable[[Any, Any], bool], left: Compiled, right: Compiled) -> Compiled:
+    def proven_predicate(env):
+        left_value = left(env)[0]
+        return TRUE_VALUE if predicate(left_value, right(env)[0]) else FALSE_VALUE
+    return proven_predicate
+
+
+def _compile_proven_divide(operation: Callable[[Any, Any], Any], result_type: Type, left: Compiled, right: Compiled) -> Compiled:
+    def proven_divide(env):
+        left_value = left(env)[0]
+        right_value = right(env)[0]
+        if right_value == 0:
+            raise InterpMathError("Cannot divide by zero.")
+        return (operation(left_value, right_value), result_type)
+    return proven_divide
+
+
+def _compile_proven_not(expr: Compiled) -> Compiled:
+    def proven_not(env):
+        return FALSE_VALUE if expr(env)[0] else TRUE_VALUE
+    return proven_not
+
+
+def _compile_proven_assign(variable_name: str, value: Compiled) -> Compiled:
+    def proven_assign(env):
+        result = value(env)
+        env.state = env.state.set_value(variable_name, result[0], result[1])
+        return result
+    return proven_assign
+
+
+def _compile_proven_if(condition: Compiled, true: Compiled, false: Compiled) -> Compiled:
+    def proven_if(env):
+        if condition(env)[0]:
+            return true(env)
+        return false(env)
+    return proven_if
+
+
+def _compile_proven_while(condition: Compiled, body: Compiled) -> Compiled:
+    def proven_while(env):
+        while condition(env)[0]:
+            body(env)
+        return FALSE_VALUE
+    return proven_while
+
+
+_PROVEN_ARITHMETIC = {
+    Add: operator.add,
+    Subtract: operator.sub,
+    Multiply: operator.mul,
+}
+
+_PROVEN_PREDICATES = {
+    And: lambda l, r: l and r,
+    Or: lambda l, r: l or r,
+    Lt: operator.lt,
+    Lte: operator.le,
+    Gt: operator.gt,
+    Gte: operator.ge,
+    Eq: operator.eq,
+    Ne: operator.ne,
+}
+
+
+def _compile_proven(expression: Expr) -> Optional[Compiled]:
+    """
+    Compile a node that stimpl.typecheck has proven well typed, leaving out
+    its dynamic type checks. Returns None for nodes that have no cheaper
+    form.
+    """
+    match expression:
+        case Divide(left=left, right=right):
+            operation = operator.floordiv if expression.static_type is INTEGER else operator.truediv
+            return _compile_proven_divide(operation, expression.static_type, _compile(left), _compile(right))
+
+        case BinaryOperator(left=left, right=right) if type(expression) in _PROVEN_ARITHMETIC:
+            return _compile_proven_binary(_PROVEN_ARITHMETIC[type(expression)], expression.static_type, _compile(left), _compile(right))
+
+        case BinaryOperator(left=left, right=right) if type(expression) in _PROVEN_PREDICATES:
+            return _compile_proven_predicate(_PROVEN_PREDICATES[type(expression)], _compile(left), _compile(right))
+
+        case Not(expr=expr):
+            return _compile_proven_not(_compile(expr))
+
+        case Assign(variable=variable, value=value):
+            return _compile_proven_assign(variable.variable_name, _compile(value))
+
+    return None
+
+
+def _compile_branch(expression: Expr) -> Optional[Compiled]:
+    """
+    Compile an If or While whose condition is proven to be a Boolean.
+    """
+    match expression:
+        case If(condition=condition, true=true, false=false) if condition.static_type is not None:
+            return _compile_proven_if(_compile(condition), _compile(true), _compile(false))
+
+        case While(condition=condition, body=body) if condition.static_type is not None:
+            return _compile_proven_while(_compile(condition), _compile(body))
+
+    return None
+
+
+def _compile(expression: Expr) -> Compiled:
+    proven = _compile_branch(expression)
+    if proven is None and expression.static_type is not None:
+        proven = _compile_proven(expression)
+    if proven is not None:
+        return proven
+
+    match expression:
+        case Ren():
+            return _compile_ren()
+
+        case IntLiteral(literal=l):
+            return _compile_literal(l, INTEGER)
+
+        case FloatingPointLiteral(literal=l):
+            return _compile_literal(l, FLOATING_POINT)
+
+        case StringLiteral(literal=l):
+            return _compile_literal(l, STRING)
+
+        case BooleanLiteral(literal=l):
+            return _compile_literal(l, BOOLEAN)
+
+        case Print(to_print=to_print):
+            return _compile_print(_compile(to_print))
+
+        case Sequence(exprs=exprs) | Program(exprs=exprs):
+            return _compile_sequence(tuple(_compile(expr) for expr in exprs))
+
+        case Variable(variable_name=variable_name):
+            return _compile_variable(variable_name)
+
+        case Assign(variable=variable, value=value):
+            return _compile_assign(variable.variable_name, _compile(value))
+
+        case Add(left=left, right=right):
+            return _compile_add(_compile(left), _compile(right))
+
+        case Subtract(left=left, right=right):
+            return _compile_subtract(_compile(left), _compile(right))
+
+        case Multiply(left=left, right=right):
+            return _compile_multiply(_compile(left), _compile(right))
+
+        case Divide(left=left, right=right):
+            return _compile_divide(_compile(left), _compile(right))
+
+        case And(left=left, right=right):
+            return _compile_and(_compile(left), _compile(right))
+
+        case Or(left=left, right=right):
+            return _compile_or(_compile(left), _compile(right))
+
+        case Not(expr=expr):
+            return _compile_not(_compile(expr))
+
+        case If(condition=condition, true=true, false=false):
+            return _compile_if(_compile(condition), _compile(true), _compile(false))
+
+        case Lt(left=left, right=right):
+            return _compile_comparison("Lt", "<", operator.lt, False, _compile(left), _compile(right))
+
+        case Lte(left=left, right=right):
+            return _compile_comparison("Lte", "<=", operator.le, True, _compile(left), _compile(right))
+
+        case Gt(left=left, right=right):
+            return _compile_comparison("Gt", ">", operator.gt, False, _compile(left), _compile(right))
+
+        case Gte(left=left, right=right):
+            return _compile_comparison("Gte", ">=", operator.ge, True, _compile(left), _compile(right))
+
+        case Eq(left=left, right=right):
+            return _compile_comparison("Eq", "==", operator.eq, True, _compile(left), _compile(right))
+
+        case Ne(left=left, right=right):
+            return _compile_comparison("Ne", "!=", operator.ne, False, _compile(left), _compile(right))
+
+        case While(condition=condition, body=body):
+            return _compile_while(_compile(condition), _compile(body))
+
+        case _:
+            raise InterpSyntaxError("Unhandled!")
+
+
+def compile_stimpl(program: Expr) -> Compiled:
+    return _compile(program)
+
+
+def run_compiled(compiled: Compiled, state: Optional[State] = None) -> Tuple[Optional[Any], Type, State]:
+    if state is None:
+        state = EmptyState()
+    env = Environment(state)
+    value, value_type = compiled(env)
+    return (value, value_type, env.state)
@@ -8,9 +8,13 @@ class InterpError(Exception):
     super().__init__(error_msg)
 
 class InterpSyntaxError(InterpError):
-  def __init__(self, error_msg = None):
+  def __init__(self, error_msg = None, line = None, column = None):
     if error_msg == None:
       error_msg = "InterpSyntaxError"
+    self.line = line
+    self.column = column
+    if line != None:
+      error_msg = f"{error_msg} (line {line}, column {column})"
     super().__init__(error_msg)
 
 class InterpTypeError(InterpError):
@@ -25,5 +29,13 @@ class InterpMathError(InterpError):
       error_msg = "InterpMathError"
     super().__init__(error_msg)
 
+class InterpBudgetError(InterpError):
+  def __init__(self, error_msg = None, steps = None, state = None):
+    if error_msg == None:
+      error_msg = "InterpBudgetError"
+    self.steps = steps
+    self.state = state
+    super().__init__(error_msg)
+
 def pretty_type(value):
   return f"{str(type(value).__name__)}"
@@ -5,8 +5,121 @@ Expressions
 
 
 class Expr(object):
+    # Nodes are slotted: generated programs can have hundreds of thousands
+    # of them and a per-instance __dict__ would dominate their size.
+    #
+    # static_type is set by stimpl.typecheck on nodes whose type is proven
+    # before the program runs; evaluators skip dynamic type checks on
+    # those nodes.
+    #
+    # Nodes compare and hash structurally: two nodes are equal when they
+    # are of the same class and their labels (literal value, variable name)
+    # and children are equal. static_type and the evaluators' caches are
+    # not part of the structure. structural_hash caches the hash, so a
+    # node must not be changed once it has been hashed.
+    __slots__ = ("static_type", "structural_hash")
+
     def __init__(self):
-        pass
+        self.static_type = None
+        self.structural_hash = None
+
+    def label(self):
+        """
+        The part of the node that is not a child, as a hashable value.
+        """
+        return None
+
+    def children(self):
+        return ()
+
+    def __hash__(self):
+        if self.structural_hash is None:
+            _hash_structure(self)
+        return self.structural_hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Expr):
+            return NotImplemented
+        pending = [(self, other)]
+        while pending:
+            left, right = pending.pop()
+            if left is right:
+                continue
+            if type(left) is not type(right) or hash(left) != hash(right) \
+                    or left.label() != right.label():
+                return False
+            left_children = left.children()
+            right_children = right.children()
+            if len(left_children) != len(right_children):
+                return False
+            pending.extend(zip(left_children, right_children))
+        return True
+
+    def __getstate__(self):
+        # str hashes differ between processes, so a cached hash must not
+        # survive pickling.
+        slots = _pickled_slots.get(type(self))
+        if slots is None:
+            slots = _pickled_slots[type(self)] = tuple(
+                slot for cls in type(self).__mro__ for slot in getattr(cls, "__slots__", ())
+                if slot != "structural_hash")
+        return (None, {slot: getattr(self, slot) for slot in slots if hasattr(self, slot)})
+
+    def __setstate__(self, state):
+        self.structural_hash = None
+        for slot, value in state[1].items():
+            setattr(self, slot, value)
+
+
+_pickled_slots = {}
+
+
+def _hash_structure(expression):
+    # Iterative, so that deeply nested programs do not hit the recursion
+    # limit; subtrees that are already hashed are not visited again.
+    pending = [(expression, False)]
+    while pending:
+        node, expanded = pending.pop()
+        if node.structural_hash is not None:
+            continue
+        children = node.children()
+        if expanded:
+            node.structural_hash = hash(
+                (type(node), node.label(), tuple(child.structural_hash for child in children)))
+        else:
+            pending.append((node, True))
+            pending.extend((child, False) for child in children
+                           if child.structural_hash is None)
+
+
+def copy_tree(expression):
+    """
+    A copy of expression that shares no node with it, so that annotations
+    and caches stored on the copy's nodes never reach the original's.
+    """
+    # Post-order and iterative, like _hash_structure. Every node class is
+    # constructed from its children in order.
+    results = []
+    pending = [(expression, False)]
+    while pending:
+        node, expanded = pending.pop()
+        children = node.children()
+        if not expanded:
+            pending.append((node, True))
+            pending.extend((child, False) for child in reversed(children))
+            continue
+        match node:
+            case Literal(literal=literal):
+                results.append(type(node)(literal))
+            case Variable(variable_name=variable_name):
+                results.append(type(node)(variable_name))
+            case _:
+                copied = results[len(results) - len(children):]
+                del results[len(results) - len(children):]
+                results.append(type(node)(*copied))
+    return results[0]
 
 
 """
@@ -15,8 +128,10 @@ Unit expression.
 
 
 class Ren(Expr):
+    __slots__ = ()
+
     def __init__(self):
-        pass
+        super().__init__()
 
     def __repr__(self):
         return f"Ren value"
@@ -28,14 +143,26 @@ Literal expressions.
 
 
 class Literal(Expr):
+    __slots__ = ("literal",)
+
     def __init__(self, literal):
         self.literal = literal
+        super().__init__()
 
     def __repr__(self):
         return f"literal value: {self.literal}"
 
+    def label(self):
+        # Compare floats by their bits: 0.0 and -0.0 are different
+        # literals, and a NaN literal is equal to itself.
+        if type(self.literal) is float:
+            return (float, self.literal.hex())
+        return (type(self.literal), self.literal)
+
 
 class IntLiteral(Literal):
+    __slots__ = ()
+
     def __init__(self, literal):
         if type(literal) != int:
             raise InterpTypeError(
@@ -44,6 +171,8 @@ class IntLiteral(Literal):
 
 
 class FloatingPointLiteral(Literal):
+    __slots__ = ()
+
     def __init__(self, literal):
         if type(literal) != float:
             raise InterpTypeError(
@@ -52,6 +181,8 @@ class FloatingPointLiteral(Literal):
 
 
 class StringLiteral(Literal):
+    __slots__ = ()
+
     def __init__(self, literal):
         if type(literal) != str:
             raise InterpTypeError(
@@ -60,6 +191,8 @@ class StringLiteral(Literal):
 
 
 class BooleanLiteral(Literal):
+    __slots__ = ()
+
     def __init__(self, literal):
         if type(literal) != bool:
             raise InterpTypeError(
@@ -73,12 +206,18 @@ Variable Expression
 
 
 class Variable(Expr):
+    __slots__ = ("variable_name",)
+
     def __init__(self, variable_name):
         self.variable_name = variable_name
+        super().__init__()
 
     def __repr__(self):
         return f"Variable {self.variable_name}"
 
+    def label(self):
+        return self.variable_name
+
     def eval(self, state):
         return (state.get_value(self.variable_name), state)
 
@@ -89,22 +228,32 @@ Operators
 
 
 class Assign(Expr):
+    __slots__ = ("variable", "value")
+
     def __init__(self, variable, value):
         if not isinstance(variable, Variable):
             raise InterpSyntaxError("Must assign to a variable.")
         self.variable = variable
         self.value = value
+        super().__init__()
 
     def __repr__(self):
         return f"{self.variable} = {self.value}"
 
+    def children(self):
+        return (self.variable, self.value)
+
 
 class UnaryOperator(Expr):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
 
 class Print(UnaryOperator):
+    __slots__ = ("to_print",)
+
     def __init__(self, to_print):
         self.to_print = to_print
         super().__init__()
@@ -112,8 +261,13 @@ class Print(UnaryOperator):
     def __repr__(self):
         return f"Print {self.to_print}"
 
+    def children(self):
+        return (self.to_print,)
+
 
 class Not(UnaryOperator):
+    __slots__ = ("expr",)
+
     def __init__(self, expr):
         self.expr = expr
         super().__init__()
@@ -121,15 +275,28 @@ class Not(UnaryOperator):
     def __repr__(self):
         return f"Not {self.expr}"
 
+    def children(self):
+        return (self.expr,)
+
 
 class BinaryOperator(Expr):
+    # quickened is the evaluator's inline cache: the operand type this node
+    # last saw and the operation specialized to it.
+    __slots__ = ("left", "right", "quickened")
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
+        self.quickened = None
         super().__init__()
 
+    def children(self):
+        return (self.left, self.right)
+
 
 class And(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -138,6 +305,8 @@ class And(BinaryOperator):
 
 
 class Or(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -146,6 +315,8 @@ class Or(BinaryOperator):
 
 
 class Lt(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -154,6 +325,8 @@ class Lt(BinaryOperator):
 
 
 class Lte(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -162,6 +335,8 @@ class Lte(BinaryOperator):
 
 
 class Gt(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -170,6 +345,8 @@ class Gt(BinaryOperator):
 
 
 class Gte(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -178,6 +355,8 @@ class Gte(BinaryOperator):
 
 
 class Eq(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -186,6 +365,8 @@ class Eq(BinaryOperator):
 
 
 class Ne(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -194,6 +375,8 @@ class Ne(BinaryOperator):
 
 
 class Add(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -202,6 +385,8 @@ class Add(BinaryOperator):
 
 
 class Subtract(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -210,6 +395,8 @@ class Subtract(BinaryOperator):
 
 
 class Multiply(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -218,6 +405,8 @@ class Multiply(BinaryOperator):
 
 
 class Divide(BinaryOperator):
+    __slots__ = ()
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
@@ -231,8 +420,11 @@ Combining forms.
 
 
 class Program(Expr):
+    __slots__ = ("exprs",)
+
     def __init__(self, *exprs):
         self.exprs = exprs
+        super().__init__()
 
     def __repr__(self):
         exprs = self.exprs
@@ -240,10 +432,16 @@ class Program(Expr):
             exprs = ["None"]
         return "Program: " + ";\n".join([repr(x) for x in exprs])
 
+    def children(self):
+        return self.exprs
+
 
 class Sequence(Expr):
+    __slots__ = ("exprs",)
+
     def __init__(self, *exprs):
         self.exprs = exprs
+        super().__init__()
 
     def __repr__(self):
         exprs = self.exprs
@@ -251,21 +449,36 @@ class Sequence(Expr):
             exprs = ["None"]
         return "Sequence: " + ";\n".join([repr(x) for x in exprs])
 
+    def children(self):
+        return self.exprs
+
 
 class If(Expr):
+    __slots__ = ("condition", "true", "false")
+
     def __init__(self, condition, true, false):
         self.condition = condition
         self.true = true
         self.false = false
+        super().__init__()
 
     def __repr__(self):
         return f"if ({self.condition}) then {{ {self.true} }} else {{ {self.false} }}"
 
+    def children(self):
+        return (self.condition, self.true, self.false)
+
 
 class While(Expr):
+    __slots__ = ("condition", "body")
+
     def __init__(self, condition, body):
         self.condition = condition
         self.body = body
+        super().__init__()
 
     def __repr__(self):
         return f"while ({self.condition}) {{ {self.body} }}"
+
+    def children(self):
+        return (self.condition, self.body)
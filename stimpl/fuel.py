@@ -0,0 +1,100 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+from stimpl.errors import *
+
+"""
+Fuel.
+
+A FuelMeter bounds how much work evaluate does. Fuel is spent one unit
+per While iteration -- loops are the only way a program runs for longer
+than its size -- rather than per node, so metering costs a decrement and
+a comparison per iteration. evaluate raises InterpBudgetError when an
+iteration would take more than the fuel given, with the number of
+iterations run and the State at the start of the refused iteration.
+
+A meter can also checkpoint: every checkpoint_every iterations, it calls
+checkpoint with the number of iterations run so far and the State at that
+point, so a long run leaves partial results behind as it goes.
+
+run_stimpl's fuel argument installs a meter for a run with the tree
+engine; metering installs one for the duration of a block.
+"""
+
+
+class FuelMeter(object):
+    __slots__ = ("fuel", "checkpoint", "checkpoint_every", "used", "period", "countdown")
+
+    def __init__(self, fuel: Optional[int] = None,
+                 checkpoint: Optional[Callable[[int, Any], None]] = None,
+                 checkpoint_every: Optional[int] = None) -> None:
+        if fuel is not None and fuel < 0:
+            raise ValueError("fuel must not be negative.")
+        if checkpoint is not None and (checkpoint_every is None or checkpoint_every < 1):
+            raise ValueError("checkpoint_every must be a positive number of iterations.")
+        self.fuel = fuel
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every if checkpoint is not None else None
+        # Iterations are counted in periods that end at the next
+        # checkpoint or when the fuel runs out, whichever comes first:
+        # used is the length of the periods before the current one and
+        # countdown the iterations left in it.
+        self.used = 0
+        self.period = self._next_period()
+        self.countdown = self.period
+
+    def _next_period(self) -> int:
+        periods = []
+        if self.fuel is not None:
+            periods.append(self.fuel - self.used)
+        if self.checkpoint_every is not None:
+            periods.append(self.checkpoint_every)
+        # A meter without limits only counts.
+        return min(periods) if periods else 1 << 62
+
+    @property
+    def steps(self) -> int:
+        """
+        The number of While iterations run so far.
+        """
+        return self.used + self.period - self.countdown
+
+    def __repr__(self) -> str:
+        return f"<FuelMeter: {self.steps} of {self.fuel} iterations>"
+
+    def tick(self, state: Any) -> None:
+        """
+        Called by evaluate when an iteration would overrun the current
+        period, with the State it starts in.
+        """
+        self.used += self.period
+        if self.checkpoint is not None and self.used and self.used % self.checkpoint_every == 0:
+            self.checkpoint(self.used, state.snapshot())
+        if self.fuel is not None and self.used >= self.fuel:
+            # Leave the meter exhausted for any later iteration too.
+            self.period = self.countdown = 0
+            raise InterpBudgetError(f"Program ran out of fuel after {self.used} iterations.",
+                                    self.used, state.snapshot())
+        self.period = self._next_period()
+        # The iteration that ran over is the first of the new period.
+        self.countdown = self.period - 1
+
+
+_current_meter: ContextVar[Optional[FuelMeter]] = ContextVar("stimpl_fuel", default=None)
+
+
+def current_meter() -> Optional[FuelMeter]:
+    return _current_meter.get()
+
+
+@contextmanager
+def metering(meter: FuelMeter) -> Iterator[FuelMeter]:
+    """
+    Meter evaluate's While iterations with meter inside the block.
+    """
+    token = _current_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _current_meter.reset(token)
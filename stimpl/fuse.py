@@ -0,0 +1,168 @@
+import operator
+from typing import Any, Optional, Tuple
+
+from stimpl.expression import *
+from stimpl.types import *
+
+"""
+Superinstructions.
+
+fuse rewrites common idioms into fused nodes that the tree evaluator runs
+in a single step:
+
+  IncrementVariable        i = i + <Integer literal>
+  AssignBinaryOperation    x = a <op> b, where a and b are variables or
+                           literals
+  WhileVariableComparison  while (v <cmp> <literal>) ...
+  IfVariableComparison     if (v <cmp> <literal>) ...
+
+Each fused node is a subclass of the node it replaces and keeps the
+original children, so every other engine and pass still sees an ordinary
+Assign, While or If. When a fused node's fast path does not apply (an
+operand is unbound, the types do not match, ...), evaluate falls back to
+the generic code for the original node, which raises the usual errors.
+"""
+
+_LEAF_LITERALS = {
+    IntLiteral: INTEGER,
+    FloatingPointLiteral: FLOATING_POINT,
+    StringLiteral: STRING,
+    BooleanLiteral: BOOLEAN,
+}
+
+_COMPARISONS = {
+    Lt: operator.lt,
+    Lte: operator.le,
+    Gt: operator.gt,
+    Gte: operator.ge,
+    Eq: operator.eq,
+    Ne: operator.ne,
+}
+
+
+def _operand(expression: Expr) -> Optional[Tuple[Optional[str], Optional[Tuple[Any, Type]]]]:
+    """
+    Describe a leaf operand as (variable name, None) or (None, (value,
+    type)); None if expression is not a leaf.
+    """
+    if isinstance(expression, Variable):
+        return (expression.variable_name, None)
+    if type(expression) in _LEAF_LITERALS:
+        return (None, (expression.literal, _LEAF_LITERALS[type(expression)]))
+    if isinstance(expression, Ren):
+        return (None, UNIT_VALUE)
+    return None
+
+
+def _comparison(condition: Expr) -> bool:
+    return type(condition) in _COMPARISONS and isinstance(condition.left, Variable) \
+        and type(condition.right) in _LEAF_LITERALS
+
+
+class IncrementVariable(Assign):
+    __slots__ = ("amount",)
+
+    def __init__(self, variable: Variable, value: Add) -> None:
+        super().__init__(variable, value)
+        self.amount = value.right.literal
+
+
+class AssignBinaryOperation(Assign):
+    __slots__ = ("operator_class", "left_operand", "right_operand")
+
+    def __init__(self, variable: Variable, value: BinaryOperator) -> None:
+        super().__init__(variable, value)
+        self.operator_class = type(value)
+        self.left_operand = _operand(value.left)
+        self.right_operand = _operand(value.right)
+
+
+class WhileVariableComparison(While):
+    __slots__ = ("variable_name", "compare", "constant", "constant_type")
+
+    def __init__(self, condition: BinaryOperator, body: Expr) -> None:
+        super().__init__(condition, body)
+        self.variable_name = condition.left.variable_name
+        self.compare = _COMPARISONS[type(condition)]
+        self.constant = condition.right.literal
+        self.constant_type = _LEAF_LITERALS[type(condition.right)]
+
+
+class IfVariableComparison(If):
+    __slots__ = ("variable_name", "compare", "constant", "constant_type")
+
+    def __init__(self, condition: BinaryOperator, true: Expr, false: Expr) -> None:
+        super().__init__(condition, true, false)
+        self.variable_name = condition.left.variable_name
+        self.compare = _COMPARISONS[type(condition)]
+        self.constant = condition.right.literal
+        self.constant_type = _LEAF_LITERALS[type(condition.right)]
+
+
+class _Fuser(object):
+    def __init__(self) -> None:
+        self.fused = 0
+
+    def fuse(self, expression: Expr) -> Expr:
+        match expression:
+            case Print(to_print=to_print):
+                to_print = self.fuse(to_print)
+                return expression if to_print is expression.to_print else Print(to_print)
+
+            case Program(exprs=exprs):
+                return Program(*[self.fuse(expr) for expr in exprs])
+
+            case Sequence(exprs=exprs):
+                return Sequence(*[self.fuse(expr) for expr in exprs])
+
+            case Assign(variable=variable, value=value):
+                if isinstance(value, Add) and isinstance(value.left, Variable) \
+                        and value.left.variable_name == variable.variable_name \
+                        and type(value.right) is IntLiteral:
+                    self.fused += 1
+                    return IncrementVariable(variable, value)
+                if isinstance(value, BinaryOperator) and _operand(value.left) is not None \
+                        and _operand(value.right) is not None:
+                    self.fused += 1
+                    return AssignBinaryOperation(variable, value)
+                fused_value = self.fuse(value)
+                return expression if fused_value is value else Assign(variable, fused_value)
+
+            case Not(expr=expr):
+                fused_expr = self.fuse(expr)
+                return expression if fused_expr is expr else Not(fused_expr)
+
+            case BinaryOperator(left=left, right=right):
+                fused_left = self.fuse(left)
+                fused_right = self.fuse(right)
+                if fused_left is left and fused_right is right:
+                    return expression
+                return type(expression)(fused_left, fused_right)
+
+            case If(condition=condition, true=true, false=false):
+                true = self.fuse(true)
+                false = self.fuse(false)
+                if _comparison(condition):
+                    self.fused += 1
+                    return IfVariableComparison(condition, true, false)
+                return If(self.fuse(condition), true, false)
+
+            case While(condition=condition, body=body):
+                body = self.fuse(body)
+                if _comparison(condition):
+                    self.fused += 1
+                    return WhileVariableComparison(condition, body)
+                return While(self.fuse(condition), body)
+
+        return expression
+
+
+def fuse(program: Expr) -> Tuple[Expr, int]:
+    """
+    Return a copy of program with common idioms replaced by fused nodes,
+    and the number of nodes fused. Unchanged subtrees are shared with
+    program.
+    """
+    fuser = _Fuser()
+    fused = fuser.fuse(program)
+    return (fused, fuser.fused)
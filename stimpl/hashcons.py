@@ -0,0 +1,82 @@
+from typing import Dict, Tuple
+
+from stimpl.expression import *
+
+"""
+Hash-consing.
+
+A HashConser keeps one instance of every structurally distinct node it has
+seen: make and intern return that shared instance instead of a new node
+whenever a structurally equal one already exists, so repeated subtrees are
+stored once and the program becomes a DAG.
+
+Shared nodes must be treated as immutable. The per-node state the
+evaluators keep is safe to share: typecheck annotations depend only on the
+subtree and the program's variable types, the binary operators' inline
+caches fall back to the generic code when an operand type differs, and
+the profiler and the JIT simply count every occurrence of a shared node
+together.
+"""
+
+
+class HashConser(object):
+    def __init__(self) -> None:
+        self.table: Dict[Expr, Expr] = {}
+        self.requests = 0
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def share(self, expression: Expr) -> Expr:
+        """
+        The shared instance structurally equal to expression, whose
+        children must already be shared.
+        """
+        self.requests += 1
+        return self.table.setdefault(expression, expression)
+
+    def make(self, cls, *args) -> Expr:
+        """
+        Build cls(*args) from shared children, returning the shared
+        instance.
+        """
+        return self.share(cls(*args))
+
+    def intern(self, expression: Expr) -> Expr:
+        """
+        A copy of expression in which every subtree is a shared instance.
+        Subtrees that are already shared are reused, not copied.
+        """
+        # Post-order and iterative: each node is rebuilt from its shared
+        # children once they have all been interned.
+        results = []
+        pending = [(expression, False)]
+        while pending:
+            node, expanded = pending.pop()
+            if not expanded:
+                pending.append((node, True))
+                pending.extend((child, False) for child in reversed(node.children()))
+                continue
+            count = len(node.children())
+            children = results[len(results) - count:]
+            del results[len(results) - count:]
+            results.append(self.share(_rebuild(node, children)))
+        return results[0]
+
+
+def _rebuild(node: Expr, children) -> Expr:
+    if all(new is old for new, old in zip(children, node.children())):
+        return node
+    # Every node class is constructed from its children in order; fused
+    # nodes recompute their extra fields from them.
+    return type(node)(*children)
+
+
+def hash_cons(program: Expr) -> Tuple[Expr, int]:
+    """
+    Return a copy of program in which structurally equal subtrees are one
+    shared instance, and the number of distinct nodes.
+    """
+    conser = HashConser()
+    shared = conser.intern(program)
+    return (shared, len(conser))
@@ -0,0 +1,145 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import stimpl.runtime
+from stimpl.expression import *
+from stimpl.types import *
+from stimpl.errors import *
+from stimpl.runtime import evaluation_hook, State
+from stimpl.transpile import Transpiled, transpile, run_transpiled, _variable_names
+
+"""
+Tiered execution of While loops.
+
+While a JIT is active, the tree evaluator runs as usual except that every
+While it evaluates in the current context goes through the JIT, which counts the loop's iterations. Once a loop
+has run threshold iterations, the JIT records the types its variables have
+in the State at that point and transpiles the loop into a Python function
+specialized to those types; the remaining iterations, and later runs of
+the loop, use that function.
+
+The types are the loop's guard: a compiled version only runs when every
+variable the loop uses has the type it was compiled for (or is unbound, if
+it was unbound then). Inside the loop the types cannot change -- the
+transpiler only treats a variable as typed when every assignment to it is
+proven to keep its type -- so the guard is checked once per entry. When it
+fails, the loop is interpreted by evaluate and may be compiled again for
+the new types, up to max_versions versions per loop.
+"""
+
+
+class LoopStats(object):
+    def __init__(self, node: While) -> None:
+        self.node = node
+        self.entries = 0
+        self.interpreted_iterations = 0
+        self.compiled_entries = 0
+        self.guard_failures = 0
+        self.compile_time = 0.0
+        self.names: List[str] = []
+        self.versions: Dict[Tuple[Optional[Type], ...], Transpiled] = {}
+        self.uncompilable = False
+
+    def __repr__(self) -> str:
+        return f"<LoopStats: {self.entries} entries, {len(self.versions)} versions, {self.guard_failures} guard failures>"
+
+
+class JIT(object):
+    def __init__(self, threshold: int = 100, max_versions: int = 4) -> None:
+        self.threshold = threshold
+        self.max_versions = max_versions
+        self.loops: Dict[int, LoopStats] = {}
+
+    def signature(self, stats: LoopStats, state: State) -> Tuple[Optional[Type], ...]:
+        signature = []
+        for name in stats.names:
+            result = state.get_value(name)
+            signature.append(None if result is None else result[1])
+        return tuple(signature)
+
+    def compile(self, stats: LoopStats, state: State) -> Optional[Transpiled]:
+        start = time.perf_counter()
+        try:
+            # transpile type checks a copy of the loop, so annotations that
+            # only hold for these types never reach the nodes evaluate runs.
+            variable_types = {}
+            for name in _variable_names(stats.node):
+                result = state.get_value(name)
+                if result is not None:
+                    variable_types[name] = result[1]
+            transpiled = transpile(stats.node, variable_types)
+        except RecursionError:
+            stats.uncompilable = True
+            return None
+        finally:
+            stats.compile_time += time.perf_counter() - start
+
+        stats.names = transpiled.names
+        stats.versions[self.signature(stats, state)] = transpiled
+        return transpiled
+
+    def run_loop(self, expression: While, state: State, evaluate) -> Tuple[Optional[Any], Type, State]:
+        stats = self.loops.get(id(expression))
+        if stats is None:
+            stats = self.loops[id(expression)] = LoopStats(expression)
+        stats.entries += 1
+
+        if stats.versions:
+            transpiled = stats.versions.get(self.signature(stats, state))
+            if transpiled is not None:
+                stats.compiled_entries += 1
+                return run_transpiled(transpiled, state)
+            stats.guard_failures += 1
+
+        condition = expression.condition
+        body = expression.body
+        iterations = 0
+        while True:
+            condition_value, condition_type, state = evaluate(condition, state)
+            if condition_type is not BOOLEAN:
+                raise InterpTypeError(
+                    f"Cannot use {condition_type} as a While condition.")
+            if not condition_value:
+                stats.interpreted_iterations += iterations
+                return (False, BOOLEAN, state)
+            _, _, state = evaluate(body, state)
+            iterations += 1
+
+            if iterations == self.threshold and not stats.uncompilable \
+                    and len(stats.versions) < self.max_versions:
+                stats.interpreted_iterations += iterations
+                transpiled = self.compile(stats, state)
+                if transpiled is not None:
+                    stats.compiled_entries += 1
+                    return run_transpiled(transpiled, state)
+                iterations = 0
+
+    def report(self) -> str:
+        lines = [f"{'loop':<40}{'entries':>9}{'compiled':>10}{'versions':>10}"
+                 f"{'bailouts':>10}{'interpreted':>13}"]
+        for stats in self.loops.values():
+            label = f"{stats.node}"
+            if len(label) > 38:
+                label = label[:35] + "..."
+            lines.append(f"{label:<40}{stats.entries:>9}{stats.compiled_entries:>10}"
+                         f"{len(stats.versions):>10}{stats.guard_failures:>10}"
+                         f"{stats.interpreted_iterations:>13}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def tiered(jit: Optional[JIT] = None) -> Iterator[JIT]:
+    """
+    Run every tree-engine While inside the block through jit.
+    """
+    if jit is None:
+        jit = JIT()
+
+    def tiered_evaluate(expression, state, proceed):
+        if isinstance(expression, While):
+            return jit.run_loop(expression, state, stimpl.runtime.evaluate)
+        return proceed(expression, state)
+
+    with evaluation_hook(tiered_evaluate):
+        yield jit
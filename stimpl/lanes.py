@@ -0,0 +1,405 @@
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence as SequenceType, Tuple, Union
+
+import stimpl.runtime
+from stimpl.batch import ProgramResult
+from stimpl.errors import *
+from stimpl.expression import *
+from stimpl.output import CollectingSink, redirect_output, render
+from stimpl.runtime import State, EmptyState
+from stimpl.types import *
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+"""
+Vectorized multi-lane execution.
+
+run_lanes runs one program over a batch of initial environments at once.
+Every value is a NumPy array with one element per lane, so arithmetic,
+comparisons and logic cost one array operation per expression whatever
+the number of lanes. If and While run their branches and bodies under a
+mask of the lanes that take them, and a lane stops where its division by
+zero or read of an unassigned variable would have raised, with that
+error, while the others carry on.
+
+Integers are int64 and Integer division floors, as in evaluate. A lane
+whose execution the arrays cannot follow exactly -- an operation that
+could overflow int64, a type error, a variable that would hold different
+types in different lanes -- is ejected and run again from its initial
+environment with evaluate, so every lane's value, final bindings, output
+and error are the ones evaluate gives.
+
+NumPy is optional: the rest of the package works without it, and
+run_lanes raises ImportError if it is not installed.
+"""
+
+# Integers at least this large in magnitude may overflow int64 when
+# added, subtracted or divided, so lanes holding them are ejected.
+_LIMIT = 1 << 62
+
+if np is not None:
+    _DTYPES = {INTEGER: np.int64, FLOATING_POINT: np.float64, BOOLEAN: np.bool_, STRING: object}
+    _COMPARISONS = {Lt: np.less, Lte: np.less_equal, Gt: np.greater,
+                    Gte: np.greater_equal, Eq: np.equal, Ne: np.not_equal}
+    _ARITHMETIC = {Add: np.add, Subtract: np.subtract, Multiply: np.multiply}
+
+# The result of a comparison of two Units.
+_UNIT_COMPARISONS = {Lt: False, Lte: True, Gt: False, Gte: True, Eq: True, Ne: False}
+
+# Lanes is the vector of a value's lanes; None for Unit values.
+Lanes = Any
+
+
+def _type_of(value: Any) -> Optional[Type]:
+    if value is None:
+        return UNIT
+    if isinstance(value, bool):
+        return BOOLEAN
+    if isinstance(value, int):
+        return INTEGER
+    if isinstance(value, float):
+        return FLOATING_POINT
+    if isinstance(value, str):
+        return STRING
+    return None
+
+
+def _bindings(environment: Union[State, Mapping[str, Any]]) -> Dict[str, Tuple[Any, Type]]:
+    if isinstance(environment, State):
+        return dict(environment.snapshot().bindings.items())
+    bindings = {}
+    for variable_name, value in environment.items():
+        value_type = _type_of(value)
+        if value_type is None:
+            raise InterpTypeError(f"Cannot bind {variable_name} to a {pretty_type(value)}.")
+        bindings[variable_name] = (value, value_type)
+    return bindings
+
+
+def _python(values: Lanes, value_type: Type, lane: int) -> Any:
+    if value_type is UNIT:
+        return None
+    value = values[lane]
+    if value_type is INTEGER:
+        return int(value)
+    if value_type is FLOATING_POINT:
+        return float(value)
+    if value_type is BOOLEAN:
+        return bool(value)
+    return value
+
+
+class _Column(object):
+    """
+    A variable's type and its value in every lane, with the lanes it is
+    bound in. Arrays are never modified once built, so a value read from
+    a variable is unaffected by later assignments to it.
+    """
+    __slots__ = ("type", "values", "bound")
+
+    def __init__(self, value_type: Type, values: Lanes, bound: Any) -> None:
+        self.type = value_type
+        self.values = values
+        self.bound = bound
+
+
+class _Lanes(object):
+    def __init__(self, count: int) -> None:
+        self.count = count
+        self.alive = np.ones(count, dtype=bool)
+        self.ejected = np.zeros(count, dtype=bool)
+        self.errors: List[Optional[BaseException]] = [None] * count
+        self.output: List[List[str]] = [[] for _ in range(count)]
+        self.columns: Dict[str, _Column] = {}
+        self.constants: Dict[int, Tuple[Lanes, Type]] = {}
+        self.false = np.zeros(count, dtype=bool)
+
+    def eject(self, mask: Any) -> None:
+        self.ejected |= mask
+        self.alive &= ~mask
+
+    def fail(self, mask: Any, error: type, message: str) -> None:
+        for lane in np.flatnonzero(mask):
+            self.errors[lane] = error(message)
+        self.alive &= ~mask
+
+    def bind(self, bindings: List[Dict[str, Tuple[Any, Type]]]) -> None:
+        """
+        Build the columns of the initial environments. Lanes that bind a
+        variable to another type than most lanes do, or to an integer that
+        is too large, are ejected.
+        """
+        names = {variable_name for lane_bindings in bindings for variable_name in lane_bindings}
+        for variable_name in sorted(names):
+            counts: Dict[Type, int] = {}
+            for lane_bindings in bindings:
+                if variable_name in lane_bindings:
+                    value_type = lane_bindings[variable_name][1]
+                    counts[value_type] = counts.get(value_type, 0) + 1
+            column_type = max(counts, key=counts.get)
+
+            bound = np.zeros(self.count, dtype=bool)
+            values = [""] * self.count if column_type is STRING else [0] * self.count
+            for lane, lane_bindings in enumerate(bindings):
+                if variable_name not in lane_bindings:
+                    continue
+                value, value_type = lane_bindings[variable_name]
+                if value_type is not column_type or (value_type is INTEGER and abs(value) >= _LIMIT):
+                    self.eject(np.arange(self.count) == lane)
+                else:
+                    bound[lane] = True
+                    values[lane] = value
+            self.columns[variable_name] = _Column(
+                column_type, None if column_type is UNIT else np.array(values, dtype=_DTYPES[column_type]),
+                bound)
+
+    def constant(self, expression: Literal, mask: Any) -> Optional[Tuple[Lanes, Type]]:
+        result = self.constants.get(id(expression))
+        if result is None:
+            literal = expression.literal
+            match expression:
+                case IntLiteral() if abs(literal) >= _LIMIT:
+                    self.eject(mask)
+                    return None
+                case IntLiteral():
+                    result = (np.full(self.count, literal, dtype=np.int64), INTEGER)
+                case FloatingPointLiteral():
+                    result = (np.full(self.count, literal, dtype=np.float64), FLOATING_POINT)
+                case StringLiteral():
+                    result = (np.full(self.count, literal, dtype=object), STRING)
+                case BooleanLiteral():
+                    result = (np.full(self.count, literal, dtype=bool), BOOLEAN)
+            self.constants[id(expression)] = result
+        return result
+
+    def binary_operation(self, expression: BinaryOperator, mask: Any) -> Optional[Tuple[Lanes, Type]]:
+        left = self.evaluate(expression.left, mask)
+        if left is None:
+            return None
+        right = self.evaluate(expression.right, mask)
+        if right is None:
+            return None
+        mask = mask & self.alive
+        left_values, left_type = left
+        right_values, right_type = right
+        operator = type(expression)
+
+        if left_type is not right_type:
+            self.eject(mask)
+            return None
+
+        if operator in _UNIT_COMPARISONS:
+            if left_type is UNIT:
+                return (np.full(self.count, _UNIT_COMPARISONS[operator]), BOOLEAN)
+            return (_COMPARISONS[operator](left_values, right_values).astype(bool, copy=False), BOOLEAN)
+
+        if operator is And or operator is Or:
+            if left_type is not BOOLEAN:
+                self.eject(mask)
+                return None
+            combine = np.logical_and if operator is And else np.logical_or
+            return (combine(left_values, right_values), BOOLEAN)
+
+        if left_type is STRING and operator is Add:
+            return (np.add(left_values, right_values), STRING)
+        if left_type is not INTEGER and left_type is not FLOATING_POINT:
+            self.eject(mask)
+            return None
+
+        if left_type is INTEGER:
+            if operator is Multiply:
+                risky = np.abs(left_values.astype(np.float64) * right_values) >= _LIMIT
+            else:
+                risky = (left_values >= _LIMIT) | (left_values <= -_LIMIT)
+                if operator is not Divide:
+                    risky |= (right_values >= _LIMIT) | (right_values <= -_LIMIT)
+            risky &= mask
+            if risky.any():
+                self.eject(risky)
+                mask = mask & ~risky
+                if not mask.any():
+                    return None
+
+        if operator is Divide:
+            zero = mask & (right_values == 0)
+            if zero.any():
+                self.fail(zero, InterpMathError, "Cannot divide by zero.")
+                if not (mask & self.alive).any():
+                    return None
+            right_values = np.where(right_values == 0, 1, right_values)
+            if left_type is INTEGER:
+                return (np.floor_divide(left_values, right_values), INTEGER)
+            return (np.true_divide(left_values, right_values), FLOATING_POINT)
+
+        return (_ARITHMETIC[operator](left_values, right_values), left_type)
+
+    def evaluate(self, expression: Expr, mask: Any) -> Optional[Tuple[Lanes, Type]]:
+        """
+        The value of expression in the lanes of mask that are still alive,
+        or None if none are. Values in other lanes are unspecified.
+        """
+        mask = mask & self.alive
+        if not mask.any():
+            return None
+
+        match expression:
+            case Ren():
+                return (None, UNIT)
+
+            case Literal():
+                return self.constant(expression, mask)
+
+            case Variable(variable_name=variable_name):
+                column = self.columns.get(variable_name)
+                unbound = mask if column is None else mask & ~column.bound
+                if unbound.any():
+                    self.fail(unbound, InterpSyntaxError,
+                              f"Cannot read from {variable_name} before assignment.")
+                    if column is None or not (mask & self.alive).any():
+                        return None
+                return (column.values, column.type)
+
+            case Print(to_print=to_print):
+                result = self.evaluate(to_print, mask)
+                if result is None:
+                    return None
+                values, value_type = result
+                for lane in np.flatnonzero(mask & self.alive):
+                    self.output[lane].append(render(_python(values, value_type, lane), value_type))
+                return result
+
+            case Sequence(exprs=exprs) | Program(exprs=exprs):
+                result = (None, UNIT)
+                for expr in exprs:
+                    result = self.evaluate(expr, mask)
+                    if result is None:
+                        return None
+                return result
+
+            case Assign(variable=variable, value=value):
+                result = self.evaluate(value, mask)
+                if result is None:
+                    return None
+                mask = mask & self.alive
+                values, value_type = result
+                column = self.columns.get(variable.variable_name)
+                if column is None or not (column.bound & self.alive).any():
+                    self.columns[variable.variable_name] = _Column(value_type, values, mask)
+                elif column.type is value_type:
+                    if value_type is not UNIT:
+                        column.values = np.where(mask, values, column.values)
+                    column.bound = column.bound | mask
+                else:
+                    # A type error in the lanes that have it bound, and
+                    # a variable of two types in the others.
+                    self.eject(mask)
+                    return None
+                return result
+
+            case Not(expr=expr):
+                result = self.evaluate(expr, mask)
+                if result is None:
+                    return None
+                if result[1] is not BOOLEAN:
+                    self.eject(mask)
+                    return None
+                return (np.logical_not(result[0]), BOOLEAN)
+
+            case BinaryOperator():
+                return self.binary_operation(expression, mask)
+
+            case If(condition=condition, true=true, false=false):
+                result = self.evaluate(condition, mask)
+                if result is None:
+                    return None
+                mask = mask & self.alive
+                if result[1] is not BOOLEAN:
+                    self.eject(mask)
+                    return None
+                true_mask = mask & result[0]
+                false_mask = mask & ~result[0]
+                true_result = self.evaluate(true, true_mask)
+                false_result = self.evaluate(false, false_mask)
+                if true_result is None or false_result is None:
+                    return false_result if true_result is None else true_result
+                if true_result[1] is not false_result[1]:
+                    # Lanes that took the false branch hold a value of
+                    # another type.
+                    self.eject(false_mask)
+                    return true_result
+                if true_result[1] is UNIT:
+                    return true_result
+                return (np.where(true_mask, true_result[0], false_result[0]), true_result[1])
+
+            case While(condition=condition, body=body):
+                active = mask
+                while True:
+                    result = self.evaluate(condition, active)
+                    if result is None:
+                        break
+                    active = active & self.alive
+                    if result[1] is not BOOLEAN:
+                        self.eject(active)
+                        break
+                    active = active & result[0]
+                    if not active.any():
+                        break
+                    self.evaluate(body, active)
+                if not (mask & self.alive).any():
+                    return None
+                return (self.false, BOOLEAN)
+
+            case _:
+                raise InterpSyntaxError("Unhandled!")
+
+
+def _run_scalar(index: int, program: Expr, bindings: Dict[str, Tuple[Any, Type]]) -> ProgramResult:
+    state = EmptyState()
+    for variable_name, (value, value_type) in bindings.items():
+        state = state.set_value(variable_name, value, value_type)
+    sink = CollectingSink()
+    start = time.perf_counter()
+    try:
+        with redirect_output(sink):
+            value, value_type, state = stimpl.runtime.evaluate(program, state)
+    except Exception as error:
+        return ProgramResult(index, None, None, None, sink.lines, error,
+                             time.perf_counter() - start)
+    return ProgramResult(index, value, value_type, dict(state.snapshot().bindings.items()),
+                         sink.lines, None, time.perf_counter() - start)
+
+
+def run_lanes(program: Expr, environments: SequenceType[Union[State, Mapping[str, Any]]]) -> List[ProgramResult]:
+    """
+    Run program once for each initial environment -- a State, or a
+    mapping from variable names to Python values -- and return a
+    ProgramResult per environment, in order. The lanes that run together
+    all report the time of the whole vectorized run as their elapsed time.
+    """
+    if np is None:
+        raise ImportError("run_lanes requires NumPy.")
+    bindings = [_bindings(environment) for environment in environments]
+    lanes = _Lanes(len(bindings))
+    start = time.perf_counter()
+    with np.errstate(all="ignore"):
+        lanes.bind(bindings)
+        result = lanes.evaluate(program, lanes.alive.copy())
+    elapsed = time.perf_counter() - start
+
+    results = []
+    for lane in range(lanes.count):
+        if lanes.ejected[lane]:
+            results.append(_run_scalar(lane, program, bindings[lane]))
+        elif lanes.errors[lane] is not None:
+            results.append(ProgramResult(lane, None, None, None, lanes.output[lane],
+                                         lanes.errors[lane], elapsed))
+        else:
+            values, value_type = result
+            state = {variable_name: (_python(column.values, column.type, lane), column.type)
+                     for variable_name, column in lanes.columns.items() if column.bound[lane]}
+            results.append(ProgramResult(lane, _python(values, value_type, lane), value_type,
+                                         state, lanes.output[lane], None, elapsed))
+    return results
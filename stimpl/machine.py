@@ -0,0 +1,228 @@
+from typing import Any, Optional, Tuple
+
+from stimpl.bytecode import BINARY_OPCODES
+from stimpl.expression import *
+from stimpl.types import *
+from stimpl.errors import *
+from stimpl.fuse import IncrementVariable, AssignBinaryOperation, WhileVariableComparison, IfVariableComparison
+from stimpl.output import print_value
+from stimpl.runtime import State, EmptyState
+from stimpl.vm import binary_operation
+
+"""
+Iterative evaluation.
+
+A Machine evaluates a program without recursing through Python frames: the
+pending work lives on an explicit continuation stack, so nesting depth is
+limited only by memory. Each stack frame is a list
+
+  [node, stage, saved]
+
+where stage records how far evaluation of node has progressed and saved
+holds an intermediate result (the left operand of a binary operator, or
+the position in a Sequence). The result of the most recently completed
+node is kept in the machine's register as a (value, type) pair.
+
+Because all of its state is explicit, a Machine can be stopped after any
+number of steps and resumed later.
+"""
+
+_LITERAL = 0
+_VARIABLE = 1
+_ASSIGN = 2
+_BINARY = 3
+_SEQUENCE = 4
+_WHILE = 5
+_IF = 6
+_NOT = 7
+_PRINT = 8
+_REN = 9
+
+_KINDS = {
+    IntLiteral: _LITERAL,
+    FloatingPointLiteral: _LITERAL,
+    StringLiteral: _LITERAL,
+    BooleanLiteral: _LITERAL,
+    Ren: _REN,
+    Variable: _VARIABLE,
+    Assign: _ASSIGN,
+    Sequence: _SEQUENCE,
+    Program: _SEQUENCE,
+    While: _WHILE,
+    If: _IF,
+    Not: _NOT,
+    Print: _PRINT,
+}
+_KINDS.update((operator_class, _BINARY) for operator_class in BINARY_OPCODES)
+# Fused nodes run as the nodes they replace.
+_KINDS.update({
+    IncrementVariable: _ASSIGN,
+    AssignBinaryOperation: _ASSIGN,
+    WhileVariableComparison: _WHILE,
+    IfVariableComparison: _IF,
+})
+
+_LITERAL_TYPES = {
+    IntLiteral: INTEGER,
+    FloatingPointLiteral: FLOATING_POINT,
+    StringLiteral: STRING,
+    BooleanLiteral: BOOLEAN,
+}
+
+
+class Machine(object):
+    def __init__(self, program: Expr, state: Optional[State] = None) -> None:
+        self.program = program
+        self.state = EmptyState() if state is None else state
+        self.stack = [[program, 0, None]]
+        self.register = UNIT_VALUE
+        self.steps = 0
+
+    @property
+    def finished(self) -> bool:
+        return not self.stack
+
+    def result(self) -> Tuple[Optional[Any], Type, State]:
+        if self.stack:
+            raise RuntimeError("The machine has not finished running.")
+        value, value_type = self.register
+        return (value, value_type, self.state)
+
+    def run(self, max_steps: Optional[int] = None) -> bool:
+        """
+        Run until the program finishes or max_steps steps have been taken.
+        Returns True if the program finished.
+        """
+        stack = self.stack
+        push = stack.append
+        pop = stack.pop
+        kinds = _KINDS
+        register = self.register
+        state = self.state
+        steps = 0
+        limit = -1 if max_steps is None else max_steps
+
+        try:
+            while stack and steps != limit:
+                steps += 1
+                frame = stack[-1]
+                node = frame[0]
+                kind = kinds.get(type(node))
+
+                if kind == _LITERAL:
+                    register = (node.literal, _LITERAL_TYPES[type(node)])
+                    pop()
+
+                elif kind == _VARIABLE:
+                    register = state.get_value(node.variable_name)
+                    if register == None:
+                        raise InterpSyntaxError(
+                            f"Cannot read from {node.variable_name} before assignment.")
+                    pop()
+
+                elif kind == _BINARY:
+                    stage = frame[1]
+                    if stage == 0:
+                        frame[1] = 1
+                        push([node.left, 0, None])
+                    elif stage == 1:
+                        frame[1] = 2
+                        frame[2] = register
+                        push([node.right, 0, None])
+                    else:
+                        register = binary_operation(
+                            BINARY_OPCODES[type(node)], frame[2], register)
+                        pop()
+
+                elif kind == _SEQUENCE:
+                    index = frame[1]
+                    exprs = node.exprs
+                    if index < len(exprs):
+                        frame[1] = index + 1
+                        push([exprs[index], 0, None])
+                    else:
+                        if not exprs:
+                            register = UNIT_VALUE
+                        pop()
+
+                elif kind == _ASSIGN:
+                    if frame[1] == 0:
+                        frame[1] = 1
+                        push([node.value, 0, None])
+                    else:
+                        variable_name = node.variable.variable_name
+                        variable_from_state = state.get_value(variable_name)
+                        if variable_from_state != None and register[1] != variable_from_state[1]:
+                            raise InterpTypeError(f"""Mismatched types for Assignment:
+            Cannot assign {register[1]} to {variable_from_state[1]}""")
+                        state = state.set_value(
+                            variable_name, register[0], register[1])
+                        pop()
+
+                elif kind == _WHILE:
+                    stage = frame[1]
+                    if stage == 1:
+                        condition_value, condition_type = register
+                        if condition_type is not BOOLEAN:
+                            raise InterpTypeError(
+                                f"Cannot use {condition_type} as a While condition.")
+                        if condition_value:
+                            frame[1] = 2
+                            push([node.body, 0, None])
+                        else:
+                            register = FALSE_VALUE
+                            pop()
+                    else:
+                        frame[1] = 1
+                        push([node.condition, 0, None])
+
+                elif kind == _IF:
+                    if frame[1] == 0:
+                        frame[1] = 1
+                        push([node.condition, 0, None])
+                    else:
+                        condition_value, condition_type = register
+                        if condition_type is not BOOLEAN:
+                            raise InterpTypeError(
+                                f"Cannot use {condition_type} as an If condition.")
+                        # The branch's result is the If's result, so the
+                        # branch can replace the If's frame.
+                        stack[-1] = [node.true if condition_value else node.false, 0, None]
+
+                elif kind == _NOT:
+                    if frame[1] == 0:
+                        frame[1] = 1
+                        push([node.expr, 0, None])
+                    else:
+                        if register[1] is not BOOLEAN:
+                            raise InterpTypeError(
+                                "Cannot perform logical not on non-boolean operand.")
+                        register = FALSE_VALUE if register[0] else TRUE_VALUE
+                        pop()
+
+                elif kind == _PRINT:
+                    if frame[1] == 0:
+                        frame[1] = 1
+                        push([node.to_print, 0, None])
+                    else:
+                        print_value(*register)
+                        pop()
+
+                elif kind == _REN:
+                    register = UNIT_VALUE
+                    pop()
+
+                else:
+                    raise InterpSyntaxError("Unhandled!")
+        finally:
+            self.register = register
+            self.state = state
+            self.steps += steps
+
+        return not stack
+
+
+def evaluate_iterative(expression: Expr, state: State) -> Tuple[Optional[Any], Type, State]:
+    machine = Machine(expression, state)
+    machine.run()
+    return machine.result()
@@ -0,0 +1,237 @@
+from typing import Any, List, Optional, Tuple
+
+from stimpl.expression import *
+from stimpl.types import *
+from stimpl.errors import *
+from stimpl.runtime import evaluate, EmptyState
+
+"""
+Constant folding and algebraic simplification.
+
+optimize rewrites a program into an equivalent, smaller one:
+
+  - operators whose operands are all literals are replaced by the literal
+    they evaluate to;
+  - identities (x + 0, x * 1, x - 0, x / 1, x + "", b && true, b || false,
+    !!b) are dropped when x/b is known to have the matching type;
+  - If and While nodes whose condition is a Boolean literal lose their dead
+    branch or loop;
+  - literals that are not the last expression of a Sequence/Program are
+    removed and nested Sequences are flattened.
+
+Nothing that could raise at run time is folded away: a literal subtree
+that raises (e.g., Divide(IntLiteral(1), IntLiteral(0)) or
+Add(IntLiteral(1), FloatingPointLiteral(1.0))) is left in place, and an
+identity is only dropped when the other operand's type is known, so every
+InterpMathError and InterpTypeError still happens when the program runs.
+"""
+
+_LITERALS = (Ren, IntLiteral, FloatingPointLiteral, StringLiteral, BooleanLiteral)
+
+
+def _is_literal(expression: Expr) -> bool:
+    return isinstance(expression, _LITERALS)
+
+
+def _literal(value: Any, value_type: Type) -> Expr:
+    if value_type is UNIT:
+        return Ren()
+    if value_type is INTEGER:
+        return IntLiteral(value)
+    if value_type is FLOATING_POINT:
+        return FloatingPointLiteral(value)
+    if value_type is STRING:
+        return StringLiteral(value)
+    return BooleanLiteral(value)
+
+
+def _is_constant(expression: Expr, value_type: Type, value: Any) -> bool:
+    return _is_literal(expression) and _known_type(expression) is value_type \
+        and type(expression.literal) == type(value) and expression.literal == value
+
+
+def _known_type(expression: Expr) -> Optional[Type]:
+    """
+    The type expression has whenever it evaluates without raising, or None
+    when that cannot be told from the expression alone.
+    """
+    if expression.static_type is not None:
+        return expression.static_type
+
+    match expression:
+        case Ren():
+            return UNIT
+        case IntLiteral():
+            return INTEGER
+        case FloatingPointLiteral():
+            return FLOATING_POINT
+        case StringLiteral():
+            return STRING
+        case BooleanLiteral():
+            return BOOLEAN
+        case Print(to_print=to_print):
+            return _known_type(to_print)
+        case Assign(value=value):
+            return _known_type(value)
+        case Sequence(exprs=exprs) | Program(exprs=exprs):
+            return _known_type(exprs[-1]) if exprs else UNIT
+        case If(true=true, false=false):
+            true_type = _known_type(true)
+            return true_type if true_type is _known_type(false) else None
+        case Add(left=left, right=right) | Subtract(left=left, right=right) | \
+                Multiply(left=left, right=right) | Divide(left=left, right=right):
+            # Mismatched operands raise, so either operand's type will do.
+            return _known_type(left) or _known_type(right)
+        case Not() | And() | Or() | Lt() | Lte() | Gt() | Gte() | Eq() | Ne() | While():
+            return BOOLEAN
+    return None
+
+
+def count_nodes(expression: Expr) -> int:
+    count = 0
+    pending = [expression]
+    while pending:
+        node = pending.pop()
+        count += 1
+        match node:
+            case Print(to_print=child) | Not(expr=child):
+                pending.append(child)
+            case Assign(variable=variable, value=value):
+                pending.extend((variable, value))
+            case BinaryOperator(left=left, right=right):
+                pending.extend((left, right))
+            case Sequence(exprs=exprs) | Program(exprs=exprs):
+                pending.extend(exprs)
+            case If(condition=condition, true=true, false=false):
+                pending.extend((condition, true, false))
+            case While(condition=condition, body=body):
+                pending.extend((condition, body))
+    return count
+
+
+def _fold(expression: Expr) -> Expr:
+    try:
+        value, value_type, _ = evaluate(expression, EmptyState())
+    except InterpError:
+        # Leave the error to be raised when the program runs.
+        return expression
+    return _literal(value, value_type)
+
+
+def _simplify_binary(expression: BinaryOperator, left: Expr, right: Expr) -> Optional[Expr]:
+    left_type = _known_type(left)
+    right_type = _known_type(right)
+
+    match expression:
+        case Add():
+            if right_type is INTEGER and _is_constant(left, INTEGER, 0):
+                return right
+            if left_type is INTEGER and _is_constant(right, INTEGER, 0):
+                return left
+            if right_type is STRING and _is_constant(left, STRING, ""):
+                return right
+            if left_type is STRING and _is_constant(right, STRING, ""):
+                return left
+        case Subtract():
+            if left_type is INTEGER and _is_constant(right, INTEGER, 0):
+                return left
+        case Multiply():
+            # x * 1.0 is exactly x for every float, including -0.0 and nan.
+            if right_type is INTEGER and _is_constant(left, INTEGER, 1):
+                return right
+            if left_type is INTEGER and _is_constant(right, INTEGER, 1):
+                return left
+            if right_type is FLOATING_POINT and _is_constant(left, FLOATING_POINT, 1.0):
+                return right
+            if left_type is FLOATING_POINT and _is_constant(right, FLOATING_POINT, 1.0):
+                return left
+        case Divide():
+            if left_type is INTEGER and _is_constant(right, INTEGER, 1):
+                return left
+            if left_type is FLOATING_POINT and _is_constant(right, FLOATING_POINT, 1.0):
+                return left
+        case And():
+            if right_type is BOOLEAN and _is_constant(left, BOOLEAN, True):
+                return right
+            if left_type is BOOLEAN and _is_constant(right, BOOLEAN, True):
+                return left
+        case Or():
+            if right_type is BOOLEAN and _is_constant(left, BOOLEAN, False):
+                return right
+            if left_type is BOOLEAN and _is_constant(right, BOOLEAN, False):
+                return left
+    return None
+
+
+def _flatten(exprs: Tuple[Expr, ...]) -> List[Expr]:
+    flattened = []
+    for index, expr in enumerate(exprs):
+        last = index == len(exprs) - 1
+        if isinstance(expr, Sequence) and (not last or len(expr.exprs) > 0):
+            flattened.extend(expr.exprs)
+        elif last or not _is_literal(expr):
+            flattened.append(expr)
+    # Literals that the flattening moved out of the final position are
+    # dead too.
+    return [expr for index, expr in enumerate(flattened)
+            if index == len(flattened) - 1 or not _is_literal(expr)]
+
+
+def _optimize(expression: Expr) -> Expr:
+    match expression:
+        case Print(to_print=to_print):
+            return Print(_optimize(to_print))
+
+        case Program(exprs=exprs):
+            return Program(*_flatten(tuple(_optimize(expr) for expr in exprs)))
+
+        case Sequence(exprs=exprs):
+            exprs = _flatten(tuple(_optimize(expr) for expr in exprs))
+            if len(exprs) == 1:
+                return exprs[0]
+            return Sequence(*exprs)
+
+        case Assign(variable=variable, value=value):
+            return Assign(variable, _optimize(value))
+
+        case Not(expr=expr):
+            expr = _optimize(expr)
+            if _is_literal(expr):
+                return _fold(Not(expr))
+            if isinstance(expr, Not) and _known_type(expr.expr) is BOOLEAN:
+                return expr.expr
+            return Not(expr)
+
+        case BinaryOperator(left=left, right=right):
+            left = _optimize(left)
+            right = _optimize(right)
+            rebuilt = type(expression)(left, right)
+            if _is_literal(left) and _is_literal(right):
+                return _fold(rebuilt)
+            simplified = _simplify_binary(rebuilt, left, right)
+            return simplified if simplified is not None else rebuilt
+
+        case If(condition=condition, true=true, false=false):
+            condition = _optimize(condition)
+            true = _optimize(true)
+            false = _optimize(false)
+            if isinstance(condition, BooleanLiteral):
+                return true if condition.literal else false
+            return If(condition, true, false)
+
+        case While(condition=condition, body=body):
+            condition = _optimize(condition)
+            if isinstance(condition, BooleanLiteral) and not condition.literal:
+                return BooleanLiteral(False)
+            return While(condition, _optimize(body))
+
+    return expression
+
+
+def optimize(program: Expr) -> Tuple[Expr, int]:
+    """
+    Return an optimized copy of program and the number of nodes the
+    optimizations removed. Unchanged subtrees are shared with program.
+    """
+    optimized = _optimize(program)
+    return (optimized, count_nodes(program) - count_nodes(optimized))
@@ -0,0 +1,119 @@
+import sys
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, List, Optional, TextIO
+
+from stimpl.types import *
+
+"""
+Output sinks.
+
+Every engine sends what Print renders to the current output sink instead
+of calling print() directly. The default sink prints each line, exactly as
+before; run_stimpl's output argument (or redirect_output) swaps in another
+one for the duration of a run:
+
+  - BufferedSink accumulates lines and writes them to its stream in large
+    chunks;
+  - CollectingSink keeps the lines in memory;
+  - NullSink discards them.
+
+AsyncOutputSink is the base of sinks whose writes are awaited, for
+run_stimpl_async and the Scheduler.
+"""
+
+
+class OutputSink(ABC):
+    @abstractmethod
+    def write_line(self, line: str) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+
+class StdoutSink(OutputSink):
+    def write_line(self, line: str) -> None:
+        print(line)
+
+
+class BufferedSink(OutputSink):
+    def __init__(self, stream: Optional[TextIO] = None, flush_threshold: int = 1 << 16) -> None:
+        self.stream = stream
+        self.flush_threshold = flush_threshold
+        self.pending = []
+        self.pending_size = 0
+
+    def write_line(self, line: str) -> None:
+        self.pending.append(line)
+        self.pending_size += len(line) + 1
+        if self.pending_size >= self.flush_threshold:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        stream = sys.stdout if self.stream is None else self.stream
+        self.pending.append("")
+        stream.write("\n".join(self.pending))
+        stream.flush()
+        self.pending = []
+        self.pending_size = 0
+
+
+class CollectingSink(OutputSink):
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def write_line(self, line: str) -> None:
+        self.lines.append(line)
+
+    def getvalue(self) -> str:
+        return "".join(line + "\n" for line in self.lines)
+
+
+class NullSink(OutputSink):
+    def write_line(self, line: str) -> None:
+        pass
+
+
+class AsyncOutputSink(ABC):
+    @abstractmethod
+    async def write_line(self, line: str) -> None:
+        pass
+
+    async def flush(self) -> None:
+        pass
+
+
+_current_output: ContextVar[OutputSink] = ContextVar(
+    "stimpl_output", default=StdoutSink())
+
+
+def current_output() -> OutputSink:
+    return _current_output.get()
+
+
+def render(value: Any, value_type: Type) -> str:
+    if value_type is UNIT:
+        return "Unit"
+    return f"{value}"
+
+
+def print_value(value: Any, value_type: Type) -> None:
+    _current_output.get().write_line(render(value, value_type))
+
+
+@contextmanager
+def redirect_output(sink: OutputSink) -> Iterator[OutputSink]:
+    """
+    Send everything printed inside the block to sink, flushing it on the
+    way out.
+    """
+    token = _current_output.set(sink)
+    try:
+        yield sink
+    finally:
+        _current_output.reset(token)
+        sink.flush()
@@ -0,0 +1,309 @@
+import ast
+import math
+import re
+from typing import Any, Iterable, Iterator, List, TextIO, Tuple, Union
+
+from stimpl.expression import *
+from stimpl.errors import *
+
+"""
+Parsing.
+
+parse reads the textual form of STIMPL programs used in the README -- the
+Python expression that builds the AST, e.g.
+
+  Program(Assign(Variable("four"), Add(IntLiteral(2), IntLiteral(2))))
+
+without running Python on it. The grammar is
+
+  expression  := NAME "(" [argument ("," argument)* [","]] ")"
+  argument    := expression | STRING | NUMBER | "True" | "False"
+
+where NAME is one of the expression classes. NUMBER is a Python decimal
+integer or floating-point literal, with an optional minus sign directly
+in front of it (0, -5, 1_000, 2.5, .5, 1e-3); hexadecimal, octal and
+binary integers, plus signs and signs separated from their number are not
+accepted. STRING is a single-line Python string literal in single or
+double quotes, with Python's escape sequences; string prefixes, triple
+quotes and the concatenation of adjacent strings are not accepted.
+Whatever parse accepts, Python reads the same way. Whitespace, backslash
+line continuations and # comments may appear between tokens. The parser keeps its own stack of open
+calls instead of recursing, so it runs in time linear in the size of the
+text and handles arbitrarily deep nesting. Errors are InterpSyntaxErrors
+that carry the line and column (both from 1) of the offending token.
+
+unparse writes a program back in this form.
+"""
+
+_EXPRESSIONS = {cls.__name__: cls for cls in (
+    Ren, IntLiteral, FloatingPointLiteral, StringLiteral, BooleanLiteral,
+    Variable, Assign, Print, Not, And, Or, Lt, Lte, Gt, Gte, Eq, Ne, Add,
+    Subtract, Multiply, Divide, Program, Sequence, If, While)}
+
+# Whitespace, continuations and comments are matched in front of every
+# token rather than as tokens of their own, and a call's name is one token
+# with its opening parenthesis. The error alternative matches any other
+# character, so consecutive matches cover the whole text.
+_TOKEN = re.compile(r"""
+    (?:[ \t\r\n\f]|\\\r?\n|\#[^\n]*)*
+    (?:
+        (?P<call>[A-Za-z_][A-Za-z0-9_]*)(?:[ \t\r\n\f]|\\\r?\n|\#[^\n]*)*\(
+      | (?P<close>\))
+      | (?P<comma>,)
+      | (?P<float>-?(?:[0-9][0-9_]*\.[0-9_]*|\.[0-9][0-9_]*)(?:[eE][+-]?[0-9][0-9_]*)?
+                 |-?[0-9][0-9_]*[eE][+-]?[0-9][0-9_]*)
+      | (?P<int>-?[0-9][0-9_]*)
+      | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<end>\Z)
+      | (?P<error>.)
+    )""", re.VERBOSE | re.DOTALL)
+
+
+# When parsing text in chunks, a name or number is only complete once
+# something other than trivia or the start of an exponent follows it in
+# the text read so far: "Ren" may be followed by "(" in the next chunk,
+# "1.5e" by "3". An unexpected character may likewise be the start of a
+# string or number the next chunk completes.
+_INCOMPLETE_TAIL = re.compile(r"(?:[ \t\r\n\f]|\\\r?\n|\#[^\n]*)*(?:[eE][+-]?|\\\r?)?\Z")
+_INCOMPLETE_STARTS = frozenset("\"'\\-.")
+
+
+def _literal(kind: str, token: str) -> Any:
+    if kind == "int":
+        # Like Python, and unlike int, reject leading zeros.
+        if token.lstrip("-")[0] == "0" and token.strip("-0_"):
+            raise ValueError(token)
+        return int(token)
+    if kind == "float":
+        return float(token)
+    return ast.literal_eval(token) if "\\" in token else token[1:-1]
+
+
+class _Parser(object):
+    """
+    An incremental parser: feed it text in chunks of any size and it
+    returns expressions as they are completed. With split set, the
+    top-level expressions of an outermost Program are returned one at a
+    time instead of being collected into the Program.
+    """
+
+    def __init__(self, split: bool = False) -> None:
+        self.split = split
+        self.buffer = ""
+        # The position of buffer[0] in the whole text.
+        self.line = 1
+        self.column = 1
+        # Each open call is [class, offset of its name, arguments so far].
+        self.stack: List[List[Any]] = []
+        # Whether the next token must be a separator (a comma or a closing
+        # parenthesis) rather than an argument.
+        self.after_argument = False
+        self.done = False
+
+    def error(self, offset: Union[int, Tuple[int, int]], message: str) -> InterpSyntaxError:
+        if isinstance(offset, tuple):
+            return InterpSyntaxError(message, *offset)
+        newlines = self.buffer.count("\n", 0, offset)
+        if newlines:
+            return InterpSyntaxError(message, self.line + newlines,
+                                     offset - self.buffer.rfind("\n", 0, offset))
+        return InterpSyntaxError(message, self.line, self.column + offset)
+
+    def advance(self, offset: int) -> None:
+        """
+        Drop buffer[:offset], which has been parsed.
+        """
+        # Open calls started in the dropped text record their position as
+        # a (line, column) pair instead of an offset into the buffer.
+        # Frames below one that already does were started earlier, so
+        # only the newest frames need converting.
+        first = len(self.stack)
+        while first and not isinstance(self.stack[first - 1][1], tuple):
+            first -= 1
+        line, column, last = self.line, self.column, 0
+        for frame in self.stack[first:] + [[None, offset]]:
+            newlines = self.buffer.count("\n", last, frame[1])
+            if newlines:
+                line += newlines
+                column = frame[1] - self.buffer.rfind("\n", last, frame[1])
+            else:
+                column += frame[1] - last
+            last = frame[1]
+            frame[1] = (line, column)
+        self.line, self.column = line, column
+        self.buffer = self.buffer[offset:]
+
+    def feed(self, text: str, final: bool = False) -> List[Expr]:
+        """
+        Parse text, which follows the text fed so far, and return the
+        expressions it completes. final marks the end of the input.
+        """
+        buffer = self.buffer = self.buffer + text if self.buffer else text
+        stack = self.stack
+        after_argument = self.after_argument
+        split = self.split
+        completed = []
+        literal_kinds = ("int", "float", "string")
+        open_ended = ("name", "int", "float")
+
+        for match in _TOKEN.finditer(buffer):
+            kind = match.lastgroup
+
+            if not final and (kind == "end" or
+                              kind in open_ended and _INCOMPLETE_TAIL.match(buffer, match.end()) or
+                              kind == "error" and match.group(kind) in _INCOMPLETE_STARTS):
+                self.after_argument = after_argument
+                self.advance(match.start())
+                return completed
+
+            if kind == "close" and stack:
+                # Closes a call after its last argument, a trailing comma
+                # or its opening parenthesis.
+                cls, name_offset, arguments = stack.pop()
+                if split and not stack and cls is Program:
+                    # Every expression in it has already been returned.
+                    after_argument = True
+                    self.done = True
+                    continue
+                try:
+                    value = cls(*arguments)
+                except TypeError:
+                    raise self.error(name_offset,
+                                     f"Wrong number of arguments to {cls.__name__}.") from None
+                except InterpError as error:
+                    raise self.error(name_offset, str(error)) from None
+            elif kind == "end":
+                offset = match.start(kind)
+                if stack:
+                    raise self.error(offset, "Unexpected end of input.")
+                if not after_argument:
+                    raise self.error(offset, "Expected an expression.")
+                self.advance(len(buffer))
+                return completed
+            elif after_argument:
+                offset = match.start(kind)
+                if kind == "comma" and stack:
+                    after_argument = False
+                    continue
+                if kind == "error":
+                    raise self.error(offset, f"Unexpected character {match.group(kind)!r}.")
+                raise self.error(offset, "Expected , or )." if stack else "Expected the end of the input.")
+            elif kind == "call":
+                name = match.group(kind)
+                cls = _EXPRESSIONS.get(name)
+                if cls is None:
+                    raise self.error(match.start(kind), f"Unknown expression {name}.")
+                stack.append([cls, match.start(kind), []])
+                continue
+            elif kind in literal_kinds:
+                try:
+                    value = _literal(kind, match.group(kind))
+                except (ValueError, SyntaxError):
+                    raise self.error(match.start(kind), f"Invalid literal {match.group(kind)}.") from None
+            elif kind == "name" and match.group(kind) in ("True", "False"):
+                value = match.group(kind) == "True"
+            else:
+                offset = match.start(kind)
+                if kind == "error":
+                    raise self.error(offset, f"Unexpected character {match.group(kind)!r}.")
+                if kind == "name" and match.group(kind) in _EXPRESSIONS:
+                    raise self.error(match.end(), f"Expected ( after {match.group(kind)}.")
+                raise self.error(offset, "Expected an expression.")
+
+            # value is a complete argument.
+            if split and len(stack) == 1 and stack[0][0] is Program:
+                completed.append(value)
+            elif stack:
+                stack[-1][2].append(value)
+            elif isinstance(value, Expr):
+                completed.append(value)
+            else:
+                raise self.error(match.start(kind), "Expected an expression.")
+            after_argument = True
+
+
+def tokenize(text: str) -> Iterator[Tuple[str, Any, int]]:
+    """
+    Yield (kind, value, offset) for each token of text, ending with an
+    "end" token. A "call" token is a name and its opening parenthesis,
+    with the name as its value; literals have their Python value; every
+    other token has the text it matched.
+    """
+    parser = _Parser()
+    parser.buffer = text
+    for match in _TOKEN.finditer(text):
+        kind = match.lastgroup
+        offset = match.start(kind)
+        token = match.group(kind)
+        if kind == "error":
+            raise parser.error(offset, f"Unexpected character {token!r}.")
+        if kind == "int" or kind == "float" or kind == "string":
+            try:
+                token = _literal(kind, token)
+            except (ValueError, SyntaxError):
+                raise parser.error(offset, f"Invalid literal {token}.") from None
+        yield (kind, token, offset)
+
+
+def parse(text: str) -> Expr:
+    """
+    The expression text describes.
+    """
+    return _Parser().feed(text, True)[0]
+
+
+def parse_stream(source: Union[TextIO, Iterable[str]], chunk_size: int = 1 << 16) -> Iterator[Expr]:
+    """
+    Parse text read from source, a text file or an iterable of strings,
+    and yield the top-level expressions of the outermost Program as soon
+    as each one is complete. Any other outermost expression is yielded
+    whole. Only the expression being parsed is kept in memory.
+    """
+    chunks = iter(lambda: source.read(chunk_size), "") if hasattr(source, "read") else source
+    parser = _Parser(split=True)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.feed("", True)
+
+
+def parse_file(path: str) -> Expr:
+    with open(path, encoding="utf-8") as stream:
+        return parse(stream.read())
+
+
+def _name(expression: Expr) -> str:
+    # Fused nodes are written as the node they replace.
+    for cls in type(expression).__mro__:
+        if _EXPRESSIONS.get(cls.__name__) is cls:
+            return cls.__name__
+    raise InterpSyntaxError(f"Cannot write {type(expression).__name__} nodes.")
+
+
+def unparse(expression: Expr) -> str:
+    """
+    The text parse reads back as expression.
+    """
+    parts = []
+    pending = [expression]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, str):
+            parts.append(item)
+            continue
+        match item:
+            case Literal(literal=literal):
+                if isinstance(literal, float) and not math.isfinite(literal):
+                    raise InterpSyntaxError(f"Cannot write the literal {literal}.")
+                parts.append(f"{_name(item)}({literal!r})")
+            case Variable(variable_name=variable_name):
+                parts.append(f"Variable({variable_name!r})")
+            case _:
+                children = item.children()
+                parts.append(f"{_name(item)}(")
+                pending.append(")")
+                for index in range(len(children) - 1, -1, -1):
+                    pending.append(children[index])
+                    if index:
+                        pending.append(", ")
+    return "".join(parts)
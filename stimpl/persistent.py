@@ -0,0 +1,179 @@
+from typing import Any, Hashable, Iterator, Tuple
+
+"""
+Persistent map.
+
+PersistentMap is a hash array mapped trie (HAMT). Every update returns a
+new map that shares all untouched subtrees with the old one, so old maps
+stay valid and an update only copies the O(log32 n) nodes on the path to
+the changed key.
+
+Interior nodes hold a 32-bit bitmap and a compact tuple of alternating
+keys and values. A key slot holding _NODE marks the paired value as a
+child node. Keys whose full hashes collide share a _CollisionNode.
+"""
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64
+_NODE = object()
+_MISSING = object()
+
+
+def _hash(key: Hashable) -> int:
+    return hash(key) & ((1 << _HASH_BITS) - 1)
+
+
+class _CollisionNode(object):
+    __slots__ = ("key_hash", "entries")
+
+    def __init__(self, key_hash: int, entries: Tuple[Any, ...]) -> None:
+        self.key_hash = key_hash
+        self.entries = entries
+
+    def find(self, key: Hashable) -> Any:
+        entries = self.entries
+        for index in range(0, len(entries), 2):
+            if entries[index] == key:
+                return entries[index + 1]
+        return _MISSING
+
+    def assoc(self, shift: int, key_hash: int, key: Hashable, value: Any) -> Tuple[Any, bool]:
+        if key_hash != self.key_hash:
+            # Push this node one level down next to the new key.
+            node = _BitmapNode(
+                1 << ((self.key_hash >> shift) & _MASK), (_NODE, self))
+            return node.assoc(shift, key_hash, key, value)
+
+        entries = self.entries
+        for index in range(0, len(entries), 2):
+            if entries[index] == key:
+                updated = entries[:index + 1] + (value,) + entries[index + 2:]
+                return (_CollisionNode(key_hash, updated), False)
+        return (_CollisionNode(key_hash, entries + (key, value)), True)
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        entries = self.entries
+        for index in range(0, len(entries), 2):
+            yield (entries[index], entries[index + 1])
+
+
+class _BitmapNode(object):
+    __slots__ = ("bitmap", "entries")
+
+    def __init__(self, bitmap: int, entries: Tuple[Any, ...]) -> None:
+        self.bitmap = bitmap
+        self.entries = entries
+
+    def assoc(self, shift: int, key_hash: int, key: Hashable, value: Any) -> Tuple[Any, bool]:
+        bit = 1 << ((key_hash >> shift) & _MASK)
+        index = 2 * (self.bitmap & (bit - 1)).bit_count()
+        entries = self.entries
+
+        if not self.bitmap & bit:
+            updated = entries[:index] + (key, value) + entries[index:]
+            return (_BitmapNode(self.bitmap | bit, updated), True)
+
+        existing_key = entries[index]
+        existing_value = entries[index + 1]
+
+        if existing_key is _NODE:
+            child, added = existing_value.assoc(
+                shift + _BITS, key_hash, key, value)
+            if child is existing_value:
+                return (self, False)
+            updated = entries[:index + 1] + (child,) + entries[index + 2:]
+            return (_BitmapNode(self.bitmap, updated), added)
+
+        if existing_key == key:
+            if existing_value is value:
+                return (self, False)
+            updated = entries[:index + 1] + (value,) + entries[index + 2:]
+            return (_BitmapNode(self.bitmap, updated), False)
+
+        child = _merge(shift + _BITS, existing_key, existing_value,
+                       key_hash, key, value)
+        updated = entries[:index] + (_NODE, child) + entries[index + 2:]
+        return (_BitmapNode(self.bitmap, updated), True)
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        entries = self.entries
+        for index in range(0, len(entries), 2):
+            if entries[index] is _NODE:
+                yield from entries[index + 1].items()
+            else:
+                yield (entries[index], entries[index + 1])
+
+
+def _merge(shift: int, first_key: Hashable, first_value: Any, second_hash: int, second_key: Hashable, second_value: Any) -> Any:
+    first_hash = _hash(first_key)
+    if first_hash == second_hash or shift >= _HASH_BITS:
+        return _CollisionNode(second_hash, (first_key, first_value, second_key, second_value))
+
+    node = _BitmapNode(1 << ((first_hash >> shift) & _MASK),
+                       (first_key, first_value))
+    node, _ = node.assoc(shift, second_hash, second_key, second_value)
+    return node
+
+
+_EMPTY_NODE = _BitmapNode(0, ())
+
+
+class PersistentMap(object):
+    __slots__ = ("root", "size")
+
+    def __init__(self) -> None:
+        self.root = _EMPTY_NODE
+        self.size = 0
+
+    @staticmethod
+    def _make(root: Any, size: int) -> 'PersistentMap':
+        new_map = object.__new__(PersistentMap)
+        new_map.root = root
+        new_map.size = size
+        return new_map
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        key_hash = _hash(key)
+        node = self.root
+        shift = 0
+        while True:
+            if type(node) is _CollisionNode:
+                value = node.find(key)
+                return default if value is _MISSING else value
+
+            bit = 1 << ((key_hash >> shift) & _MASK)
+            if not node.bitmap & bit:
+                return default
+
+            index = 2 * (node.bitmap & (bit - 1)).bit_count()
+            entry_key = node.entries[index]
+            if entry_key is _NODE:
+                node = node.entries[index + 1]
+                shift += _BITS
+            elif entry_key == key:
+                return node.entries[index + 1]
+            else:
+                return default
+
+    def set(self, key: Hashable, value: Any) -> 'PersistentMap':
+        root, added = self.root.assoc(0, _hash(key), key, value)
+        if root is self.root:
+            return self
+        return PersistentMap._make(root, self.size + 1 if added else self.size)
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        return self.root.items()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[Any]:
+        for key, _ in self.items():
+            yield key
+
+    def __repr__(self) -> str:
+        return "PersistentMap({" + ", ".join(f"{key!r}: {value!r}" for key, value in self.items()) + "})"
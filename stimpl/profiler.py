@@ -0,0 +1,145 @@
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from stimpl.expression import Expr
+from stimpl.runtime import evaluation_hook
+
+"""
+Profiling.
+
+While profiling() is active, the tree evaluator hands every node it
+evaluates in the current context to an evaluation hook, so each node
+evaluation is timed. Outside the block evaluation runs with no
+instrumentation at all.
+
+A Profile records, per Expr class and per node:
+
+  - count: the number of evaluations;
+  - inclusive time: time spent evaluating the node and its children
+    (recursive evaluations of the same class are only counted once);
+  - exclusive time: inclusive time minus the time spent in children;
+
+the largest State seen after any evaluation, and the exclusive time spent
+under each distinct stack of Expr classes, for flame graphs.
+"""
+
+
+class NodeStats(object):
+    __slots__ = ("count", "inclusive", "exclusive")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+
+    def __repr__(self) -> str:
+        return f"<NodeStats: {self.count} calls, {self.inclusive:.6f}s inclusive, {self.exclusive:.6f}s exclusive>"
+
+
+class Profile(object):
+    def __init__(self) -> None:
+        self.by_type: Dict[str, NodeStats] = {}
+        self.by_node: Dict[int, Tuple[Expr, NodeStats]] = {}
+        self.stacks: Dict[Tuple[str, ...], float] = {}
+        self.peak_state_size = 0
+
+    def report(self, limit: Optional[int] = 20) -> str:
+        """
+        A text report of the Expr classes and nodes with the most exclusive
+        time, limit rows each (all rows when limit is None).
+        """
+        lines = [f"peak state size: {self.peak_state_size}", "",
+                 f"{'type':<16}{'count':>12}{'inclusive':>14}{'exclusive':>14}"]
+        types = sorted(self.by_type.items(),
+                       key=lambda item: item[1].exclusive, reverse=True)
+        for name, stats in types[:limit]:
+            lines.append(
+                f"{name:<16}{stats.count:>12}{stats.inclusive:>14.6f}{stats.exclusive:>14.6f}")
+
+        lines += ["", f"{'node':<40}{'count':>12}{'inclusive':>14}{'exclusive':>14}"]
+        nodes = sorted(self.by_node.values(),
+                       key=lambda item: item[1].exclusive, reverse=True)
+        for node, stats in nodes[:limit]:
+            label = f"{type(node).__name__}: {node}"
+            if len(label) > 38:
+                label = label[:35] + "..."
+            lines.append(
+                f"{label:<40}{stats.count:>12}{stats.inclusive:>14.6f}{stats.exclusive:>14.6f}")
+        return "\n".join(lines)
+
+    def collapsed_stacks(self) -> str:
+        """
+        Exclusive time per stack in the collapsed format read by
+        flamegraph.pl and speedscope, in microseconds.
+        """
+        return "".join(f"{';'.join(stack)} {round(elapsed * 1e6)}\n"
+                       for stack, elapsed in self.stacks.items())
+
+    def write_collapsed_stacks(self, path: str) -> None:
+        with open(path, "w") as stream:
+            stream.write(self.collapsed_stacks())
+
+
+def _instrument(profile: Profile):
+    by_type = profile.by_type
+    by_node = profile.by_node
+    stacks = profile.stacks
+    # One entry per active evaluation: the time spent in its children so
+    # far. names is the matching stack of Expr class names.
+    child_times: List[float] = []
+    names: List[str] = []
+    active: Dict[str, int] = {}
+
+    def profiled_evaluate(expression, state, proceed):
+        name = type(expression).__name__
+        names.append(name)
+        child_times.append(0.0)
+        active[name] = active.get(name, 0) + 1
+        start = perf_counter()
+        try:
+            result = proceed(expression, state)
+        finally:
+            elapsed = perf_counter() - start
+            exclusive = elapsed - child_times.pop()
+            if child_times:
+                child_times[-1] += elapsed
+
+            stats = by_type.get(name)
+            if stats is None:
+                stats = by_type[name] = NodeStats()
+            stats.count += 1
+            stats.exclusive += exclusive
+            active[name] -= 1
+            if not active[name]:
+                stats.inclusive += elapsed
+
+            entry = by_node.get(id(expression))
+            if entry is None:
+                entry = by_node[id(expression)] = (expression, NodeStats())
+            node_stats = entry[1]
+            node_stats.count += 1
+            node_stats.inclusive += elapsed
+            node_stats.exclusive += exclusive
+
+            stack = tuple(names)
+            stacks[stack] = stacks.get(stack, 0.0) + exclusive
+            names.pop()
+
+        state_size = len(result[2])
+        if state_size > profile.peak_state_size:
+            profile.peak_state_size = state_size
+        return result
+
+    return profiled_evaluate
+
+
+@contextmanager
+def profiling(profile: Optional[Profile] = None) -> Iterator[Profile]:
+    """
+    Profile every tree-engine evaluation inside the block.
+    """
+    if profile is None:
+        profile = Profile()
+    with evaluation_hook(_instrument(profile)):
+        yield profile
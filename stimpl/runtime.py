@@ -1,8 +1,16 @@
-from typing import Any, Tuple, Optional
+import operator
+import threading
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Tuple, Optional
 
 from stimpl.expression import *
 from stimpl.types import *
 from stimpl.errors import *
+from stimpl.output import print_value, redirect_output
+from stimpl.fuel import _current_meter, FuelMeter, metering
+from stimpl.fuse import IncrementVariable, AssignBinaryOperation, WhileVariableComparison, IfVariableComparison
+from stimpl.persistent import PersistentMap
 
 """
 Interpreter State
@@ -10,38 +18,207 @@ Interpreter State
 
 
 class State(object):
+    """
+    Variable bindings are kept in a PersistentMap from variable name to a
+    (value, type) tuple. set_value returns a new State that shares
+    structure with this one, so older States keep seeing older values while
+    reads and writes stay O(log n) in the number of live variables.
+    """
+
     def __init__(self, variable_name: str, variable_value: Expr, variable_type: Type, next_state: 'State') -> None:
-        self.variable_name = variable_name
-        self.value = (variable_value, variable_type)
-        self.next_state = next_state
+        self.bindings = next_state.bindings.set(
+            variable_name, (variable_value, variable_type))
+
+    @staticmethod
+    def from_bindings(bindings: PersistentMap) -> 'State':
+        state = object.__new__(State)
+        state.bindings = bindings
+        return state
 
     def copy(self) -> 'State':
-        variable_value, variable_type = self.value
-        return State(self.variable_name, variable_value, variable_type, self.next_state)
+        return State.from_bindings(self.bindings)
 
     def set_value(self, variable_name, variable_value, variable_type):
-        return State(variable_name, variable_value, variable_type, self)
+        return State.from_bindings(self.bindings.set(variable_name, (variable_value, variable_type)))
 
     def get_value(self, variable_name) -> Any:
-        """ TODO: Implement. """
-        return None
+        return self.bindings.get(variable_name)
+
+    def snapshot(self) -> 'State':
+        return self
+
+    def __len__(self) -> int:
+        return len(self.bindings)
 
     def __repr__(self) -> str:
-        return f"{self.variable_name}: {self.value}, " + repr(self.next_state)
+        return "".join(f"{variable_name}: {value}, " for variable_name, value in self.bindings.items())
 
 
 class EmptyState(State):
     def __init__(self):
-        pass
+        self.bindings = PersistentMap()
 
     def copy(self) -> 'EmptyState':
         return EmptyState()
 
-    def get_value(self, variable_name) -> None:
-        return None
+
+class MutableState(State):
+    """
+    A State that is updated in place. set_value mutates this object and
+    returns it, so no intermediate States are allocated. Callers that need
+    to hold on to the current bindings while execution continues must take
+    a snapshot (a persistent State) first.
+    """
+
+    def __init__(self, variables: Optional[dict] = None) -> None:
+        self.variables = {} if variables is None else dict(variables)
+
+    def copy(self) -> 'MutableState':
+        return MutableState(self.variables)
+
+    def set_value(self, variable_name, variable_value, variable_type):
+        self.variables[variable_name] = (variable_value, variable_type)
+        return self
+
+    def get_value(self, variable_name) -> Any:
+        return self.variables.get(variable_name)
+
+    def snapshot(self) -> State:
+        bindings = PersistentMap()
+        for variable_name, value in self.variables.items():
+            bindings = bindings.set(variable_name, value)
+        return State.from_bindings(bindings)
+
+    def __len__(self) -> int:
+        return len(self.variables)
 
     def __repr__(self) -> str:
-        return ""
+        return "".join(f"{variable_name}: {value}, " for variable_name, value in self.variables.items())
+
+
+"""
+Quickening
+
+The first time a binary operator evaluates successfully, evaluate stores
+in the node the operand type it saw and the operation specialized to that
+type. Later evaluations that see the same operand types run the stored
+operation after a single guard. When the guard fails the node is
+deoptimized: the operands are handled generically and the cache is
+replaced by one for the new type.
+"""
+
+
+def _divide_integer(left: int, right: int) -> int:
+    if right == 0:
+        raise InterpMathError("Cannot divide by zero.")
+    return left // right
+
+
+def _divide_floating_point(left: float, right: float) -> float:
+    if right == 0:
+        raise InterpMathError("Cannot divide by zero.")
+    return left / right
+
+
+def _logical_and(left: bool, right: bool) -> bool:
+    return left and right
+
+
+def _logical_or(left: bool, right: bool) -> bool:
+    return left or right
+
+
+def _always_true(left: Any, right: Any) -> bool:
+    return True
+
+
+def _always_false(left: Any, right: Any) -> bool:
+    return False
+
+
+def _quickened_operations():
+    operations = {}
+    for operand_type in (INTEGER, STRING, FLOATING_POINT):
+        operations[(Add, operand_type)] = (operand_type, operator.add, operand_type)
+    for operand_type in (INTEGER, FLOATING_POINT):
+        operations[(Subtract, operand_type)] = (operand_type, operator.sub, operand_type)
+        operations[(Multiply, operand_type)] = (operand_type, operator.mul, operand_type)
+    operations[(Divide, INTEGER)] = (INTEGER, _divide_integer, INTEGER)
+    operations[(Divide, FLOATING_POINT)] = (FLOATING_POINT, _divide_floating_point, FLOATING_POINT)
+    operations[(And, BOOLEAN)] = (BOOLEAN, _logical_and, BOOLEAN)
+    operations[(Or, BOOLEAN)] = (BOOLEAN, _logical_or, BOOLEAN)
+    for operator_class, compare, unit_result in ((Lt, operator.lt, False), (Lte, operator.le, True),
+                                                 (Gt, operator.gt, False), (Gte, operator.ge, True),
+                                                 (Eq, operator.eq, True), (Ne, operator.ne, False)):
+        for operand_type in (INTEGER, BOOLEAN, STRING, FLOATING_POINT):
+            operations[(operator_class, operand_type)] = (operand_type, compare, BOOLEAN)
+        operations[(operator_class, UNIT)] = (
+            UNIT, _always_true if unit_result else _always_false, BOOLEAN)
+    return operations
+
+
+_QUICKENED = _quickened_operations()
+
+
+def _deoptimize(expression: BinaryOperator, left: Tuple[Any, Type], right: Tuple[Any, Type]) -> Tuple[Any, Type]:
+    from stimpl.bytecode import BINARY_OPCODES
+    from stimpl.vm import binary_operation
+
+    expression.quickened = None
+    result = binary_operation(BINARY_OPCODES[type(expression)], left, right)
+    expression.quickened = _QUICKENED.get((type(expression), left[1]))
+    return result
+
+
+"""
+Fused nodes
+
+Each helper runs a fused node's fast path and returns its result, or None
+when the fast path does not apply and the generic code for the original
+node must run instead. The fast paths only read variables, so nothing has
+happened yet when they give up.
+"""
+
+
+def _fused_operand(operand: Tuple[Optional[str], Optional[Tuple[Any, Type]]], state: State) -> Optional[Tuple[Any, Type]]:
+    variable_name, constant = operand
+    if variable_name is None:
+        return constant
+    return state.get_value(variable_name)
+
+
+def _increment(expression: IncrementVariable, state: State) -> Optional[Tuple[Any, Type, State]]:
+    variable_name = expression.variable.variable_name
+    current = state.get_value(variable_name)
+    if current is None or current[1] is not INTEGER:
+        return None
+    value = current[0] + expression.amount
+    return (value, INTEGER, state.set_value(variable_name, value, INTEGER))
+
+
+def _assign_binary_operation(expression: AssignBinaryOperation, state: State) -> Optional[Tuple[Any, Type, State]]:
+    left = _fused_operand(expression.left_operand, state)
+    right = _fused_operand(expression.right_operand, state)
+    if left is None or right is None or left[1] is not right[1]:
+        return None
+    quickened = _QUICKENED.get((expression.operator_class, left[1]))
+    if quickened is None:
+        return None
+
+    _, operation, result_type = quickened
+    value = operation(left[0], right[0])
+    variable_name = expression.variable.variable_name
+    current = state.get_value(variable_name)
+    if current is not None and current[1] is not result_type:
+        return None
+    return (value, result_type, state.set_value(variable_name, value, result_type))
+
+
+def _compare_variable(expression: WhileVariableComparison, state: State) -> Optional[bool]:
+    current = state.get_value(expression.variable_name)
+    if current is None or current[1] is not expression.constant_type:
+        return None
+    return expression.compare(current[0], expression.constant)
 
 
 """
@@ -51,36 +228,46 @@ Main evaluation logic!
 
 def evaluate(expression: Expr, state: State) -> Tuple[Optional[Any], Type, State]:
     match expression:
+        case BinaryOperator(left=left, right=right) if expression.quickened is not None:
+            left_value, left_type, new_state = evaluate(left, state)
+            right_value, right_type, new_state = evaluate(right, new_state)
+
+            operand_type, operation, result_type = expression.quickened
+            if left_type is operand_type and right_type is operand_type:
+                return (operation(left_value, right_value), result_type, new_state)
+
+            value, value_type = _deoptimize(
+                expression, (left_value, left_type), (right_value, right_type))
+            return (value, value_type, new_state)
+
         case Ren():
-            return (None, Unit(), state)
+            return (None, UNIT, state)
 
         case IntLiteral(literal=l):
-            return (l, Integer(), state)
+            return (l, INTEGER, state)
 
         case FloatingPointLiteral(literal=l):
-            return (l, FloatingPoint(), state)
+            return (l, FLOATING_POINT, state)
 
         case StringLiteral(literal=l):
-            return (l, String(), state)
+            return (l, STRING, state)
 
         case BooleanLiteral(literal=l):
-            return (l, Boolean(), state)
+            return (l, BOOLEAN, state)
 
         case Print(to_print=to_print):
             printable_value, printable_type, new_state = evaluate(
                 to_print, state)
 
-            match printable_type:
-                case Unit():
-                    print("Unit")
-                case _:
-                    print(f"{printable_value}")
+            print_value(printable_value, printable_type)
 
             return (printable_value, printable_type, new_state)
 
         case Sequence(exprs=exprs) | Program(exprs=exprs):
-            """ TODO: Implement. """
-            pass
+            result = (None, UNIT, state)
+            for expr in exprs:
+                result = evaluate(expr, result[2])
+            return result
 
         case Variable(variable_name=variable_name):
             value = state.get_value(variable_name)
@@ -90,17 +277,25 @@ def evaluate(expression: Expr, state: State) -> Tuple[Optional[Any], Type, State
             variable_value, variable_type = value
             return (variable_value, variable_type, state)
 
+        case IncrementVariable() if (result := _increment(expression, state)) is not None:
+            return result
+
+        case AssignBinaryOperation() if (result := _assign_binary_operation(expression, state)) is not None:
+            return result
+
         case Assign(variable=variable, value=value):
 
             value_result, value_type, new_state = evaluate(value, state)
 
-            variable_from_state = new_state.get_value(variable.variable_name)
-            _, variable_type = variable_from_state if variable_from_state else (
-                None, None)
+            if expression.static_type is None:
+                variable_from_state = new_state.get_value(
+                    variable.variable_name)
+                _, variable_type = variable_from_state if variable_from_state else (
+                    None, None)
 
-            if value_type != variable_type and variable_type != None:
-                raise InterpTypeError(f"""Mismatched types for Assignment:
-            Cannot assign {value_type} to {variable_type}""")
+                if value_type != variable_type and variable_type != None:
+                    raise InterpTypeError(f"""Mismatched types for Assignment:
+                Cannot assign {value_type} to {variable_type}""")
 
             new_state = new_state.set_value(
                 variable.variable_name, value_result, value_type)
@@ -111,6 +306,9 @@ def evaluate(expression: Expr, state: State) -> Tuple[Optional[Any], Type, State
             left_result, left_type, new_state = evaluate(left, state)
             right_result, right_type, new_state = evaluate(right, new_state)
 
+            if expression.static_type is not None:
+                return (left_result + right_result, left_type, new_state)
+
             if left_type != right_type:
                 raise InterpTypeError(f"""Mismatched types for Add:
             Cannot add {left_type} to {right_type}""")
@@ -121,24 +319,89 @@ def evaluate(expression: Expr, state: State) -> Tuple[Optional[Any], Type, State
                 case _:
                     raise InterpTypeError(f"""Cannot add {left_type}s""")
 
+            expression.quickened = _QUICKENED.get((type(expression), left_type))
             return (result, left_type, new_state)
 
         case Subtract(left=left, right=right):
-            """ TODO: Implement. """
-            pass
+            result = 0
+            left_result, left_type, new_state = evaluate(left, state)
+            right_result, right_type, new_state = evaluate(right, new_state)
+
+            if expression.static_type is not None:
+                return (left_result - right_result, left_type, new_state)
+
+            if left_type != right_type:
+                raise InterpTypeError(f"""Mismatched types for Subtract:
+            Cannot subtract {right_type} from {left_type}""")
+
+            match left_type:
+                case Integer() | FloatingPoint():
+                    result = left_result - right_result
+                case _:
+                    raise InterpTypeError(f"""Cannot subtract {left_type}s""")
+
+            expression.quickened = _QUICKENED.get((type(expression), left_type))
+            return (result, left_type, new_state)
 
         case Multiply(left=left, right=right):
-            """ TODO: Implement. """
-            pass
+            result = 0
+            left_result, left_type, new_state = evaluate(left, state)
+            right_result, right_type, new_state = evaluate(right, new_state)
+
+            if expression.static_type is not None:
+                return (left_result * right_result, left_type, new_state)
+
+            if left_type != right_type:
+                raise InterpTypeError(f"""Mismatched types for Multiply:
+            Cannot multiply {left_type} and {right_type}""")
+
+            match left_type:
+                case Integer() | FloatingPoint():
+                    result = left_result * right_result
+                case _:
+                    raise InterpTypeError(f"""Cannot multiply {left_type}s""")
+
+            expression.quickened = _QUICKENED.get((type(expression), left_type))
+            return (result, left_type, new_state)
 
         case Divide(left=left, right=right):
-            """ TODO: Implement. """
-            pass
+            result = 0
+            left_result, left_type, new_state = evaluate(left, state)
+            right_result, right_type, new_state = evaluate(right, new_state)
+
+            if expression.static_type is not None:
+                if right_result == 0:
+                    raise InterpMathError("Cannot divide by zero.")
+                if left_type is INTEGER:
+                    return (left_result // right_result, left_type, new_state)
+                return (left_result / right_result, left_type, new_state)
+
+            if left_type != right_type:
+                raise InterpTypeError(f"""Mismatched types for Divide:
+            Cannot divide {left_type} by {right_type}""")
+
+            match left_type:
+                case Integer():
+                    if right_result == 0:
+                        raise InterpMathError("Cannot divide by zero.")
+                    result = left_result // right_result
+                case FloatingPoint():
+                    if right_result == 0:
+                        raise InterpMathError("Cannot divide by zero.")
+                    result = left_result / right_result
+                case _:
+                    raise InterpTypeError(f"""Cannot divide {left_type}s""")
+
+            expression.quickened = _QUICKENED.get((type(expression), left_type))
+            return (result, left_type, new_state)
 
         case And(left=left, right=right):
             left_value, left_type, new_state = evaluate(left, state)
             right_value, right_type, new_state = evaluate(right, new_state)
 
+            if expression.static_type is not None:
+                return (left_value and right_value, left_type, new_state)
+
             if left_type != right_type:
                 raise InterpTypeError(f"""Mismatched types for And:
             Cannot evaluate {left_type} and {right_type}""")
@@ -149,24 +412,71 @@ def evaluate(expression: Expr, state: State) -> Tuple[Optional[Any], Type, State
                     raise InterpTypeError(
                         "Cannot perform logical and on non-boolean operands.")
 
+            expression.quickened = _QUICKENED.get((type(expression), left_type))
             return (result, left_type, new_state)
 
         case Or(left=left, right=right):
-            """ TODO: Implement. """
-            pass
+            left_value, left_type, new_state = evaluate(left, state)
+            right_value, right_type, new_state = evaluate(right, new_state)
+
+            if expression.static_type is not None:
+                return (left_value or right_value, left_type, new_state)
+
+            if left_type != right_type:
+                raise InterpTypeError(f"""Mismatched types for Or:
+            Cannot evaluate {left_type} or {right_type}""")
+            match left_type:
+                case Boolean():
+                    result = left_value or right_value
+                case _:
+                    raise InterpTypeError(
+                        "Cannot perform logical or on non-boolean operands.")
+
+            expression.quickened = _QUICKENED.get((type(expression), left_type))
+            return (result, left_type, new_state)
 
         case Not(expr=expr):
-            """ TODO: Implement. """
-            pass
+            value, value_type, new_state = evaluate(expr, state)
+
+            if expression.static_type is not None:
+                return (not value, value_type, new_state)
+
+            match value_type:
+                case Boolean():
+                    result = not value
+                case _:
+                    raise InterpTypeError(
+                        "Cannot perform logical not on non-boolean operand.")
+
+            return (result, value_type, new_state)
+
+        case IfVariableComparison(true=true, false=false) if (
+                condition_value := _compare_variable(expression, state)) is not None:
+            return evaluate(true if condition_value else false, state)
 
         case If(condition=condition, true=true, false=false):
-            """ TODO: Implement. """
-            pass
+            condition_value, condition_type, new_state = evaluate(
+                condition, state)
+
+            if condition.static_type is None:
+                match condition_type:
+                    case Boolean():
+                        pass
+                    case _:
+                        raise InterpTypeError(
+                            f"Cannot use {condition_type} as an If condition.")
+
+            if condition_value:
+                return evaluate(true, new_state)
+            return evaluate(false, new_state)
 
         case Lt(left=left, right=right):
             left_value, left_type, new_state = evaluate(left, state)
             right_value, right_type, new_state = evaluate(right, new_state)
 
+            if expression.static_type is not None:
+                return (left_value < right_value, expression.static_type, new_state)
+
             result = None
 
             if left_type != right_type:
@@ -182,44 +492,337 @@ def evaluate(expression: Expr, state: State) -> Tuple[Optional[Any], Type, State
                     raise InterpTypeError(
                         f"Cannot perform < on {left_type} type.")
 
-            return (result, Boolean(), new_state)
+            expression.quickened = _QUICKENED.get((type(expression), left_type))
+            return (result, BOOLEAN, new_state)
 
         case Lte(left=left, right=right):
-            """ TODO: Implement. """
-            pass
+            left_value, left_type, new_state = evaluate(left, state)
+            right_value, right_type, new_state = evaluate(right, new_state)
+
+            if expression.static_type is not None:
+                return (left_value <= right_value, expression.static_type, new_state)
+
+            result = None
+
+            if left_type != right_type:
+                raise InterpTypeError(f"""Mismatched types for Lte:
+            Cannot compare {left_type} and {right_type}""")
+
+            match left_type:
+                case Integer() | Boolean() | String() | FloatingPoint():
+                    result = left_value <= right_value
+                case Unit():
+                    result = True
+                case _:
+                    raise InterpTypeError(
+                        f"Cannot perform <= on {left_type} type.")
+
+            expression.quickened = _QUICKENED.get((type(expression), left_type))
+            return (result, BOOLEAN, new_state)
 
         case Gt(left=left, right=right):
-            """ TODO: Implement. """
-            pass
+            left_value, left_type, new_state = evaluate(left, state)
+            right_value, right_type, new_state = evaluate(right, new_state)
+
+            if expression.static_type is not None:
+                return (left_value > right_value, expression.static_type, new_state)
+
+            result = None
+
+            if left_type != right_type:
+                raise InterpTypeError(f"""Mismatched types for Gt:
+            Cannot compare {left_type} and {right_type}""")
+
+            match left_type:
+                case Integer() | Boolean() | String() | FloatingPoint():
+                    result = left_value > right_value
+                case Unit():
+                    result = False
+                case _:
+                    raise InterpTypeError(
+                        f"Cannot perform > on {left_type} type.")
+
+            expression.quickened = _QUICKENED.get((type(expression), left_type))
+            return (result, BOOLEAN, new_state)
 
         case Gte(left=left, right=right):
-            """ TODO: Implement. """
-            pass
+            left_value, left_type, new_state = evaluate(left, state)
+            right_value, right_type, new_state = evaluate(right, new_state)
+
+            if expression.static_type is not None:
+                return (left_value >= right_value, expression.static_type, new_state)
+
+            result = None
+
+            if left_type != right_type:
+                raise InterpTypeError(f"""Mismatched types for Gte:
+            Cannot compare {left_type} and {right_type}""")
+
+            match left_type:
+                case Integer() | Boolean() | String() | FloatingPoint():
+                    result = left_value >= right_value
+                case Unit():
+                    result = True
+                case _:
+                    raise InterpTypeError(
+                        f"Cannot perform >= on {left_type} type.")
+
+            expression.quickened = _QUICKENED.get((type(expression), left_type))
+            return (result, BOOLEAN, new_state)
 
         case Eq(left=left, right=right):
-            """ TODO: Implement. """
-            pass
+            left_value, left_type, new_state = evaluate(left, state)
+            right_value, right_type, new_state = evaluate(right, new_state)
+
+            if expression.static_type is not None:
+                return (left_value == right_value, expression.static_type, new_state)
+
+            result = None
+
+            if left_type != right_type:
+                raise InterpTypeError(f"""Mismatched types for Eq:
+            Cannot compare {left_type} and {right_type}""")
+
+            match left_type:
+                case Integer() | Boolean() | String() | FloatingPoint():
+                    result = left_value == right_value
+                case Unit():
+                    result = True
+                case _:
+                    raise InterpTypeError(
+                        f"Cannot perform == on {left_type} type.")
+
+            expression.quickened = _QUICKENED.get((type(expression), left_type))
+            return (result, BOOLEAN, new_state)
 
         case Ne(left=left, right=right):
-            """ TODO: Implement. """
-            pass
+            left_value, left_type, new_state = evaluate(left, state)
+            right_value, right_type, new_state = evaluate(right, new_state)
+
+            if expression.static_type is not None:
+                return (left_value != right_value, expression.static_type, new_state)
+
+            result = None
+
+            if left_type != right_type:
+                raise InterpTypeError(f"""Mismatched types for Ne:
+            Cannot compare {left_type} and {right_type}""")
+
+            match left_type:
+                case Integer() | Boolean() | String() | FloatingPoint():
+                    result = left_value != right_value
+                case Unit():
+                    result = False
+                case _:
+                    raise InterpTypeError(
+                        f"Cannot perform != on {left_type} type.")
+
+            expression.quickened = _QUICKENED.get((type(expression), left_type))
+            return (result, BOOLEAN, new_state)
+
+        case WhileVariableComparison(condition=condition, body=body):
+            meter = _current_meter.get()
+            while True:
+                condition_value = _compare_variable(expression, state)
+                if condition_value is None:
+                    # Let the generic While run the rest of the loop.
+                    return evaluate(While(condition, body), state)
+                if not condition_value:
+                    return (False, BOOLEAN, state)
+                if meter is not None:
+                    meter.countdown -= 1
+                    if meter.countdown < 0:
+                        meter.tick(state)
+                _, _, state = evaluate(body, state)
 
         case While(condition=condition, body=body):
-            """ TODO: Implement. """
-            pass
+            new_state = state
+            meter = _current_meter.get()
+            while True:
+                condition_value, condition_type, new_state = evaluate(
+                    condition, new_state)
+
+                if condition.static_type is None:
+                    match condition_type:
+                        case Boolean():
+                            pass
+                        case _:
+                            raise InterpTypeError(
+                                f"Cannot use {condition_type} as a While condition.")
+
+                if not condition_value:
+                    break
+                if meter is not None:
+                    meter.countdown -= 1
+                    if meter.countdown < 0:
+                        meter.tick(new_state)
+                _, _, new_state = evaluate(body, new_state)
+
+            return (False, BOOLEAN, new_state)
 
         case _:
             raise InterpSyntaxError("Unhandled!")
     pass
 
 
-def run_stimpl(program, debug=False):
-    state = EmptyState()
-    program_value, program_type, program_state = evaluate(program, state)
+"""
+Evaluation hooks
+
+A hook sees every node evaluate evaluates inside an evaluation_hook block,
+as hook(expression, state, proceed), and returns the node's result;
+proceed(expression, state) evaluates the node through the hooks installed
+before it and then evaluate itself, whose recursive calls come back
+through every hook. Like output sinks and fuel meters, hooks belong to
+the current context: a hook installed in one thread or task is not seen
+by another, and blocks may end in any order.
+
+evaluate itself never looks for hooks. While any block is active, in any
+context, the module-level evaluate -- the name its recursive calls go
+through -- is a dispatcher that runs each node through the hooks of the
+current context; once the last block ends, the plain evaluate is back.
+Callers that should see hooks look evaluate up in this module when they
+call it rather than importing it.
+"""
+
+_plain_evaluate = evaluate
+
+# The hooks installed in this context, oldest first, and the function
+# that runs a node through them, or None when there are none.
+_current_hooks: ContextVar[Tuple[Tuple[Callable, ...], Optional[Callable]]] = \
+    ContextVar("stimpl_evaluation_hooks", default=((), None))
+# The number of active evaluation_hook blocks in all contexts.
+_active_hooks = 0
+_active_hooks_lock = threading.Lock()
+
+
+def _hooked_evaluate(expression: Expr, state: State) -> Tuple[Optional[Any], Type, State]:
+    chain = _current_hooks.get()[1]
+    if chain is None:
+        return _plain_evaluate(expression, state)
+    return chain(expression, state)
+
+
+def _link(hook: Callable, proceed: Callable) -> Callable:
+    return lambda expression, state: hook(expression, state, proceed)
+
+
+def _install_hooks(hooks: Tuple[Callable, ...]) -> None:
+    chain = None
+    if hooks:
+        chain = _plain_evaluate
+        for hook in hooks:
+            chain = _link(hook, chain)
+    _current_hooks.set((hooks, chain))
+
+
+@contextmanager
+def evaluation_hook(hook: Callable) -> Iterator[None]:
+    """
+    Run every node evaluate evaluates inside the block through hook.
+    """
+    global evaluate, _active_hooks
+    with _active_hooks_lock:
+        _active_hooks += 1
+        evaluate = _hooked_evaluate
+    _install_hooks(_current_hooks.get()[0] + (hook,))
+    try:
+        yield
+    finally:
+        # Only this block's hook is removed: blocks entered after it may
+        # still be active.
+        hooks = list(_current_hooks.get()[0])
+        for index in range(len(hooks) - 1, -1, -1):
+            if hooks[index] is hook:
+                del hooks[index]
+                break
+        _install_hooks(tuple(hooks))
+        with _active_hooks_lock:
+            _active_hooks -= 1
+            if not _active_hooks:
+                evaluate = _plain_evaluate
+
+
+def run_stimpl(program, debug=False, engine="tree", state_mode="persistent", typecheck=False, optimize=False, output=None, profile=None, jit=None, fuse=False, fuel=None):
+    if optimize:
+        from stimpl.optimize import optimize as optimize_program
+        program, _ = optimize_program(program)
+
+    if fuse:
+        from stimpl.fuse import fuse as fuse_program
+        program, _ = fuse_program(program)
+
+    if typecheck:
+        from stimpl.typecheck import typecheck as typecheck_program
+        # The annotations only hold for a run from an empty state, so they
+        # go on a copy that only this run sees.
+        program = copy_tree(program)
+        typecheck_program(program)
+
+    match state_mode:
+        case "persistent":
+            state = EmptyState()
+        case "mutable":
+            state = MutableState()
+        case _:
+            raise ValueError(f"Unknown state mode: {state_mode}")
+
+    profile_context = nullcontext()
+    if profile:
+        if engine != "tree":
+            raise ValueError("Profiling is only supported by the tree engine.")
+        from stimpl.profiler import profiling
+        profile_context = profiling(None if profile is True else profile)
+
+    fuel_context = nullcontext()
+    if fuel is not None:
+        if engine != "tree":
+            raise ValueError("Fuel is only supported by the tree engine.")
+        fuel_context = metering(fuel if isinstance(fuel, FuelMeter) else FuelMeter(fuel))
+
+    with nullcontext() if output is None else redirect_output(output), profile_context as active_profile, fuel_context:
+        match engine:
+            case "tree":
+                program_value, program_type, program_state = evaluate(
+                    program, state)
+            case "closure":
+                from stimpl.closure import compile_stimpl, run_compiled
+                program_value, program_type, program_state = run_compiled(
+                    compile_stimpl(program), state)
+            case "vm":
+                from stimpl.bytecode import compile_bytecode
+                from stimpl.vm import run_vm
+                program_value, program_type, program_state = run_vm(
+                    compile_bytecode(program), state)
+            case "arena":
+                from stimpl.arena import build_arena, evaluate_arena
+                program_value, program_type, program_state = evaluate_arena(
+                    build_arena(program), state)
+            case "iterative":
+                from stimpl.machine import evaluate_iterative
+                program_value, program_type, program_state = evaluate_iterative(
+                    program, state)
+            case "transpile":
+                from stimpl.transpile import transpile, run_transpiled
+                program_value, program_type, program_state = run_transpiled(
+                    transpile(program), state)
+            case "jit":
+                from stimpl.jit import tiered
+                with tiered(jit):
+                    program_value, program_type, program_state = evaluate(
+                        program, state)
+            case "vm-check":
+                from stimpl.vm import run_vm_checked
+                program_value, program_type, program_state = run_vm_checked(
+                    program, state)
+            case _:
+                raise ValueError(f"Unknown engine: {engine}")
 
     if debug:
         print(f"program: {program}")
         print(f"final_value: ({program_value}, {program_type})")
         print(f"final_state: {program_state}")
 
+    if profile is True:
+        print(active_profile.report())
+
     return program_value, program_type, program_state
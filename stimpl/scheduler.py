@@ -0,0 +1,150 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Iterable, List, Optional, Set, Tuple, Union
+
+from stimpl.batch import ProgramResult
+from stimpl.errors import *
+from stimpl.expression import Expr
+from stimpl.machine import Machine
+from stimpl.output import AsyncOutputSink, CollectingSink, OutputSink, current_output, redirect_output
+from stimpl.runtime import State
+from stimpl.types import *
+
+"""
+Cooperative scheduling.
+
+run_stimpl_async runs a program on a Machine in slices of slice_steps
+steps and yields to the asyncio event loop between slices, so a long
+While loop does not hold up the other coroutines of the process. Lines
+printed during a slice are written to the output sink when the slice
+ends; the sink is an OutputSink or an AsyncOutputSink, whose writes are
+awaited.
+
+A Scheduler runs many programs this way, each as a task on the running
+event loop. The event loop resumes ready tasks in the order they became
+ready, so the programs running at once take their slices in turn. The
+scheduler bounds how many programs run at once and how many steps each
+may take, and any program can be cancelled between two of its slices.
+"""
+
+DEFAULT_SLICE_STEPS = 1000
+
+Sink = Union[OutputSink, AsyncOutputSink]
+
+
+async def _call(method, *args) -> None:
+    result = method(*args)
+    if inspect.isawaitable(result):
+        await result
+
+
+async def run_stimpl_async(program: Expr, state: Optional[State] = None, *,
+                           slice_steps: int = DEFAULT_SLICE_STEPS,
+                           max_steps: Optional[int] = None,
+                           output: Optional[Sink] = None) -> Tuple[Optional[Any], Type, State]:
+    """
+    Evaluate program like the iterative engine, yielding to the event loop
+    every slice_steps steps. output defaults to the current output sink.
+    Raises InterpBudgetError, with the state so far, if the program has
+    not finished after max_steps steps.
+    """
+    sink = current_output() if output is None else output
+    machine = Machine(program, state)
+    buffer = CollectingSink()
+    try:
+        while True:
+            steps = slice_steps if max_steps is None else min(slice_steps, max_steps - machine.steps)
+            try:
+                with redirect_output(buffer):
+                    finished = machine.run(steps)
+            finally:
+                lines, buffer.lines = buffer.lines, []
+                for line in lines:
+                    await _call(sink.write_line, line)
+            if finished:
+                return machine.result()
+            if max_steps is not None and machine.steps >= max_steps:
+                raise InterpBudgetError(f"Program did not finish within {max_steps} steps.",
+                                        machine.steps, machine.state)
+            await asyncio.sleep(0)
+    finally:
+        await _call(sink.flush)
+
+
+class Scheduler(object):
+    """
+    Runs programs concurrently on the running event loop: at most
+    concurrency at once (any number if None), each for at most max_steps
+    steps (unbounded if None).
+    """
+
+    def __init__(self, concurrency: Optional[int] = None,
+                 slice_steps: int = DEFAULT_SLICE_STEPS,
+                 max_steps: Optional[int] = None) -> None:
+        self.slice_steps = slice_steps
+        self.max_steps = max_steps
+        self.semaphore = None if concurrency is None else asyncio.Semaphore(concurrency)
+        self.tasks: Set[asyncio.Task] = set()
+        self.submitted = 0
+
+    def __repr__(self) -> str:
+        return f"<Scheduler: {len(self.tasks)} of {self.submitted} programs pending>"
+
+    def submit(self, program: Expr, state: Optional[State] = None, *,
+               max_steps: Optional[int] = None,
+               output: Optional[Sink] = None) -> 'asyncio.Task[ProgramResult]':
+        """
+        Start running program and return the task that runs it, whose
+        result is the program's ProgramResult. Printed lines go to output,
+        or, if it is None, to the result's output. max_steps overrides the
+        scheduler's. Cancelling the task stops the program between two
+        of its slices, after its output is flushed, and the task ends
+        cancelled.
+        """
+        index = self.submitted
+        self.submitted += 1
+        task = asyncio.get_running_loop().create_task(self._run(
+            index, program, state, self.max_steps if max_steps is None else max_steps, output))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def _run(self, index: int, program: Expr, state: Optional[State],
+                   max_steps: Optional[int], output: Optional[Sink]) -> ProgramResult:
+        sink = CollectingSink() if output is None else output
+        lines = sink.lines if output is None else []
+        start = time.perf_counter()
+        try:
+            if self.semaphore is None:
+                value, value_type, state = await run_stimpl_async(
+                    program, state, slice_steps=self.slice_steps, max_steps=max_steps, output=sink)
+            else:
+                async with self.semaphore:
+                    start = time.perf_counter()
+                    value, value_type, state = await run_stimpl_async(
+                        program, state, slice_steps=self.slice_steps, max_steps=max_steps, output=sink)
+        except Exception as error:
+            return ProgramResult(index, None, None, None, lines, error, time.perf_counter() - start)
+        return ProgramResult(index, value, value_type, dict(state.snapshot().bindings.items()),
+                             lines, None, time.perf_counter() - start)
+
+    async def run_all(self, programs: Iterable[Expr]) -> List[ProgramResult]:
+        """
+        Run every program and return their ProgramResults in order.
+        """
+        first = self.submitted
+        tasks = [self.submit(program) for program in programs]
+        if tasks:
+            await asyncio.wait(tasks)
+        # A cancelled task has no result of its own.
+        return [ProgramResult(first + position, None, None, None, [], asyncio.CancelledError(), 0.0)
+                if task.cancelled() else task.result()
+                for position, task in enumerate(tasks)]
+
+    def cancel(self) -> None:
+        """
+        Cancel every program that has not finished.
+        """
+        for task in list(self.tasks):
+            task.cancel()
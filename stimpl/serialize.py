@@ -0,0 +1,444 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Any, List, Tuple, Union
+
+from stimpl.arena import Arena
+from stimpl.bytecode import CodeObject
+from stimpl.expression import *
+from stimpl.fuse import IncrementVariable, AssignBinaryOperation, WhileVariableComparison, IfVariableComparison
+from stimpl.machine import Machine
+from stimpl.runtime import EmptyState
+from stimpl.types import *
+from stimpl.errors import InterpError
+
+"""
+Binary serialization.
+
+Programs (Expr trees), bytecode CodeObjects, Arenas and paused Machines
+are written in one container format:
+
+  header     magic, format version, kind, byte order, section count, root
+  sections   a table of (offset, length) pairs, then the sections, each
+             aligned to 8 bytes
+
+The node tables and the bytecode are stored as raw machine arrays, so
+load_serialized maps the file with mmap and uses memoryviews of the mapped
+pages directly: CodeObjects and Arenas run straight from the page cache,
+and processes that load the same file share its pages. Programs are
+rebuilt into Expr nodes from the mapped tables.
+
+A program is stored as a table of distinct nodes in post-order: equal
+subtrees are written once and are loaded as one shared node, and the bytes
+depend only on the program's structure. structural_digest hashes them into
+a key that is stable across processes.
+
+A Machine is written as a snapshot of its continuation: its program's
+node tables, followed by the stack frames as (node index, stage, saved
+value) triples, the bindings of its State, its register and step count.
+Runtime values share the program's literal pool. Reading a snapshot gives
+a Machine that carries on from where the original stopped, with its
+State as a persistent State.
+
+Files written with another FORMAT_VERSION, or on a machine with another
+byte order, raise SerializationError when loaded.
+"""
+
+FORMAT_VERSION = 1
+
+KIND_PROGRAM = 1
+KIND_BYTECODE = 2
+KIND_ARENA = 3
+KIND_SNAPSHOT = 4
+
+_MAGIC = b"STPL"
+_HEADER = struct.Struct("<4sHBBIq")
+_SECTION = struct.Struct("<qq")
+_BYTE_ORDERS = {"little": 0, "big": 1}
+
+# Node class codes of the program format. Codes are part of the format:
+# only ever append to this list.
+_NODE_CLASSES = [
+    Ren, IntLiteral, FloatingPointLiteral, StringLiteral, BooleanLiteral,
+    Variable, Assign, Print, Not, And, Or, Lt, Lte, Gt, Gte, Eq, Ne, Add,
+    Subtract, Multiply, Divide, Program, Sequence, If, While,
+    IncrementVariable, AssignBinaryOperation, WhileVariableComparison,
+    IfVariableComparison,
+]
+_NODE_CODES = {cls: code for code, cls in enumerate(_NODE_CLASSES)}
+# Every class after Variable is built from its children.
+_VARIABLE_CODE = _NODE_CODES[Variable]
+
+_LITERAL_TYPES = [UNIT, INTEGER, FLOATING_POINT, STRING, BOOLEAN]
+_LITERAL_CODES = {type(literal_type): code for code, literal_type in enumerate(_LITERAL_TYPES)}
+_LITERAL_CLASS_TYPES = {
+    IntLiteral: INTEGER,
+    FloatingPointLiteral: FLOATING_POINT,
+    StringLiteral: STRING,
+    BooleanLiteral: BOOLEAN,
+}
+
+
+class SerializationError(Exception):
+    pass
+
+
+"""
+Writing.
+"""
+
+
+def _encode_names(names: List[str]) -> bytes:
+    parts = [struct.pack("<I", len(names))]
+    for name in names:
+        encoded = name.encode("utf-8")
+        parts.append(struct.pack("<I", len(encoded)))
+        parts.append(encoded)
+    return b"".join(parts)
+
+
+def _encode_literals(literals: List[Tuple[Any, Type]]) -> bytes:
+    parts = [struct.pack("<I", len(literals))]
+    for value, value_type in literals:
+        code = _LITERAL_CODES.get(type(value_type))
+        if code is None:
+            raise SerializationError(f"Cannot serialize a {value_type} literal.")
+        parts.append(bytes([code]))
+        match value_type:
+            case Unit():
+                pass
+            case Integer():
+                encoded = value.to_bytes((value.bit_length() + 8) // 8, "little", signed=True)
+                parts.append(struct.pack("<I", len(encoded)))
+                parts.append(encoded)
+            case FloatingPoint():
+                parts.append(struct.pack("<d", value))
+            case String():
+                encoded = value.encode("utf-8")
+                parts.append(struct.pack("<I", len(encoded)))
+                parts.append(encoded)
+            case Boolean():
+                parts.append(bytes([value]))
+    return b"".join(parts)
+
+
+def _container(kind: int, root: int, sections: List[bytes]) -> bytes:
+    header_size = _HEADER.size + _SECTION.size * len(sections)
+    offset = header_size
+    table = []
+    body = []
+    for section in sections:
+        padding = -offset % 8
+        body.append(b"\0" * padding)
+        offset += padding
+        table.append(_SECTION.pack(offset, len(section)))
+        body.append(section)
+        offset += len(section)
+    header = _HEADER.pack(_MAGIC, FORMAT_VERSION, kind,
+                          _BYTE_ORDERS[sys.byteorder], len(sections), root)
+    return b"".join([header, *table, *body])
+
+
+class _ProgramWriter(object):
+    def __init__(self) -> None:
+        self.kinds = array("B")
+        self.first = array("q")
+        self.second = array("q")
+        self.children = array("q")
+        self.literals = []
+        self.literal_indexes = {}
+        self.names = []
+        self.name_indexes = {}
+        self.indexes = {}
+
+    def literal(self, value: Any, value_type: Type) -> int:
+        key = (type(value_type), type(value),
+               value.hex() if isinstance(value, float) else value)
+        if key not in self.literal_indexes:
+            self.literal_indexes[key] = len(self.literals)
+            self.literals.append((value, value_type))
+        return self.literal_indexes[key]
+
+    def name(self, variable_name: str) -> int:
+        if variable_name not in self.name_indexes:
+            self.name_indexes[variable_name] = len(self.names)
+            self.names.append(variable_name)
+        return self.name_indexes[variable_name]
+
+    def node(self, expression: Expr) -> None:
+        code = _NODE_CODES.get(type(expression))
+        if code is None:
+            raise SerializationError(f"Cannot serialize {type(expression).__name__} nodes.")
+        first = second = 0
+        match expression:
+            case Literal(literal=literal):
+                first = self.literal(literal, _LITERAL_CLASS_TYPES[type(expression)])
+            case Variable(variable_name=variable_name):
+                first = self.name(variable_name)
+            case _:
+                # The children of every other node are its constructor
+                # arguments, in order.
+                children = expression.children()
+                first = len(self.children)
+                second = len(children)
+                self.children.extend(self.indexes[child] for child in children)
+        self.indexes[expression] = len(self.kinds)
+        self.kinds.append(code)
+        self.first.append(first)
+        self.second.append(second)
+
+    def write(self, program: Expr) -> None:
+        # Post-order and iterative. indexes is keyed structurally, so a
+        # subtree equal to one already written is not written again.
+        pending = [(program, False)]
+        while pending:
+            expression, expanded = pending.pop()
+            if expression in self.indexes:
+                continue
+            if expanded:
+                self.node(expression)
+            else:
+                pending.append((expression, True))
+                pending.extend((child, False) for child in reversed(expression.children()))
+
+
+def _program_sections(writer: _ProgramWriter) -> List[bytes]:
+    return [writer.kinds.tobytes(), writer.first.tobytes(), writer.second.tobytes(),
+            writer.children.tobytes(), _encode_literals(writer.literals),
+            _encode_names(writer.names)]
+
+
+def serialize(obj: Union[Expr, CodeObject, Arena, Machine]) -> bytes:
+    match obj:
+        case Expr():
+            writer = _ProgramWriter()
+            writer.write(obj)
+            return _container(KIND_PROGRAM, writer.indexes[obj], _program_sections(writer))
+
+        case CodeObject():
+            return _container(KIND_BYTECODE, 0, [
+                array("i", obj.code).tobytes(), _encode_literals(obj.constants),
+                _encode_names(obj.names)])
+
+        case Arena():
+            return _container(KIND_ARENA, obj.root, [
+                array("B", obj.kinds).tobytes(), array("q", obj.first).tobytes(),
+                array("q", obj.second).tobytes(), array("q", obj.children).tobytes(),
+                _encode_literals(obj.literals), _encode_names(obj.names)])
+
+        case Machine():
+            writer = _ProgramWriter()
+            writer.write(obj.program)
+            frames = array("q")
+            for node, stage, saved in obj.stack:
+                # Every node on the stack is part of the program, so this
+                # only looks up its index.
+                writer.write(node)
+                frames.extend((writer.indexes[node], stage,
+                               -1 if saved is None else writer.literal(*saved)))
+            bindings = array("q")
+            for variable_name, (value, value_type) in obj.state.snapshot().bindings.items():
+                bindings.extend((writer.name(variable_name), writer.literal(value, value_type)))
+            registers = array("q", (writer.literal(*obj.register), obj.steps))
+            return _container(KIND_SNAPSHOT, writer.indexes[obj.program], _program_sections(writer) + [
+                frames.tobytes(), bindings.tobytes(), registers.tobytes()])
+
+    raise SerializationError(f"Cannot serialize {type(obj).__name__} objects.")
+
+
+def structural_digest(program: Expr) -> str:
+    """
+    A hex digest of program's structure that is the same in every process
+    and for every program structurally equal to it.
+    """
+    return hashlib.sha256(serialize(program)).hexdigest()
+
+
+def write_serialized(path: str, obj: Union[Expr, CodeObject, Arena, Machine]) -> None:
+    """
+    Write obj to path atomically: readers see either the old file or the
+    complete new one.
+    """
+    data = serialize(obj)
+    directory = os.path.dirname(path) or "."
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as stream:
+            stream.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+"""
+Reading.
+"""
+
+
+class _Reader(object):
+    def __init__(self, buffer) -> None:
+        self.view = memoryview(buffer)
+        if len(self.view) < _HEADER.size:
+            raise SerializationError("Truncated header.")
+        magic, version, kind, byte_order, count, root = _HEADER.unpack_from(self.view)
+        if magic != _MAGIC:
+            raise SerializationError("Not a serialized STIMPL file.")
+        if version != FORMAT_VERSION:
+            raise SerializationError(
+                f"Format version {version} cannot be read by format version {FORMAT_VERSION}.")
+        if byte_order != _BYTE_ORDERS[sys.byteorder]:
+            raise SerializationError("Written on a machine with a different byte order.")
+        self.kind = kind
+        self.root = root
+        self.sections = []
+        for index in range(count):
+            offset, length = _SECTION.unpack_from(self.view, _HEADER.size + _SECTION.size * index)
+            if offset + length > len(self.view):
+                raise SerializationError("Truncated section.")
+            self.sections.append(self.view[offset:offset + length])
+        self.position = 0
+
+    def array(self, index: int, typecode: str) -> memoryview:
+        return self.sections[index].cast(typecode)
+
+    def names(self, index: int) -> List[str]:
+        section = self.sections[index]
+        (count,), position = struct.unpack_from("<I", section), 4
+        names = []
+        for _ in range(count):
+            (length,) = struct.unpack_from("<I", section, position)
+            position += 4
+            names.append(str(section[position:position + length], "utf-8"))
+            position += length
+        return names
+
+    def literals(self, index: int) -> List[Tuple[Any, Type]]:
+        section = self.sections[index]
+        (count,), position = struct.unpack_from("<I", section), 4
+        literals = []
+        for _ in range(count):
+            value_type = _LITERAL_TYPES[section[position]]
+            position += 1
+            match value_type:
+                case Unit():
+                    value = None
+                case Integer():
+                    (length,) = struct.unpack_from("<I", section, position)
+                    position += 4
+                    value = int.from_bytes(section[position:position + length], "little", signed=True)
+                    position += length
+                case FloatingPoint():
+                    (value,) = struct.unpack_from("<d", section, position)
+                    position += 8
+                case String():
+                    (length,) = struct.unpack_from("<I", section, position)
+                    position += 4
+                    value = str(section[position:position + length], "utf-8")
+                    position += length
+                case Boolean():
+                    value = bool(section[position])
+                    position += 1
+            literals.append((value, value_type))
+        return literals
+
+
+def _read_nodes(reader: _Reader, literals: List[Tuple[Any, Type]], names: List[str]) -> List[Expr]:
+    # The tables are copied into lists first: indexing a list is faster
+    # than indexing a memoryview, and the copies are dropped once the
+    # nodes are built.
+    kinds = reader.array(0, "B").tolist()
+    first = reader.array(1, "q").tolist()
+    second = reader.array(2, "q").tolist()
+    children = reader.array(3, "q").tolist()
+    values = [value for value, _ in literals]
+
+    nodes = []
+    append = nodes.append
+    node_at = nodes.__getitem__
+    for code, first_operand, second_operand in zip(kinds, first, second):
+        cls = _NODE_CLASSES[code]
+        if code > _VARIABLE_CODE:
+            if second_operand == 2:
+                append(cls(nodes[children[first_operand]], nodes[children[first_operand + 1]]))
+            else:
+                append(cls(*map(node_at, children[first_operand:first_operand + second_operand])))
+        elif code == _VARIABLE_CODE:
+            append(Variable(names[first_operand]))
+        elif cls is Ren:
+            append(Ren())
+        else:
+            append(cls(values[first_operand]))
+    return nodes
+
+
+def _read_program(reader: _Reader) -> Expr:
+    return _read_nodes(reader, reader.literals(4), reader.names(5))[reader.root]
+
+
+def _read_snapshot(reader: _Reader) -> Machine:
+    literals = reader.literals(4)
+    names = reader.names(5)
+    nodes = _read_nodes(reader, literals, names)
+    frames = reader.array(6, "q").tolist()
+    bindings = reader.array(7, "q").tolist()
+    register, steps = reader.array(8, "q").tolist()
+
+    state = EmptyState()
+    for index in range(0, len(bindings), 2):
+        value, value_type = literals[bindings[index + 1]]
+        state = state.set_value(names[bindings[index]], value, value_type)
+    machine = Machine(nodes[reader.root], state)
+    machine.stack = [[nodes[frames[index]], frames[index + 1],
+                      None if frames[index + 2] < 0 else literals[frames[index + 2]]]
+                     for index in range(0, len(frames), 3)]
+    machine.register = literals[register]
+    machine.steps = steps
+    return machine
+
+
+def deserialize(buffer) -> Union[Expr, CodeObject, Arena, Machine]:
+    """
+    Load an object written by serialize from any buffer. CodeObjects and
+    Arenas keep memoryviews of buffer instead of copying their arrays.
+    """
+    try:
+        reader = _Reader(buffer)
+        if reader.kind == KIND_PROGRAM:
+            return _read_program(reader)
+
+        if reader.kind == KIND_BYTECODE:
+            return CodeObject(reader.array(0, "i"), reader.literals(1), reader.names(2))
+
+        if reader.kind == KIND_ARENA:
+            arena = Arena()
+            arena.kinds = reader.array(0, "B")
+            arena.first = reader.array(1, "q")
+            arena.second = reader.array(2, "q")
+            arena.children = reader.array(3, "q")
+            arena.literals = reader.literals(4)
+            arena.names = reader.names(5)
+            arena.root = reader.root
+            return arena
+
+        if reader.kind == KIND_SNAPSHOT:
+            return _read_snapshot(reader)
+    except (IndexError, ValueError, TypeError, AttributeError, UnicodeDecodeError,
+            struct.error, InterpError) as error:
+        raise SerializationError(f"Corrupt serialized data: {error}") from None
+    raise SerializationError(f"Unknown serialized kind {reader.kind}.")
+
+
+def load_serialized(path: str) -> Union[Expr, CodeObject, Arena, Machine]:
+    """
+    Map the file at path into memory and load it with deserialize.
+    """
+    with open(path, "rb") as stream:
+        if os.fstat(stream.fileno()).st_size == 0:
+            raise SerializationError("Empty file.")
+        mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    return deserialize(mapped)
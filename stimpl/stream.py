@@ -0,0 +1,58 @@
+from typing import Any, Iterable, Optional, TextIO, Tuple, Union
+
+import stimpl.runtime
+from stimpl.arena import build_arena, evaluate_arena
+from stimpl.bytecode import compile_bytecode
+from stimpl.expression import Expr
+from stimpl.machine import evaluate_iterative
+from stimpl.parser import parse_stream
+from stimpl.runtime import State, EmptyState
+from stimpl.types import *
+from stimpl.vm import run_vm
+
+"""
+Streaming execution.
+
+run_stream evaluates the top-level expressions of a Program one at a time
+as they are read, threading the State from each to the next, so a program
+starts running -- and printing -- before the rest of it has been read, and
+only the expression being parsed or evaluated is kept in memory.
+
+The result is the result of the last expression, as if the expressions
+had been evaluated as one Program.
+"""
+
+# The tree engine looks evaluate up on every call so that evaluation
+# hooks (the profiler, the JIT) apply.
+_ENGINES = {
+    "tree": lambda expression, state: stimpl.runtime.evaluate(expression, state),
+    "iterative": evaluate_iterative,
+    "vm": lambda expression, state: run_vm(compile_bytecode(expression), state),
+    "arena": lambda expression, state: evaluate_arena(build_arena(expression), state),
+}
+
+
+def evaluate_stream(expressions: Iterable[Expr], state: Optional[State] = None,
+                    engine: str = "tree") -> Tuple[Optional[Any], Type, State]:
+    """
+    Evaluate each expression in turn as expressions yields it.
+    """
+    if engine not in _ENGINES:
+        raise ValueError(
+            f"Streaming execution is not supported by the {engine} engine.")
+    evaluate_one = _ENGINES[engine]
+    if state is None:
+        state = EmptyState()
+    result = (None, UNIT, state)
+    for expression in expressions:
+        result = evaluate_one(expression, result[2])
+    return result
+
+
+def run_stream(source: Union[TextIO, Iterable[str]], state: Optional[State] = None,
+               engine: str = "tree", chunk_size: int = 1 << 16) -> Tuple[Optional[Any], Type, State]:
+    """
+    Parse and run the program text read from source, a text file or an
+    iterable of strings, one top-level expression at a time.
+    """
+    return evaluate_stream(parse_stream(source, chunk_size), state, engine)
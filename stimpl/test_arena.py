@@ -0,0 +1,30 @@
+from stimpl.arena import build_arena, evaluate_arena
+from stimpl.expression import *
+from stimpl.types import Integer
+from stimpl.test import check_equal, run_stimpl_sanity_tests
+
+
+def test_arena_sanity():
+    run_stimpl_sanity_tests(engine="arena")
+
+
+def test_arena_layout():
+    program = Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(3)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))),
+        Variable("i"))
+    arena = build_arena(program)
+    check_equal(len(arena) - 1, arena.root)
+    check_equal(["i"], arena.names)
+    check_equal(3, len(arena.literals))
+
+    value, value_type, state = evaluate_arena(arena)
+    check_equal((3, Integer()), (value, value_type))
+    check_equal((3, Integer()), state.get_value("i"))
+
+
+def test_nodes_have_no_instance_dict():
+    for node in (Ren(), IntLiteral(1), Variable("i"), Add(IntLiteral(1), IntLiteral(2)),
+                 Program(), If(BooleanLiteral(True), Ren(), Ren())):
+        check_equal(False, hasattr(node, "__dict__"))
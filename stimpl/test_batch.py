@@ -0,0 +1,63 @@
+import threading
+
+from stimpl.batch import *
+from stimpl.errors import *
+from stimpl.expression import *
+from stimpl.serialize import serialize
+from stimpl.types import *
+from stimpl.test import check_equal
+
+
+def counting_program(limit):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(limit)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))),
+        Print(Variable("i")),
+        Variable("i"))
+
+
+def test_results_in_submission_order():
+    programs = [counting_program(limit) for limit in range(20)]
+    programs[7] = Program(Divide(IntLiteral(1), IntLiteral(0)))
+    results = list(run_many(programs, workers=2, chunk_size=3))
+    check_equal(list(range(20)), [result.index for result in results])
+    check_equal(True, isinstance(results[7].error, InterpMathError))
+    for limit, result in enumerate(results):
+        if limit != 7:
+            check_equal((limit, Integer(), {"i": (limit, Integer())}), result.unwrap())
+            check_equal([str(limit)], result.output)
+
+
+def test_completion_order_and_timeouts():
+    programs = [counting_program(10 ** 9), counting_program(5), serialize(counting_program(6))]
+    results = list(run_many(programs, workers=2, ordered=False, timeout=0.5, chunk_size=1))
+    # The program that times out finishes last.
+    check_equal(0, results[-1].index)
+    by_index = {result.index: result for result in results}
+    check_equal(True, isinstance(by_index[0].error, TimeoutError))
+    check_equal((6, Integer()), by_index[2].unwrap()[:2])
+
+
+def test_in_process():
+    results = list(run_many([counting_program(3), Program(Variable("x"))], workers=0, engine="vm"))
+    check_equal((3, Integer()), results[0].unwrap()[:2])
+    check_equal(True, isinstance(results[1].error, InterpSyntaxError))
+
+
+def test_in_process_timeouts_need_the_main_thread():
+    results = list(run_many([counting_program(3)], workers=0, timeout=1))
+    check_equal((3, Integer()), results[0].unwrap()[:2])
+
+    errors = []
+
+    def run_in_thread():
+        try:
+            list(run_many([counting_program(3)], workers=0, timeout=1))
+        except ValueError as error:
+            errors.append(error)
+
+    thread = threading.Thread(target=run_in_thread)
+    thread.start()
+    thread.join()
+    check_equal(1, len(errors))
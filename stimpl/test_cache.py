@@ -0,0 +1,55 @@
+import os
+
+from stimpl.cache import *
+from stimpl.expression import *
+from stimpl.runtime import run_stimpl
+from stimpl.serialize import FORMAT_VERSION
+from stimpl.types import *
+from stimpl.vm import run_vm
+from stimpl.test import check_equal
+
+
+def build():
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(10)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))),
+        Variable("i"))
+
+
+def test_programs_are_cached_by_structure(tmp_path):
+    cache = ProgramCache(str(tmp_path))
+    key = cache.store(build())
+    check_equal(key, cache.store(build()))
+    check_equal(True, cache.load(key) == build())
+    check_equal(None, cache.load("0" * 64))
+    check_equal((10, Integer()), run_vm(cache.load_bytecode(key))[:2])
+    check_equal(True, os.path.exists(cache.path(key, "bytecode")))
+    check_equal((10, Integer()), run_vm(cache.load_bytecode(key))[:2])
+
+
+def test_get_or_build_only_builds_once(tmp_path):
+    builds = []
+
+    def counted_build():
+        builds.append(1)
+        return build()
+
+    for _ in range(3):
+        program = ProgramCache(str(tmp_path)).get_or_build("service/main", counted_build)
+        check_equal((10, Integer()), run_stimpl(program)[:2])
+    check_equal(1, len(builds))
+
+
+def test_stale_entries_are_rebuilt_and_pruned(tmp_path):
+    cache = ProgramCache(str(tmp_path))
+    key = cache.store(build())
+    with open(cache.path(key, "program"), "r+b") as stream:
+        stream.write(b"JUNK")
+    check_equal(None, cache.load(key))
+    check_equal(key, cache.store(build()))
+    check_equal(True, cache.load(key) == build())
+
+    os.makedirs(os.path.join(str(tmp_path), f"v{FORMAT_VERSION - 1}", "ab"))
+    check_equal(1, cache.prune())
+    check_equal([f"v{FORMAT_VERSION}"], os.listdir(str(tmp_path)))
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+
+from stimpl.checkpoint import *
+from stimpl.errors import *
+from stimpl.expression import *
+from stimpl.parser import unparse
+from stimpl.runtime import run_stimpl
+from stimpl.types import *
+from stimpl.test import check_equal
+
+
+def summing_program(limit):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("total"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(limit)),
+              Sequence(
+                  Assign(Variable("total"), Add(Variable("total"), Multiply(Variable("i"), Variable("i")))),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))),
+        Variable("total"))
+
+
+def bindings(result):
+    return (result[0], result[1], dict(result[2].snapshot().bindings.items()))
+
+
+def test_resume_after_running_out_of_steps(tmp_path):
+    path = str(tmp_path / "job.snapshot")
+    program = summing_program(100)
+    try:
+        run_checkpointed(program, path, interval=30, max_steps=1000)
+    except InterpBudgetError as error:
+        check_equal(1000, error.steps)
+    else:
+        raise AssertionError("Expected the program to run out of steps.")
+    check_equal(True, os.path.exists(path))
+
+    check_equal(bindings(run_stimpl(program)), bindings(run_checkpointed(program, path, interval=30)))
+    check_equal(False, os.path.exists(path))
+
+
+def test_resume_in_another_process(tmp_path):
+    path = str(tmp_path / "job.snapshot")
+    program = summing_program(200)
+    script = ("import sys; from stimpl.checkpoint import run_checkpointed; from stimpl.parser import parse\n"
+              "try:\n"
+              "    run_checkpointed(parse(sys.argv[1]), sys.argv[2], interval=100, max_steps=2500)\n"
+              "except Exception as error:\n"
+              "    print(type(error).__name__)\n")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run([sys.executable, "-c", script, unparse(program), path],
+                               cwd=root, capture_output=True, text=True, check=True)
+    check_equal("InterpBudgetError\n", completed.stdout)
+
+    check_equal(bindings(run_stimpl(program)), bindings(run_checkpointed(program, path)))
+
+
+def test_snapshots_of_other_programs_are_refused(tmp_path):
+    path = str(tmp_path / "job.snapshot")
+    try:
+        run_checkpointed(summing_program(100), path, interval=10, max_steps=50)
+    except InterpBudgetError:
+        pass
+    try:
+        run_checkpointed(summing_program(101), path)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected the snapshot to be refused.")
@@ -0,0 +1,20 @@
+from stimpl.closure import compile_stimpl, run_compiled
+from stimpl.expression import *
+from stimpl.types import Integer
+from stimpl.test import check_equal, run_stimpl_sanity_tests
+
+
+def test_closure_engine_sanity():
+    run_stimpl_sanity_tests(engine="closure")
+
+
+def test_compiled_program_is_reusable():
+    compiled = compile_stimpl(Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(5)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))),
+        Variable("i")))
+    for _ in range(2):
+        value, value_type, state = run_compiled(compiled)
+        check_equal((5, Integer()), (value, value_type))
+        check_equal((5, Integer()), state.get_value("i"))
@@ -0,0 +1,53 @@
+from stimpl.errors import *
+from stimpl.expression import *
+from stimpl.fuel import FuelMeter, metering
+from stimpl.fuse import fuse
+from stimpl.runtime import evaluate, run_stimpl, EmptyState
+from stimpl.types import *
+from stimpl.test import check_equal
+
+
+def counting_program(limit):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(limit)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))),
+        Variable("i"))
+
+
+def test_fuel_bounds_loop_iterations():
+    check_equal((10, Integer()), run_stimpl(counting_program(10), fuel=10)[:2])
+    for program in (counting_program(11), fuse(counting_program(11))[0]):
+        try:
+            run_stimpl(program, fuel=10)
+        except InterpBudgetError as error:
+            check_equal(10, error.steps)
+            check_equal((10, Integer()), error.state.get_value("i"))
+        else:
+            raise AssertionError("Expected the program to run out of fuel.")
+
+    runaway = Program(Assign(Variable("x"), IntLiteral(0)), While(BooleanLiteral(True), Ren()))
+    try:
+        run_stimpl(runaway, state_mode="mutable", fuel=0)
+    except InterpBudgetError as error:
+        check_equal(0, error.steps)
+        check_equal((0, Integer()), error.state.get_value("x"))
+    else:
+        raise AssertionError("Expected the program to run out of fuel.")
+
+
+def test_checkpoints():
+    checkpoints = []
+    meter = FuelMeter(checkpoint=lambda steps, state: checkpoints.append((steps, state.get_value("i"))),
+                      checkpoint_every=4)
+    # Nested loops share the meter.
+    program = Program(
+        Assign(Variable("j"), IntLiteral(0)),
+        While(Lt(Variable("j"), IntLiteral(2)),
+              Sequence(
+                  counting_program(5),
+                  Assign(Variable("j"), Add(Variable("j"), IntLiteral(1))))))
+    with metering(meter):
+        evaluate(program, EmptyState())
+    check_equal(12, meter.steps)
+    check_equal([(4, (3, Integer())), (8, (1, Integer()))], checkpoints)
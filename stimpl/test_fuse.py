@@ -0,0 +1,55 @@
+from stimpl.expression import *
+from stimpl.errors import *
+from stimpl.fuse import *
+from stimpl.runtime import run_stimpl
+from stimpl.types import *
+from stimpl.test import check_equal, check_program_raises
+
+
+def counting_loop():
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("total"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(10)),
+              Sequence(
+                  Assign(Variable("total"), Add(Variable("total"), Variable("i"))),
+                  If(Gte(Variable("i"), IntLiteral(5)),
+                     Assign(Variable("total"), Add(Variable("total"), IntLiteral(100))),
+                     Ren()),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))),
+        Variable("total"))
+
+
+def test_fused_programs_run_on_every_engine():
+    for engine in ("tree", "iterative", "vm", "transpile"):
+        check_equal((545, Integer()), run_stimpl(counting_loop(), engine=engine, fuse=True)[:2])
+
+
+def test_idioms_are_fused():
+    fused, count = fuse(counting_loop())
+    check_equal(5, count)
+    loop = fused.exprs[2]
+    check_equal(True, isinstance(loop, WhileVariableComparison))
+    total, branch, increment = loop.body.exprs
+    check_equal(True, isinstance(total, AssignBinaryOperation))
+    check_equal(True, isinstance(branch, IfVariableComparison))
+    check_equal(True, isinstance(branch.true, IncrementVariable))
+    check_equal(True, isinstance(increment, IncrementVariable))
+
+
+def test_fused_nodes_raise_the_same_errors():
+    # Unbound and mistyped operands fall back to the generic nodes.
+    check_program_raises(InterpSyntaxError(), fuse(Program(
+        Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))))[0])
+    check_program_raises(InterpTypeError(), fuse(Program(
+        Assign(Variable("i"), StringLiteral("a")),
+        Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))))[0])
+    check_program_raises(InterpTypeError(), fuse(Program(
+        Assign(Variable("i"), FloatingPointLiteral(0.0)),
+        While(Lt(Variable("i"), IntLiteral(3)), Ren())))[0])
+    check_program_raises(InterpMathError(), fuse(Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("j"), Divide(IntLiteral(1), Variable("i")))))[0])
+    check_program_raises(InterpTypeError(), fuse(Program(
+        Assign(Variable("j"), StringLiteral("a")),
+        Assign(Variable("j"), Multiply(IntLiteral(2), IntLiteral(3)))))[0])
@@ -0,0 +1,79 @@
+import pickle
+
+from stimpl.expression import *
+from stimpl.fuse import fuse
+from stimpl.hashcons import *
+from stimpl.runtime import run_stimpl
+from stimpl.types import *
+from stimpl.test import check_equal
+
+
+def repeated_program(copies):
+    return Program(
+        Assign(Variable("x"), IntLiteral(0)),
+        *[Assign(Variable("x"), Add(Variable("x"), Multiply(IntLiteral(2), IntLiteral(3))))
+          for _ in range(copies)],
+        Variable("x"))
+
+
+def test_structural_equality_and_hashing():
+    check_equal(True, Add(Variable("x"), IntLiteral(1)) == Add(Variable("x"), IntLiteral(1)))
+    check_equal(hash(Add(Variable("x"), IntLiteral(1))), hash(Add(Variable("x"), IntLiteral(1))))
+    check_equal(False, Add(Variable("x"), IntLiteral(1)) == Subtract(Variable("x"), IntLiteral(1)))
+    check_equal(False, Add(Variable("x"), IntLiteral(1)) == Add(Variable("y"), IntLiteral(1)))
+    check_equal(False, IntLiteral(1) == FloatingPointLiteral(1.0))
+    check_equal(False, FloatingPointLiteral(0.0) == FloatingPointLiteral(-0.0))
+    check_equal(True, FloatingPointLiteral(float("nan")) == FloatingPointLiteral(float("nan")))
+    check_equal(False, Sequence(Ren()) == Sequence(Ren(), Ren()))
+    check_equal(False, Program(Ren()) == Sequence(Ren()))
+
+    # Annotations and caches are not part of the structure.
+    annotated = IntLiteral(1)
+    annotated.static_type = Integer()
+    check_equal(True, annotated == IntLiteral(1))
+
+    # Deep programs hash and compare without recursing.
+    deep, other = IntLiteral(0), IntLiteral(0)
+    for _ in range(100_000):
+        deep, other = Not(deep), Not(other)
+    check_equal(True, deep == other)
+    check_equal(1, len({deep, other}))
+
+
+def test_pickled_nodes_rehash():
+    program = repeated_program(3)
+    hash(program)
+    copy = pickle.loads(pickle.dumps(program))
+    check_equal(None, copy.structural_hash)
+    check_equal(True, copy == program)
+
+
+def test_hash_cons_shares_equal_subtrees():
+    program = repeated_program(1000)
+    shared, distinct = hash_cons(program)
+    check_equal(True, shared == program)
+    check_equal(9, distinct)
+    check_equal(True, shared.exprs[1] is shared.exprs[1000])
+    check_equal(True, shared.exprs[1].variable is shared.exprs[-1])
+    for engine in ("tree", "vm", "transpile"):
+        check_equal((6000, Integer()), run_stimpl(shared, engine=engine)[:2])
+
+
+def test_hash_cons_keeps_fused_nodes():
+    fused, _ = fuse(Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(10)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))),
+        Variable("i")))
+    shared, _ = hash_cons(fused)
+    check_equal(type(fused.exprs[1]), type(shared.exprs[1]))
+    check_equal((10, Integer()), run_stimpl(shared)[:2])
+
+
+def test_make_returns_shared_instances():
+    conser = HashConser()
+    one = conser.make(IntLiteral, 1)
+    check_equal(True, one is conser.make(IntLiteral, 1))
+    x = conser.make(Variable, "x")
+    check_equal(True, conser.make(Add, x, one) is conser.make(Add, x, one))
+    check_equal(3, len(conser))
@@ -0,0 +1,79 @@
+import stimpl.runtime
+from stimpl.expression import *
+from stimpl.jit import JIT, tiered
+from stimpl.profiler import profiling
+from stimpl.runtime import run_stimpl, _current_hooks
+from stimpl.types import *
+from stimpl.test import check_equal, run_stimpl_sanity_tests
+
+
+def test_jit_sanity():
+    run_stimpl_sanity_tests(engine="jit")
+
+
+def test_hot_loop_is_compiled():
+    program = Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(1000)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))),
+        Variable("i"))
+    jit = JIT(threshold=10)
+    value, value_type, state = run_stimpl(program, engine="jit", jit=jit)
+    check_equal((1000, Integer()), (value, value_type))
+
+    (stats,) = jit.loops.values()
+    check_equal((1, 1, 10), (stats.entries, stats.compiled_entries, stats.interpreted_iterations))
+    check_equal([(Integer(),)], list(stats.versions))
+
+
+def test_guard_failure_falls_back():
+    # y is unbound the first time the inner loop runs and an Integer the
+    # second time, so the first compiled version does not apply.
+    inner = While(Lt(Variable("i"), IntLiteral(3)),
+                  Sequence(
+                      Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))),
+                      If(Eq(Variable("i"), IntLiteral(100)), Assign(Variable("y"), IntLiteral(1)), Ren())))
+    program = Program(
+        Assign(Variable("n"), IntLiteral(0)),
+        While(Lt(Variable("n"), IntLiteral(2)),
+              Sequence(
+                  Assign(Variable("i"), IntLiteral(0)),
+                  inner,
+                  Assign(Variable("y"), IntLiteral(7)),
+                  Assign(Variable("n"), Add(Variable("n"), IntLiteral(1))))))
+    jit = JIT(threshold=2)
+    run_stimpl(program, engine="jit", jit=jit)
+
+    stats = jit.loops[id(inner)]
+    check_equal((2, 1, 2), (stats.entries, stats.guard_failures, len(stats.versions)))
+    check_equal(True, "bailouts" in jit.report())
+
+    # Compiling type checks a copy of the loop, never the program itself.
+    pending = [program]
+    while pending:
+        node = pending.pop()
+        check_equal(None, node.static_type)
+        pending.extend(getattr(node, name) for name in ("condition", "body", "value", "left", "right")
+                       if hasattr(node, name))
+        pending.extend(getattr(node, "exprs", ()))
+
+
+def test_tiering_and_profiling_may_end_in_any_order():
+    program = Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(20)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))))
+    profiling_block = profiling()
+    profile = profiling_block.__enter__()
+    tiered_block = tiered(JIT(threshold=10))
+    jit = tiered_block.__enter__()
+    run_stimpl(program)
+    profiling_block.__exit__(None, None, None)
+    run_stimpl(program)
+    tiered_block.__exit__(None, None, None)
+    run_stimpl(program)
+
+    check_equal(1, profile.by_type["Program"].count)
+    check_equal(2, sum(stats.entries for stats in jit.loops.values()))
+    check_equal(((), None), _current_hooks.get())
+    check_equal(True, stimpl.runtime.evaluate is stimpl.runtime._plain_evaluate)
@@ -0,0 +1,59 @@
+import pytest
+
+from stimpl.errors import *
+from stimpl.expression import *
+from stimpl.lanes import run_lanes
+from stimpl.runtime import evaluate, EmptyState
+from stimpl.types import *
+from stimpl.test import check_equal
+
+np = pytest.importorskip("numpy")
+
+
+def collatz_steps():
+    return Program(
+        Assign(Variable("steps"), IntLiteral(0)),
+        While(Gt(Variable("n"), IntLiteral(1)),
+              Sequence(
+                  If(Eq(Multiply(Divide(Variable("n"), IntLiteral(2)), IntLiteral(2)), Variable("n")),
+                     Assign(Variable("n"), Divide(Variable("n"), IntLiteral(2))),
+                     Assign(Variable("n"), Add(Multiply(Variable("n"), IntLiteral(3)), IntLiteral(1)))),
+                  Assign(Variable("steps"), Add(Variable("steps"), IntLiteral(1))))),
+        Variable("steps"))
+
+
+def test_lanes_match_evaluate():
+    program = collatz_steps()
+    results = run_lanes(program, [{"n": n} for n in range(1, 30)])
+    for n, result in enumerate(results, 1):
+        value, value_type, state = evaluate(program, EmptyState().set_value("n", n, INTEGER))
+        check_equal((value, value_type, dict(state.bindings.items())), result.unwrap())
+
+
+def test_per_lane_errors_and_output():
+    program = Program(
+        Print(Variable("x")),
+        Assign(Variable("q"), Divide(IntLiteral(-7), Variable("x"))),
+        Print(Variable("q")))
+    results = run_lanes(program, [{"x": 2}, {"x": 0}, {}, {"x": -2}])
+    check_equal((-4, Integer()), results[0].unwrap()[:2])
+    check_equal(["2", "-4"], results[0].output)
+    check_equal(True, isinstance(results[1].error, InterpMathError))
+    check_equal(["0"], results[1].output)
+    check_equal(True, isinstance(results[2].error, InterpSyntaxError))
+    check_equal((3, Integer()), results[3].unwrap()[:2])
+
+
+def test_divergent_lanes_fall_back():
+    # The lanes disagree on the type of x, and 2 ** 62 + 2 ** 62 overflows
+    # int64.
+    program = Program(
+        If(Variable("big"), Assign(Variable("y"), Add(Variable("x"), Variable("x"))), Ren()),
+        Add(Variable("x"), Variable("x")))
+    results = run_lanes(program, [{"x": 1, "big": False}, {"x": "ab", "big": False},
+                                  {"x": 2 ** 62, "big": True}, {"x": 1.5, "big": True}])
+    check_equal((2, Integer()), results[0].unwrap()[:2])
+    check_equal(("abab", String()), results[1].unwrap()[:2])
+    check_equal((2 ** 63, Integer()), results[2].unwrap()[:2])
+    check_equal((2 ** 63, Integer()), results[2].state["y"])
+    check_equal((3.0, FloatingPoint()), results[3].unwrap()[:2])
@@ -0,0 +1,39 @@
+from stimpl.machine import Machine, evaluate_iterative
+from stimpl.expression import *
+from stimpl.runtime import EmptyState
+from stimpl.types import Integer
+from stimpl.test import check_equal, run_stimpl_sanity_tests
+
+
+def test_iterative_sanity():
+    run_stimpl_sanity_tests(engine="iterative")
+
+
+def test_deep_nesting():
+    depth = 100_000
+    program = IntLiteral(0)
+    for _ in range(depth):
+        program = Add(program, IntLiteral(1))
+    nested = Program(Assign(Variable("x"), program))
+    for _ in range(depth):
+        nested = Sequence(nested)
+
+    value, value_type, state = evaluate_iterative(nested, EmptyState())
+    check_equal((depth, Integer()), (value, value_type))
+    check_equal((depth, Integer()), state.get_value("x"))
+
+
+def test_run_in_slices():
+    program = Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(10)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))),
+        Variable("i"))
+    machine = Machine(program)
+    slices = 0
+    while not machine.run(max_steps=7):
+        slices += 1
+    check_equal(True, slices > 1)
+
+    value, value_type, state = machine.result()
+    check_equal((10, Integer()), (value, value_type))
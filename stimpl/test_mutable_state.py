@@ -0,0 +1,37 @@
+from stimpl.expression import *
+from stimpl.runtime import MutableState, run_stimpl
+from stimpl.types import Boolean, Integer
+from stimpl.test import check_equal
+
+
+def test_mutable_state_implementation():
+    state = MutableState()
+    check_equal(None, state.get_value("x"))
+    check_equal(True, state.set_value("x", 5, Integer()) is state)
+    check_equal((5, Integer()), state.get_value("x"))
+
+    snapshot = state.snapshot()
+    state.set_value("x", 7, Integer())
+    state.set_value("k", True, Boolean())
+    check_equal((7, Integer()), state.get_value("x"))
+    check_equal((True, Boolean()), state.get_value("k"))
+    check_equal((5, Integer()), snapshot.get_value("x"))
+    check_equal(None, snapshot.get_value("k"))
+
+
+def test_mutable_state_mode_matches_persistent():
+    program = Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("total"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(10)),
+              Sequence(
+                  Assign(Variable("total"), Add(
+                      Variable("total"), Variable("i"))),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))),
+        Variable("total"))
+    for engine in ("tree", "closure", "vm", "vm-check"):
+        expected = run_stimpl(program, engine=engine)
+        actual = run_stimpl(program, engine=engine, state_mode="mutable")
+        check_equal(expected[:2], actual[:2])
+        check_equal((45, Integer()), actual[2].get_value("total"))
+        check_equal((10, Integer()), actual[2].get_value("i"))
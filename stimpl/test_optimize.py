@@ -0,0 +1,55 @@
+from stimpl.errors import *
+from stimpl.expression import *
+from stimpl.optimize import optimize, count_nodes
+from stimpl.runtime import run_stimpl
+from stimpl.types import *
+from stimpl.test import check_equal, check_program_raises
+
+
+def test_optimize_folds_literals_and_prunes_branches():
+    program = Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), Add(IntLiteral(2), IntLiteral(2))),
+              Sequence(
+                  StringLiteral("dead"),
+                  Assign(Variable("i"), Add(Variable("i"), Multiply(IntLiteral(1), IntLiteral(1)))),
+                  If(BooleanLiteral(False), Print(Variable("i")), Ren()))),
+        If(Not(BooleanLiteral(False)), Variable("i"), IntLiteral(-1)))
+    expected = run_stimpl(program)
+
+    optimized, removed = optimize(program)
+    check_equal(count_nodes(program) - count_nodes(optimized), removed)
+    check_equal(True, removed > 0)
+    check_equal(True, isinstance(optimized.exprs[1].condition.right, IntLiteral))
+    check_equal(True, isinstance(optimized.exprs[2], Variable))
+
+    actual = run_stimpl(optimized)
+    check_equal(expected[:2], actual[:2])
+    check_equal((4, Integer()), actual[2].get_value("i"))
+
+
+def test_optimize_simplifies_identities_with_known_types():
+    add_zero = Add(Assign(Variable("i"), IntLiteral(5)), IntLiteral(0))
+    optimized, removed = optimize(add_zero)
+    check_equal(True, isinstance(optimized, Assign))
+    check_equal(2, removed)
+
+    # The type of a variable is not known without typecheck, so the And
+    # has to stay to raise if "b" is not a Boolean.
+    and_true = And(BooleanLiteral(True), Variable("b"))
+    optimized, removed = optimize(and_true)
+    check_equal(True, isinstance(optimized, And))
+    check_equal(0, removed)
+
+
+def test_optimize_keeps_runtime_errors():
+    for program, error in [
+        (Divide(IntLiteral(1), IntLiteral(0)), InterpMathError()),
+        (Divide(FloatingPointLiteral(1.0), FloatingPointLiteral(0.0)), InterpMathError()),
+        (Add(IntLiteral(1), FloatingPointLiteral(1.0)), InterpTypeError()),
+        (Program(Add(IntLiteral(1), Multiply(IntLiteral(2), StringLiteral("x"))), IntLiteral(1)), InterpTypeError()),
+        (If(IntLiteral(1), Ren(), Ren()), InterpTypeError()),
+        (Multiply(Variable("x"), IntLiteral(1)), InterpSyntaxError()),
+    ]:
+        optimized, _ = optimize(program)
+        check_program_raises(error, optimized)
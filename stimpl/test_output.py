@@ -0,0 +1,57 @@
+import io
+
+from stimpl.expression import *
+from stimpl.output import BufferedSink, CollectingSink, NullSink, OutputSink, redirect_output
+from stimpl.runtime import run_stimpl
+from stimpl.test import check_equal
+
+ENGINES = ("tree", "closure", "vm", "arena", "iterative")
+
+
+def printing_program():
+    return Program(
+        Print(Ren()),
+        Print(IntLiteral(1)),
+        Print(FloatingPointLiteral(2.5)),
+        Print(StringLiteral("hello")),
+        Print(BooleanLiteral(False)),
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(3)),
+              Print(Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))))
+
+
+def test_engines_print_the_same_text():
+    expected = "Unit\n1\n2.5\nhello\nFalse\n1\n2\n3\n"
+    for engine in ENGINES:
+        sink = CollectingSink()
+        run_stimpl(printing_program(), engine=engine, output=sink)
+        check_equal(expected, sink.getvalue())
+
+
+def test_buffered_sink_flushes_at_threshold():
+    stream = io.StringIO()
+    sink = BufferedSink(stream, flush_threshold=4)
+    with redirect_output(sink):
+        run_stimpl(Print(IntLiteral(1)))
+        check_equal("", stream.getvalue())
+        run_stimpl(Print(IntLiteral(22)))
+        check_equal("1\n22\n", stream.getvalue())
+        run_stimpl(Print(IntLiteral(3)))
+    check_equal("1\n22\n3\n", stream.getvalue())
+
+
+def test_null_sink_discards(capsys):
+    run_stimpl(printing_program(), output=NullSink())
+    check_equal("", capsys.readouterr().out)
+
+
+def test_sink_without_write_line_cannot_be_created():
+    class IncompleteSink(OutputSink):
+        pass
+
+    try:
+        IncompleteSink()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("An OutputSink without write_line was created.")
@@ -0,0 +1,87 @@
+from stimpl.errors import *
+from stimpl.expression import *
+from stimpl.fuse import fuse
+from stimpl.parser import *
+from stimpl.runtime import run_stimpl
+from stimpl.types import *
+from stimpl.test import check_equal
+
+
+def test_readme_syntax():
+    program = parse('''Program(Assign(Variable("four"), Add(IntLiteral(2), IntLiteral(2))),\\
+        # Comments, continuations and trailing commas are allowed.
+        If(And(BooleanLiteral(True), Not(BooleanLiteral(False))),
+           Print(StringLiteral("It's \\\\four\\\\")),
+           Sequence(),),
+        Assign(Variable("half"), Divide(FloatingPointLiteral(-1.0e1), FloatingPointLiteral(2.))),
+        Variable("four"))''')
+    check_equal(True, program == Program(
+        Assign(Variable("four"), Add(IntLiteral(2), IntLiteral(2))),
+        If(And(BooleanLiteral(True), Not(BooleanLiteral(False))),
+           Print(StringLiteral("It's \\four\\")),
+           Sequence()),
+        Assign(Variable("half"), Divide(FloatingPointLiteral(-10.0), FloatingPointLiteral(2.0))),
+        Variable("four")))
+    check_equal((4, Integer()), run_stimpl(program)[:2])
+
+
+def test_unparse_round_trips():
+    program, _ = fuse(Program(
+        Assign(Variable("i"), IntLiteral(-3)),
+        Assign(Variable("s"), StringLiteral("a\n\"b'\x00")),
+        While(Lt(Variable("i"), IntLiteral(10 ** 20)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))),
+        Print(FloatingPointLiteral(-0.0)),
+        Ren()))
+    check_equal(True, parse(unparse(program)) == parse(unparse(parse(unparse(program)))))
+    check_equal("-0x0.0p+0", parse(unparse(program)).exprs[3].to_print.literal.hex())
+    check_equal(type(program.exprs[2]).__mro__[1], type(parse(unparse(program)).exprs[2]))
+
+
+def test_deep_nesting():
+    depth = 100_000
+    program = parse("Not(" * depth + "BooleanLiteral(True)" + ")" * depth)
+    for _ in range(depth):
+        program = program.expr
+    check_equal(True, program == BooleanLiteral(True))
+
+
+def test_errors_carry_positions():
+    cases = [
+        ("Program(\n  Ren()\n  Ren())", "Expected , or )", 3, 3),
+        ("Program(\n  Foo())", "Unknown expression Foo", 2, 3),
+        ("Program(Add(IntLiteral(1)))", "Wrong number of arguments to Add", 1, 9),
+        ("Program(\n    Assign(IntLiteral(1), Ren()))", "Must assign to a variable", 2, 5),
+        ("IntLiteral(1.5)", "Integer literal cannot be float", 1, 1),
+        ("Program(Ren(),", "Unexpected end of input", 1, 15),
+        ("Program(Ren()))", "Expected the end of the input", 1, 15),
+        ("Print(StringLiteral(\"open))", "Unexpected character", 1, 21),
+        ("", "Expected an expression", 1, 1),
+    ]
+    for text, message, line, column in cases:
+        try:
+            parse(text)
+            assert False, f"parsed {text!r}"
+        except InterpSyntaxError as error:
+            check_equal(True, message in str(error))
+            check_equal((line, column), (error.line, error.column))
+
+
+def test_literal_syntax():
+    # Every accepted literal reads as Python reads it.
+    for text in ("IntLiteral(0)", "IntLiteral(-5)", "IntLiteral(1_000)", "IntLiteral(00)",
+                 "FloatingPointLiteral(2.5)", "FloatingPointLiteral(.5)", "FloatingPointLiteral(1.)",
+                 "FloatingPointLiteral(-1e-3)", "FloatingPointLiteral(1_0.0_1e1_0)",
+                 "StringLiteral('a\\tb')", 'StringLiteral("\\u00e9\\"")'):
+        check_equal(eval(text), parse(text))
+
+    # Python forms outside the supported subset, and leading zeros,
+    # which Python rejects.
+    for text in ("IntLiteral(0x10)", "IntLiteral(0o7)", "IntLiteral(0b1)", "IntLiteral(+5)",
+                 "IntLiteral(- 5)", "IntLiteral(007)", "IntLiteral(1_)",
+                 'StringLiteral(r"a\\b")', 'StringLiteral("""x""")', 'StringLiteral("a" "b")'):
+        try:
+            parse(text)
+            assert False, f"parsed {text!r}"
+        except InterpSyntaxError:
+            pass
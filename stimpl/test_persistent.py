@@ -0,0 +1,56 @@
+from stimpl.persistent import PersistentMap
+from stimpl.runtime import EmptyState
+from stimpl.types import Integer
+from stimpl.test import check_equal
+
+
+class CollidingKey(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __hash__(self):
+        return 42
+
+    def __eq__(self, other):
+        return isinstance(other, CollidingKey) and self.name == other.name
+
+
+def test_persistent_map_keeps_old_versions():
+    versions = [PersistentMap()]
+    for i in range(2000):
+        versions.append(versions[-1].set(f"v{i}", i))
+
+    check_equal(2000, len(versions[-1]))
+    check_equal(None, versions[10].get("v10"))
+    check_equal(9, versions[10].get("v9"))
+    for i in range(2000):
+        check_equal(i, versions[-1].get(f"v{i}"))
+
+    updated = versions[-1].set("v7", -7)
+    check_equal(-7, updated.get("v7"))
+    check_equal(7, versions[-1].get("v7"))
+    check_equal(2000, len(updated))
+
+
+def test_persistent_map_hash_collisions():
+    keys = [CollidingKey(name) for name in "abcde"]
+    collided = PersistentMap()
+    for index, key in enumerate(keys):
+        collided = collided.set(key, index)
+    collided = collided.set("other", "value")
+
+    check_equal(6, len(collided))
+    for index, key in enumerate(keys):
+        check_equal(index, collided.get(key))
+    check_equal("value", collided.get("other"))
+    check_equal(None, collided.get(CollidingKey("z")))
+    check_equal(10, collided.set(keys[2], 10).get(keys[2]))
+    check_equal(2, collided.get(keys[2]))
+
+
+def test_state_size_tracks_live_variables():
+    state = EmptyState()
+    for i in range(1000):
+        state = state.set_value("i", i, Integer())
+    check_equal(1, len(state))
+    check_equal((999, Integer()), state.get_value("i"))
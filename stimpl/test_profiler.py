@@ -0,0 +1,66 @@
+import threading
+
+import stimpl.runtime
+from stimpl.expression import *
+from stimpl.profiler import Profile, profiling
+from stimpl.runtime import run_stimpl, _current_hooks
+from stimpl.test import check_equal
+
+
+def counting_loop(iterations):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("j"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))))
+
+
+def test_profile_counts():
+    evaluate = stimpl.runtime.evaluate
+    profile = Profile()
+    run_stimpl(counting_loop(5), profile=profile)
+    check_equal(True, stimpl.runtime.evaluate is evaluate)
+
+    check_equal(1, profile.by_type["While"].count)
+    check_equal(6, profile.by_type["Lt"].count)
+    check_equal(7, profile.by_type["Assign"].count)
+    check_equal(2, profile.peak_state_size)
+    for stats in profile.by_type.values():
+        check_equal(True, stats.exclusive <= stats.inclusive + 1e-9)
+
+    adds = [stats for node, stats in profile.by_node.values() if isinstance(node, Add)]
+    check_equal([5], [stats.count for stats in adds])
+
+
+def test_report_and_collapsed_stacks():
+    with profiling() as profile:
+        run_stimpl(counting_loop(3))
+    report = profile.report()
+    check_equal(True, "While" in report and "peak state size: 2" in report)
+
+    stacks = dict(line.rsplit(" ", 1) for line in profile.collapsed_stacks().splitlines())
+    check_equal(True, "Program;While;Assign;Add;Variable" in stacks)
+
+
+def test_blocks_may_end_in_any_order():
+    first_block = profiling()
+    first = first_block.__enter__()
+    second_block = profiling()
+    second = second_block.__enter__()
+    first_block.__exit__(None, None, None)
+    run_stimpl(counting_loop(2))
+    second_block.__exit__(None, None, None)
+    run_stimpl(counting_loop(2))
+
+    check_equal(True, "While" not in first.by_type)
+    check_equal(1, second.by_type["While"].count)
+    check_equal(((), None), _current_hooks.get())
+    check_equal(True, stimpl.runtime.evaluate is stimpl.runtime._plain_evaluate)
+
+
+def test_profiling_is_per_thread():
+    with profiling() as profile:
+        thread = threading.Thread(target=run_stimpl, args=(counting_loop(2),))
+        thread.start()
+        thread.join()
+    check_equal(True, "While" not in profile.by_type)
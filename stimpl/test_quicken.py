@@ -0,0 +1,37 @@
+from stimpl.expression import *
+from stimpl.output import CollectingSink
+from stimpl.runtime import run_stimpl
+from stimpl.types import *
+from stimpl.test import check_equal
+
+
+def test_operators_are_quickened():
+    add = Add(Variable("i"), IntLiteral(1))
+    compare = Lt(Variable("i"), IntLiteral(3))
+    program = Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(compare, Assign(Variable("i"), add)))
+    check_equal(None, add.quickened)
+    run_stimpl(program)
+    check_equal(Integer(), add.quickened[0])
+    check_equal((Integer(), Boolean()), (compare.quickened[0], compare.quickened[2]))
+
+
+def test_deoptimizes_when_types_change():
+    # The same Add sees Integers and FloatingPoints on alternate
+    # iterations, and finally mismatched operands.
+    flip = Variable("flip")
+    add = Add(If(flip, IntLiteral(1), FloatingPointLiteral(1.5)),
+              If(flip, IntLiteral(2), FloatingPointLiteral(2.5)))
+    program = Program(
+        Assign(Variable("flip"), BooleanLiteral(True)),
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(4)),
+              Sequence(
+                  Print(add),
+                  Assign(Variable("flip"), Not(flip)),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))))
+    sink = CollectingSink()
+    run_stimpl(program, output=sink)
+    check_equal(["3", "4.0", "3", "4.0"], sink.lines)
+    check_equal(FloatingPoint(), add.quickened[0])
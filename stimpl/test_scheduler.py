@@ -0,0 +1,102 @@
+import asyncio
+
+from stimpl.errors import *
+from stimpl.expression import *
+from stimpl.output import AsyncOutputSink
+from stimpl.scheduler import *
+from stimpl.types import *
+from stimpl.test import check_equal
+
+
+def counting_program(limit):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(limit)),
+              Assign(Variable("i"), Print(Add(Variable("i"), IntLiteral(1))))),
+        Variable("i"))
+
+
+class SlowSink(AsyncOutputSink):
+    def __init__(self) -> None:
+        self.lines = []
+
+    async def write_line(self, line: str) -> None:
+        await asyncio.sleep(0)
+        self.lines.append(line)
+
+
+def test_run_stimpl_async():
+    sink = SlowSink()
+    value, value_type, state = asyncio.run(
+        run_stimpl_async(counting_program(5), slice_steps=3, output=sink))
+    check_equal((5, Integer()), (value, value_type))
+    check_equal((5, Integer()), state.get_value("i"))
+    check_equal(["1", "2", "3", "4", "5"], sink.lines)
+
+
+def test_long_programs_do_not_block_short_ones():
+    async def main():
+        scheduler = Scheduler(slice_steps=50)
+        finished = []
+        tasks = [scheduler.submit(counting_program(limit)) for limit in (2000, 5)]
+        for task in tasks:
+            task.add_done_callback(lambda task: finished.append(task.result().index))
+        await asyncio.wait(tasks)
+        return finished, [task.result() for task in tasks]
+
+    finished, results = asyncio.run(main())
+    check_equal([1, 0], finished)
+    check_equal((2000, Integer()), results[0].unwrap()[:2])
+    check_equal([str(i) for i in range(1, 6)], results[1].output)
+
+
+def test_budgets_and_cancellation():
+    async def main():
+        scheduler = Scheduler(concurrency=1, slice_steps=10, max_steps=1000)
+        forever = scheduler.submit(Program(Assign(Variable("x"), IntLiteral(1)),
+                                           While(BooleanLiteral(True), Ren())))
+        cancelled = scheduler.submit(counting_program(10 ** 9), max_steps=10 ** 9)
+        short = scheduler.submit(counting_program(3))
+        await asyncio.sleep(0.05)
+        scheduler.cancel()
+        await asyncio.wait([forever, cancelled, short])
+        return forever.result(), cancelled.cancelled(), short.cancelled()
+
+    forever, cancelled, short = asyncio.run(main())
+    check_equal(True, isinstance(forever.error, InterpBudgetError))
+    check_equal(1000, forever.error.steps)
+    check_equal((1, Integer()), forever.error.state.get_value("x"))
+    check_equal(True, cancelled)
+    # Cancelled while waiting for its turn.
+    check_equal(True, short)
+
+
+def test_cancellation_propagates():
+    async def main():
+        scheduler = Scheduler(slice_steps=10)
+        sink = SlowSink()
+        task = scheduler.submit(counting_program(10 ** 8), output=sink)
+        try:
+            async with asyncio.timeout(0.05):
+                await task
+        except TimeoutError:
+            return task.cancelled(), sink.lines
+        raise AssertionError("The timeout did not cancel the program.")
+
+    cancelled, lines = asyncio.run(main())
+    check_equal(True, cancelled)
+    # Lines printed before the cancellation were flushed to the sink.
+    check_equal([str(i) for i in range(1, len(lines) + 1)], lines)
+    check_equal(True, len(lines) > 0)
+
+
+def test_async_sink_without_write_line_cannot_be_created():
+    class IncompleteSink(AsyncOutputSink):
+        pass
+
+    try:
+        IncompleteSink()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("An AsyncOutputSink without write_line was created.")
@@ -0,0 +1,93 @@
+import struct
+
+from stimpl.arena import build_arena, evaluate_arena
+from stimpl.bytecode import compile_bytecode
+from stimpl.expression import *
+from stimpl.fuse import fuse
+from stimpl.machine import Machine
+from stimpl.runtime import run_stimpl
+from stimpl.serialize import *
+from stimpl.types import *
+from stimpl.vm import run_vm
+from stimpl.test import check_equal
+
+
+def sample_program():
+    return Program(
+        Assign(Variable("x"), IntLiteral(-300)),
+        Assign(Variable("zero"), FloatingPointLiteral(-0.0)),
+        Assign(Variable("s"), StringLiteral("héllo")),
+        Assign(Variable("b"), BooleanLiteral(True)),
+        While(Lt(Variable("x"), IntLiteral(10 ** 30)),
+              Assign(Variable("x"), Multiply(Variable("x"), IntLiteral(-7)))),
+        If(And(Variable("b"), Not(BooleanLiteral(False))), Ren(), Sequence()),
+        Variable("x"))
+
+
+def test_programs_round_trip():
+    program = sample_program()
+    loaded = deserialize(serialize(program))
+    check_equal(True, loaded == program)
+    check_equal(run_stimpl(program)[:2], run_stimpl(loaded)[:2])
+    check_equal("-0x0.0p+0", loaded.exprs[1].value.literal.hex())
+
+    fused, _ = fuse(program)
+    loaded = deserialize(serialize(fused))
+    check_equal(type(fused.exprs[4]), type(loaded.exprs[4]))
+
+
+def test_equal_subtrees_are_written_once():
+    statement = Assign(Variable("x"), Add(Variable("x"), IntLiteral(1)))
+    program = Program(Assign(Variable("x"), IntLiteral(0)),
+                      *[Assign(Variable("x"), Add(Variable("x"), IntLiteral(1))) for _ in range(100)])
+    loaded = deserialize(serialize(program))
+    check_equal(True, loaded.exprs[1] is loaded.exprs[100])
+    check_equal(True, len(serialize(program)) < len(serialize(statement)) + 1000)
+    check_equal(structural_digest(program), structural_digest(loaded))
+
+
+def test_compiled_forms_round_trip(tmp_path):
+    program = sample_program()
+    expected = run_stimpl(program)[:2]
+
+    write_serialized(str(tmp_path / "bytecode"), compile_bytecode(program))
+    code_object = load_serialized(str(tmp_path / "bytecode"))
+    check_equal(True, isinstance(code_object.code, memoryview))
+    check_equal(expected, run_vm(code_object)[:2])
+
+    write_serialized(str(tmp_path / "arena"), build_arena(program))
+    check_equal(expected, evaluate_arena(load_serialized(str(tmp_path / "arena")))[:2])
+
+
+def test_other_format_versions_are_rejected():
+    data = bytearray(serialize(sample_program()))
+    struct.pack_into("<H", data, 4, FORMAT_VERSION + 1)
+    try:
+        deserialize(data)
+        assert False, "loaded another format version"
+    except SerializationError:
+        pass
+
+    for corrupt in (b"", b"STPL", bytes(serialize(sample_program()))[:60]):
+        try:
+            deserialize(corrupt)
+            assert False, "loaded corrupt data"
+        except SerializationError:
+            pass
+
+
+def test_machine_snapshots_resume():
+    program = sample_program()
+    expected = run_stimpl(program)
+    expected = (expected[0], expected[1], dict(expected[2].bindings.items()))
+    total = Machine(program)
+    total.run()
+    # A snapshot taken after any number of steps finishes the same way.
+    for steps in range(total.steps + 1):
+        machine = Machine(program)
+        machine.run(steps)
+        resumed = deserialize(serialize(machine))
+        check_equal(steps, resumed.steps)
+        resumed.run()
+        value, value_type, state = resumed.result()
+        check_equal(expected, (value, value_type, dict(state.bindings.items())))
@@ -0,0 +1,64 @@
+import io
+
+from stimpl.errors import *
+from stimpl.expression import *
+from stimpl.output import CollectingSink, redirect_output
+from stimpl.parser import parse
+from stimpl.runtime import run_stimpl
+from stimpl.stream import *
+from stimpl.types import *
+from stimpl.test import check_equal
+
+TEXT = '''Program(
+    Assign(Variable("i"), IntLiteral(0)),
+    Print(StringLiteral("started")),
+    While(Lt(Variable("i"), IntLiteral(10)),
+          Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))),
+    Print(Variable("i")),
+    Variable("i"))'''
+
+
+def test_streams_match_whole_programs():
+    expected = run_stimpl(parse(TEXT))[:2]
+    for engine in ("tree", "iterative", "vm", "arena"):
+        for chunk_size in (1, 7, 1 << 16):
+            with redirect_output(CollectingSink()) as sink:
+                value, value_type, state = run_stream(io.StringIO(TEXT), engine=engine,
+                                                      chunk_size=chunk_size)
+            check_equal(expected, (value, value_type))
+            check_equal(["started", "10"], sink.lines)
+            check_equal((10, Integer()), state.get_value("i"))
+    check_equal((None, Unit()), run_stream(["Program()"])[:2])
+
+
+def test_expressions_run_as_they_are_read():
+    sink = CollectingSink()
+    seen = []
+
+    def chunks():
+        yield 'Program(Print(StringLiteral("first")), '
+        seen.append(list(sink.lines))
+        yield 'Print(StringLiteral("second")))'
+
+    with redirect_output(sink):
+        run_stream(chunks())
+    check_equal([["first"]], seen)
+    check_equal(["first", "second"], sink.lines)
+
+
+def test_errors_after_earlier_output():
+    sink = CollectingSink()
+    try:
+        with redirect_output(sink):
+            run_stream(io.StringIO('Program(Print(IntLiteral(1)),\n  Print(IntLiteral(2))\n  Ren())'),
+                       chunk_size=4)
+        assert False, "ran a malformed program"
+    except InterpSyntaxError as error:
+        check_equal((3, 3), (error.line, error.column))
+    check_equal(["1", "2"], sink.lines)
+
+    try:
+        run_stream(["Program()"], engine="transpile")
+        assert False, "streamed with the transpile engine"
+    except ValueError:
+        pass
@@ -0,0 +1,68 @@
+from stimpl.expression import *
+from stimpl.errors import *
+from stimpl.runtime import evaluate, EmptyState
+from stimpl.transpile import transpile, run_transpiled
+from stimpl.types import *
+from stimpl.test import check_equal, check_program_raises, run_stimpl_sanity_tests
+
+
+def counting_loop(iterations):
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(iterations)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))),
+        Variable("i"))
+
+
+def test_transpile_sanity():
+    run_stimpl_sanity_tests(engine="transpile")
+
+
+def test_typed_variables_are_raw_locals():
+    transpiled = transpile(counting_loop(10))
+    check_equal({"i": Integer()}, transpiled.typed)
+    check_equal(True, "while (v0 < 10):" in transpiled.source)
+
+    value, value_type, state = run_transpiled(transpiled)
+    check_equal((10, Integer()), (value, value_type))
+    check_equal((10, Integer()), state.get_value("i"))
+
+
+def test_runtime_errors_match_evaluate():
+    # A typed variable read before it is assigned.
+    check_program_raises(InterpSyntaxError(), Program(
+        Print(Variable("i")), Assign(Variable("i"), IntLiteral(1))), engine="transpile")
+    # Ill-typed code is only an error if it runs.
+    program = Program(
+        Assign(Variable("x"), IntLiteral(1)),
+        If(BooleanLiteral(False), Assign(Variable("x"), StringLiteral("s")), Ren()),
+        Variable("x"))
+    check_equal((1, Integer()), run_transpiled(transpile(program))[:2])
+    check_program_raises(InterpMathError(), Divide(
+        IntLiteral(1), Subtract(IntLiteral(1), IntLiteral(1))), engine="transpile")
+
+
+def test_initial_state_and_deep_expressions():
+    program = IntLiteral(0)
+    for _ in range(250):
+        program = Add(program, Variable("step"))
+    program = Program(Assign(Variable("total"), program))
+
+    transpiled = transpile(program, {"step": Integer()})
+    state = EmptyState().set_value("unused", "kept", String()).set_value("step", 2, Integer())
+    value, value_type, final_state = run_transpiled(transpiled, state)
+    check_equal((500, Integer()), (value, value_type))
+    check_equal(True, "t1 = " in transpiled.source)
+    check_equal(("kept", String()), final_state.get_value("unused"))
+
+
+def test_transpile_leaves_the_program_unannotated():
+    program = Program(Assign(Variable("x"), IntLiteral(1)))
+    transpile(program)
+    check_equal(None, program.exprs[0].static_type)
+    try:
+        evaluate(program, EmptyState().set_value("x", "s", String()))
+    except InterpTypeError:
+        pass
+    else:
+        raise AssertionError("Expected an InterpTypeError.")
@@ -0,0 +1,90 @@
+from stimpl.errors import InterpTypeError
+from stimpl.expression import *
+from stimpl.runtime import evaluate, run_stimpl, EmptyState
+from stimpl.typecheck import typecheck
+from stimpl.types import *
+from stimpl.test import check_equal
+
+
+def counting_program():
+    return Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        Assign(Variable("total"), FloatingPointLiteral(0.0)),
+        While(Lt(Variable("i"), IntLiteral(10)),
+              Sequence(
+                  Assign(Variable("total"), Add(Variable("total"),
+                         FloatingPointLiteral(0.5))),
+                  Assign(Variable("i"), Add(Variable("i"), IntLiteral(1))))),
+        Divide(Variable("total"), FloatingPointLiteral(2.0)))
+
+
+def test_typecheck_infers_variables_and_nodes():
+    program = counting_program()
+    variable_types = typecheck(program)
+    check_equal(Integer(), variable_types["i"])
+    check_equal(FloatingPoint(), variable_types["total"])
+    check_equal(FloatingPoint(), program.static_type)
+    check_equal(Boolean(), program.exprs[2].condition.static_type)
+
+    # Comparing Units never compares the values, so it stays unproven.
+    comparison = Lt(Ren(), Ren())
+    typecheck(comparison)
+    check_equal(None, comparison.static_type)
+
+
+def test_typecheck_reports_errors_before_execution():
+    program = Program(
+        Print(StringLiteral("never printed")),
+        Assign(Variable("i"), IntLiteral(1)),
+        If(BooleanLiteral(False),
+           Assign(Variable("i"), StringLiteral("one")),
+           Ren()))
+    try:
+        typecheck(program)
+    except InterpTypeError:
+        return
+    raise AssertionError("typecheck should have raised InterpTypeError")
+
+
+def test_typechecked_runs_match_dynamic_runs():
+    for engine in ("tree", "closure"):
+        expected = run_stimpl(counting_program(), engine=engine)
+        actual = run_stimpl(counting_program(), engine=engine, typecheck=True)
+        check_equal(expected[:2], actual[:2])
+        check_equal((2.5, FloatingPoint()), actual[:2])
+        check_equal((10, Integer()), actual[2].get_value("i"))
+
+
+def test_variables_of_unproven_type_stay_unknown():
+    # x is first assigned a value of either type, so the later Integer
+    # assignment must not make the Add proven.
+    def unproven_program():
+        return Program(
+            Assign(Variable("x"), If(BooleanLiteral(False), IntLiteral(1), StringLiteral("a"))),
+            Assign(Variable("y"), Add(Variable("x"), IntLiteral(1))),
+            Assign(Variable("x"), IntLiteral(2)))
+
+    program = unproven_program()
+    typecheck(program)
+    check_equal(None, program.exprs[1].value.static_type)
+    check_equal(None, program.exprs[2].static_type)
+
+    for engine in ("tree", "closure"):
+        try:
+            run_stimpl(unproven_program(), engine=engine, typecheck=True)
+        except InterpTypeError:
+            pass
+        else:
+            raise AssertionError("Expected an InterpTypeError.")
+
+
+def test_run_stimpl_leaves_the_program_unannotated():
+    program = Program(Assign(Variable("x"), IntLiteral(1)))
+    run_stimpl(program, typecheck=True)
+    check_equal(None, program.exprs[0].static_type)
+    try:
+        evaluate(program, EmptyState().set_value("x", "s", String()))
+    except InterpTypeError:
+        pass
+    else:
+        raise AssertionError("Expected an InterpTypeError.")
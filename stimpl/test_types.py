@@ -0,0 +1,20 @@
+import pickle
+
+from stimpl.types import *
+from stimpl.test import check_equal
+
+
+def test_types_are_singletons():
+    for type_class in (Unit, Integer, FloatingPoint, String, Boolean):
+        check_equal(True, type_class() is type_class())
+        check_equal(True, pickle.loads(pickle.dumps(type_class())) is type_class())
+    check_equal(True, Integer() == INTEGER)
+    check_equal(False, Integer() == FloatingPoint())
+    check_equal(True, Integer() != String())
+    check_equal(2, len({Integer(), INTEGER, Boolean()}))
+
+
+def test_tagged_values_are_interned():
+    check_equal(True, tagged_boolean(1 < 2) is TRUE_VALUE)
+    check_equal(True, tagged_boolean(2 < 1) is FALSE_VALUE)
+    check_equal((None, Unit()), UNIT_VALUE)
@@ -0,0 +1,28 @@
+from stimpl.bytecode import compile_bytecode, disassemble
+from stimpl.expression import *
+from stimpl.types import Integer
+from stimpl.vm import run_vm
+from stimpl.test import check_equal, run_stimpl_sanity_tests
+
+
+def test_vm_sanity():
+    run_stimpl_sanity_tests(engine="vm")
+
+
+def test_vm_matches_evaluate():
+    run_stimpl_sanity_tests(engine="vm-check")
+
+
+def test_vm_loop_and_disassembly():
+    code_object = compile_bytecode(Program(
+        Assign(Variable("i"), IntLiteral(0)),
+        While(Lt(Variable("i"), IntLiteral(5)),
+              Assign(Variable("i"), Add(Variable("i"), IntLiteral(1)))),
+        Variable("i")))
+    value, value_type, state = run_vm(code_object)
+    check_equal((5, Integer()), (value, value_type))
+    check_equal((5, Integer()), state.get_value("i"))
+
+    listing = disassemble(code_object)
+    check_equal(True, "BRANCH_WHILE" in listing)
+    check_equal(True, ">>" in listing)
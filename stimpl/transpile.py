@@ -0,0 +1,527 @@
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from stimpl.bytecode import *
+from stimpl.expression import *
+from stimpl.types import *
+from stimpl.errors import *
+from stimpl.output import print_value
+from stimpl.runtime import State, EmptyState
+from stimpl.vm import binary_operation, _ADDABLE, _NUMERIC, _COMPARABLE
+
+"""
+Ahead-of-time translation to Python.
+
+transpile turns a program into the source of a single Python function and
+compiles it once; run_transpiled then calls that function. Every STIMPL
+variable becomes a local (v0, v1, ...), While becomes while, If becomes if
+(or a conditional expression), and Assign becomes an assignment (or :=).
+
+The types of variables come from typecheck. A variable whose type is fixed
+and whose every assignment has a proven type holds its raw Python value;
+reading it before it is assigned raises UnboundLocalError, which is turned
+into the usual InterpSyntaxError. Every other variable holds a (value,
+type) pair and is checked on each assignment, exactly as evaluate does.
+
+While translating, the transpiler tracks the type of every expression it
+can. Operators whose operand types are known and valid become plain Python
+operators; everything else goes through the VM's binary_operation, so type
+errors are raised, with the same messages, when the program runs -- not
+when it is transpiled.
+"""
+
+_RAW_OPERATORS = {
+    ADD: "+",
+    SUBTRACT: "-",
+    MULTIPLY: "*",
+    AND: "&",
+    OR: "|",
+    LT: "<",
+    LTE: "<=",
+    GT: ">",
+    GTE: ">=",
+    EQ: "==",
+    NE: "!=",
+}
+
+_TYPE_NAMES = {
+    UNIT: "UNIT",
+    INTEGER: "INTEGER",
+    FLOATING_POINT: "FLOATING_POINT",
+    STRING: "STRING",
+    BOOLEAN: "BOOLEAN",
+}
+
+_LITERALS = (Ren, IntLiteral, FloatingPointLiteral, StringLiteral, BooleanLiteral)
+
+# Subexpressions this deep are moved into temporaries so that CPython's
+# parser never sees too many nested parentheses.
+_SPILL_DEPTH = 32
+
+
+class _Unbound(object):
+    def __repr__(self) -> str:
+        return "<unbound>"
+
+
+_UNBOUND = _Unbound()
+
+
+def _divide_integer(left: int, right: int) -> int:
+    if right == 0:
+        raise InterpMathError("Cannot divide by zero.")
+    return left // right
+
+
+def _divide_floating_point(left: float, right: float) -> float:
+    if right == 0:
+        raise InterpMathError("Cannot divide by zero.")
+    return left / right
+
+
+def _print(value: Any, value_type: Type) -> Any:
+    print_value(value, value_type)
+    return value
+
+
+def _print_tagged(result: Tuple[Any, Type]) -> Tuple[Any, Type]:
+    print_value(*result)
+    return result
+
+
+def _not(result: Tuple[Any, Type]) -> bool:
+    if result[1] is not BOOLEAN:
+        raise InterpTypeError(
+            "Cannot perform logical not on non-boolean operand.")
+    return not result[0]
+
+
+def _condition(result: Tuple[Any, Type], kind: str) -> bool:
+    if result[1] is not BOOLEAN:
+        raise InterpTypeError(f"Cannot use {result[1]} as {kind} condition.")
+    return result[0]
+
+
+def _read(variable: Any, variable_name: str) -> Tuple[Any, Type]:
+    if variable is _UNBOUND:
+        raise InterpSyntaxError(
+            f"Cannot read from {variable_name} before assignment.")
+    return variable
+
+
+def _assign(result: Tuple[Any, Type], variable: Any) -> Tuple[Any, Type]:
+    if variable is not _UNBOUND and variable[1] is not result[1]:
+        raise InterpTypeError(f"""Mismatched types for Assignment:
+            Cannot assign {result[1]} to {variable[1]}""")
+    return result
+
+
+def _expect(result: Tuple[Any, Type], variable_type: Type) -> Any:
+    if result[1] is not variable_type:
+        raise InterpTypeError(f"""Mismatched types for Assignment:
+            Cannot assign {result[1]} to {variable_type}""")
+    return result[0]
+
+
+class _Translator(object):
+    def __init__(self, names: List[str], typed: Dict[str, Type]) -> None:
+        self.names = names
+        self.slots = {name: f"v{index}" for index, name in enumerate(names)}
+        self.typed = typed
+        self.constants: Dict[str, Any] = {}
+        self.lines: List[str] = []
+        self.temps = 0
+        self.depth = 0
+
+    def temp(self) -> str:
+        self.temps += 1
+        return f"t{self.temps}"
+
+    def emit(self, line: str) -> None:
+        self.lines.append(line)
+
+    def block(self, expression: Expr, as_statement: bool) -> Tuple[List[str], Optional[Tuple[str, Optional[Type]]]]:
+        """
+        Translate expression into a fresh list of lines. Returns the lines
+        and, unless as_statement, the code and type of its value.
+        """
+        outer = self.lines
+        self.lines = []
+        try:
+            if as_statement:
+                self.statement(expression)
+                result = None
+            else:
+                result = self.expr(expression)
+            return self.lines, result
+        finally:
+            self.lines = outer
+
+    def indented(self, lines: List[str]) -> None:
+        self.lines.extend("    " + line for line in lines)
+
+    def constant(self, value: Any, value_type: Type) -> str:
+        if value_type is UNIT:
+            return "None"
+        if value_type is FLOATING_POINT and not math.isfinite(value):
+            name = f"c{len(self.constants)}"
+            self.constants[name] = value
+            return name
+        return repr(value)
+
+    def tagged(self, code: str, value_type: Optional[Type]) -> str:
+        if value_type is None:
+            return code
+        return f"({code}, {_TYPE_NAMES[value_type]})"
+
+    def expr(self, expression: Expr) -> Tuple[str, Optional[Type]]:
+        """
+        Emit any statements expression needs and return the Python code
+        for its value together with its type. Code whose type is None
+        evaluates to a (value, type) pair; any other code evaluates to the
+        raw value.
+        """
+        self.depth += 1
+        try:
+            code, code_type = self._expr(expression)
+        finally:
+            self.depth -= 1
+        if self.depth and self.depth % _SPILL_DEPTH == 0 and not code.isidentifier():
+            temp = self.temp()
+            self.emit(f"{temp} = {code}")
+            code = temp
+        return code, code_type
+
+    def _expr(self, expression: Expr) -> Tuple[str, Optional[Type]]:
+        match expression:
+            case Ren():
+                return ("None", UNIT)
+
+            case IntLiteral(literal=l):
+                return (self.constant(l, INTEGER), INTEGER)
+
+            case FloatingPointLiteral(literal=l):
+                return (self.constant(l, FLOATING_POINT), FLOATING_POINT)
+
+            case StringLiteral(literal=l):
+                return (self.constant(l, STRING), STRING)
+
+            case BooleanLiteral(literal=l):
+                return (self.constant(l, BOOLEAN), BOOLEAN)
+
+            case Print(to_print=to_print):
+                code, code_type = self.expr(to_print)
+                if code_type is None:
+                    return (f"_print_tagged({code})", None)
+                return (f"_print({code}, {_TYPE_NAMES[code_type]})", code_type)
+
+            case Sequence(exprs=exprs) | Program(exprs=exprs):
+                if not exprs:
+                    return ("None", UNIT)
+                for expr in exprs[:-1]:
+                    self.statement(expr)
+                return self.expr(exprs[-1])
+
+            case Variable(variable_name=variable_name):
+                slot = self.slots[variable_name]
+                if variable_name in self.typed:
+                    return (slot, self.typed[variable_name])
+                return (f"_read({slot}, {variable_name!r})", None)
+
+            case Assign(variable=variable, value=value):
+                slot = self.slots[variable.variable_name]
+                code, code_type = self.expr(value)
+                variable_type = self.typed.get(variable.variable_name)
+                if variable_type is None:
+                    # The value is evaluated before the variable is read: it may
+                    # assign the variable itself.
+                    return (f"({slot} := _assign({self.tagged(code, code_type)}, {slot}))", None)
+                if code_type is not variable_type:
+                    code = f"_expect({self.tagged(code, code_type)}, {_TYPE_NAMES[variable_type]})"
+                return (f"({slot} := {code})", variable_type)
+
+            case Not(expr=expr):
+                code, code_type = self.expr(expr)
+                if code_type is BOOLEAN:
+                    return (f"(not {code})", BOOLEAN)
+                return (f"_not({self.tagged(code, code_type)})", BOOLEAN)
+
+            case If(condition=condition, true=true, false=false):
+                condition_code = self.condition(condition, "an If")
+                true_lines, (true_code, true_type) = self.block(true, False)
+                false_lines, (false_code, false_type) = self.block(false, False)
+                result_type = true_type if true_type is false_type else None
+                if result_type is None:
+                    true_code = self.tagged(true_code, true_type)
+                    false_code = self.tagged(false_code, false_type)
+                if not true_lines and not false_lines:
+                    return (f"({true_code} if {condition_code} else {false_code})", result_type)
+                temp = self.temp()
+                self.emit(f"if {condition_code}:")
+                self.indented(true_lines + [f"{temp} = {true_code}"])
+                self.emit("else:")
+                self.indented(false_lines + [f"{temp} = {false_code}"])
+                return (temp, result_type)
+
+            case While(condition=condition, body=body):
+                self.loop(condition, body)
+                return ("False", BOOLEAN)
+
+            case BinaryOperator(left=left, right=right) if type(expression) in BINARY_OPCODES:
+                return self.binary(BINARY_OPCODES[type(expression)], left, right)
+
+            case _:
+                raise InterpSyntaxError("Unhandled!")
+
+    def binary(self, opcode: int, left: Expr, right: Expr) -> Tuple[str, Optional[Type]]:
+        left_code, left_type = self.expr(left)
+        mark = len(self.lines)
+        right_code, right_type = self.expr(right)
+        if len(self.lines) > mark and not isinstance(left, _LITERALS):
+            # The right operand needs statements of its own; they must run
+            # after the left operand has been evaluated.
+            temp = self.temp()
+            self.lines.insert(mark, f"{temp} = {left_code}")
+            left_code = temp
+
+        if left_type is not None and left_type is right_type:
+            if opcode == DIVIDE and left_type is INTEGER:
+                return (f"_divide_integer({left_code}, {right_code})", INTEGER)
+            if opcode == DIVIDE and left_type is FLOATING_POINT:
+                return (f"_divide_floating_point({left_code}, {right_code})", FLOATING_POINT)
+            if (opcode == ADD and left_type in _ADDABLE) \
+                    or (opcode in (SUBTRACT, MULTIPLY) and left_type in _NUMERIC) \
+                    or (opcode in (AND, OR) and left_type is BOOLEAN):
+                return (f"({left_code} {_RAW_OPERATORS[opcode]} {right_code})", left_type)
+            if opcode >= LT and left_type in _COMPARABLE:
+                return (f"({left_code} {_RAW_OPERATORS[opcode]} {right_code})", BOOLEAN)
+
+        code = f"_binary({opcode}, {self.tagged(left_code, left_type)}, {self.tagged(right_code, right_type)})"
+        # When binary_operation returns, the type of its result is fixed for
+        # logical and relational operators, and for arithmetic it is the
+        # type of either operand.
+        result_type = BOOLEAN if opcode >= AND else (left_type or right_type)
+        if result_type is None:
+            return (code, None)
+        return (f"{code}[0]", result_type)
+
+    def condition(self, condition: Expr, kind: str) -> str:
+        code, code_type = self.expr(condition)
+        if code_type is BOOLEAN:
+            return code
+        return f"_condition({self.tagged(code, code_type)}, {kind!r})"
+
+    def loop(self, condition: Expr, body: Expr) -> None:
+        outer = self.lines
+        self.lines = []
+        condition_code = self.condition(condition, "a While")
+        condition_lines = self.lines
+        self.lines = outer
+        body_lines, _ = self.block(body, True)
+
+        if not condition_lines:
+            self.emit(f"while {condition_code}:")
+            self.indented(body_lines or ["pass"])
+            return
+        self.emit("while True:")
+        self.indented(condition_lines + [f"if not {condition_code}:", "    break"] + body_lines)
+
+    def statement(self, expression: Expr) -> None:
+        """
+        Emit expression for its effects only.
+        """
+        match expression:
+            case Ren() | IntLiteral() | FloatingPointLiteral() | StringLiteral() | BooleanLiteral():
+                pass
+
+            case Sequence(exprs=exprs) | Program(exprs=exprs):
+                for expr in exprs:
+                    self.statement(expr)
+
+            case Assign():
+                code, _ = self._expr(expression)
+                # Drop the walrus and the parentheses around it.
+                self.emit(code[1:-1].replace(" := ", " = ", 1))
+
+            case If(condition=condition, true=true, false=false):
+                condition_code = self.condition(condition, "an If")
+                true_lines, _ = self.block(true, True)
+                false_lines, _ = self.block(false, True)
+                self.emit(f"if {condition_code}:")
+                self.indented(true_lines or ["pass"])
+                if false_lines:
+                    self.emit("else:")
+                    self.indented(false_lines)
+
+            case While(condition=condition, body=body):
+                self.loop(condition, body)
+
+            case _:
+                code, _ = self.expr(expression)
+                # Temporaries have no effects left to run, but a bare
+                # variable must still be read in case it is unbound.
+                if not code.isidentifier() or code.startswith("v"):
+                    self.emit(code)
+
+
+def _variable_names(program: Expr) -> List[str]:
+    names = {}
+    pending = [program]
+    while pending:
+        node = pending.pop()
+        match node:
+            case Variable(variable_name=variable_name):
+                names[variable_name] = None
+            case Print(to_print=child) | Not(expr=child):
+                pending.append(child)
+            case Assign(variable=variable, value=value):
+                pending.extend((variable, value))
+            case BinaryOperator(left=left, right=right):
+                pending.extend((left, right))
+            case Sequence(exprs=exprs) | Program(exprs=exprs):
+                pending.extend(exprs)
+            case If(condition=condition, true=true, false=false):
+                pending.extend((condition, true, false))
+            case While(condition=condition, body=body):
+                pending.extend((condition, body))
+    return sorted(names)
+
+
+def _untyped_assignments(program: Expr) -> set:
+    """
+    The names of variables that some assignment gives a value of unproven
+    type.
+    """
+    untyped = set()
+    pending = [program]
+    while pending:
+        node = pending.pop()
+        match node:
+            case Assign(variable=variable, value=value):
+                if value.static_type is None:
+                    untyped.add(variable.variable_name)
+                pending.append(value)
+            case Print(to_print=child) | Not(expr=child):
+                pending.append(child)
+            case BinaryOperator(left=left, right=right):
+                pending.extend((left, right))
+            case Sequence(exprs=exprs) | Program(exprs=exprs):
+                pending.extend(exprs)
+            case If(condition=condition, true=true, false=false):
+                pending.extend((condition, true, false))
+            case While(condition=condition, body=body):
+                pending.extend((condition, body))
+    return untyped
+
+
+class Transpiled(object):
+    def __init__(self, source: str, function, names: List[str], typed: Dict[str, Type]) -> None:
+        self.source = source
+        self.function = function
+        self.names = names
+        self.typed = typed
+
+    def __repr__(self) -> str:
+        return f"<Transpiled: {len(self.names)} variables, {len(self.typed)} typed>"
+
+
+def transpile(program: Expr, variable_types: Optional[Dict[str, Type]] = None) -> Transpiled:
+    """
+    Translate program into a compiled Python function. variable_types
+    gives the types of the variables the program will find already bound
+    in the State it is run with.
+    """
+    from stimpl.typecheck import typecheck
+
+    # Type checking annotates the nodes it checks, and the annotations
+    # only hold for these variable types: translate a copy so that they
+    # never reach the caller's program.
+    program = copy_tree(program)
+    names = _variable_names(program)
+    try:
+        inferred = typecheck(program, variable_types)
+    except InterpTypeError:
+        # Leave the type errors to be raised when the program runs.
+        typed = {}
+    else:
+        untyped = _untyped_assignments(program)
+        typed = {name: variable_type for name, variable_type in inferred.items()
+                 if name in names and name not in untyped}
+
+    translator = _Translator(names, typed)
+    body_lines, (result_code, result_type) = translator.block(program, False)
+
+    lines = ["def __stimpl_program(__initial):"]
+    for name, slot in translator.slots.items():
+        if name in typed:
+            lines.append(f"    if {name!r} in __initial:")
+            lines.append(f"        {slot} = __initial[{name!r}][0]")
+        else:
+            lines.append(f"    {slot} = __initial.get({name!r}, _UNBOUND)")
+    lines.append("    try:")
+    lines.extend("        " + line for line in body_lines)
+    lines.append(f"        __result = {translator.tagged(result_code, result_type)}")
+    lines.append("    except UnboundLocalError as error:")
+    lines.append("        raise _unbound_error(error) from None")
+    lines.append("    __bindings = {}")
+    for name, slot in translator.slots.items():
+        if name in typed:
+            lines.append("    try:")
+            lines.append(f"        __bindings[{name!r}] = ({slot}, {_TYPE_NAMES[typed[name]]})")
+            lines.append("    except UnboundLocalError:")
+            lines.append("        pass")
+        else:
+            lines.append(f"    if {slot} is not _UNBOUND:")
+            lines.append(f"        __bindings[{name!r}] = {slot}")
+    lines.append("    return __result, __bindings")
+    source = "\n".join(lines) + "\n"
+
+    def unbound_error(error: UnboundLocalError) -> InterpSyntaxError:
+        match = re.search(r"'v(\d+)'", str(error))
+        name = names[int(match.group(1))] if match else "a variable"
+        return InterpSyntaxError(f"Cannot read from {name} before assignment.")
+
+    namespace = {
+        "UNIT": UNIT,
+        "INTEGER": INTEGER,
+        "FLOATING_POINT": FLOATING_POINT,
+        "STRING": STRING,
+        "BOOLEAN": BOOLEAN,
+        "_UNBOUND": _UNBOUND,
+        "_binary": binary_operation,
+        "_divide_integer": _divide_integer,
+        "_divide_floating_point": _divide_floating_point,
+        "_print": _print,
+        "_print_tagged": _print_tagged,
+        "_not": _not,
+        "_condition": _condition,
+        "_read": _read,
+        "_assign": _assign,
+        "_expect": _expect,
+        "_unbound_error": unbound_error,
+    }
+    namespace.update(translator.constants)
+    exec(compile(source, "<stimpl>", "exec"), namespace)
+    return Transpiled(source, namespace["__stimpl_program"], names, typed)
+
+
+def run_transpiled(transpiled: Transpiled, state: Optional[State] = None) -> Tuple[Optional[Any], Type, State]:
+    if state is None:
+        state = EmptyState()
+
+    initial = {}
+    for name in transpiled.names:
+        result = state.get_value(name)
+        if result is None:
+            continue
+        if name in transpiled.typed and result[1] is not transpiled.typed[name]:
+            raise ValueError(
+                f"{name} is bound to a {result[1]} but the program was transpiled for a {transpiled.typed[name]}.")
+        initial[name] = result
+
+    (value, value_type), bindings = transpiled.function(initial)
+    for name, (variable_value, variable_type) in bindings.items():
+        if initial.get(name) is not bindings[name]:
+            state = state.set_value(name, variable_value, variable_type)
+    return (value, value_type, state)
@@ -0,0 +1,204 @@
+from typing import Dict, Optional
+
+from stimpl.expression import *
+from stimpl.types import *
+from stimpl.errors import *
+
+"""
+Static type inference.
+
+STIMPL binds a variable's type at its first assignment and never changes
+it, so the type of every variable -- and from there of almost every node --
+can usually be worked out before the program runs.
+
+typecheck is conservative: a type error anywhere in the program is
+reported, even in code that would never execute. Nodes whose type it can
+prove get their static_type set, and evaluators use that to skip the
+per-operation type checks on them. The annotations assume the program
+starts from the variable types typecheck was given (none, by default).
+"""
+
+_ARITHMETIC = {
+    Add: ("add", (Integer, String, FloatingPoint)),
+    Subtract: ("subtract", (Integer, FloatingPoint)),
+    Multiply: ("multiply", (Integer, FloatingPoint)),
+    Divide: ("divide", (Integer, FloatingPoint)),
+}
+
+_LOGICAL = {
+    And: "and",
+    Or: "or",
+}
+
+# The type of a variable assigned a value whose type cannot be proven.
+# No later assignment makes its type known again.
+_UNKNOWN = object()
+
+_COMPARISONS = {
+    Lt: "<",
+    Lte: "<=",
+    Gt: ">",
+    Gte: ">=",
+    Eq: "==",
+    Ne: "!=",
+}
+
+
+class _TypeChecker(object):
+    def __init__(self, variable_types: Dict[str, Type]) -> None:
+        self.variable_types = variable_types
+        self.annotate = False
+
+    def infer(self, expression: Expr) -> Optional[Type]:
+        result_type = self._infer(expression)
+        if self.annotate:
+            proven = result_type is not None and self.proven(expression)
+            expression.static_type = result_type if proven else None
+        return result_type
+
+    def proven(self, expression: Expr) -> bool:
+        # Children are annotated before their parents, so an operator is
+        # proven when its operands are. Relations over Units are left
+        # unproven: their result does not come from comparing the values.
+        match expression:
+            case Not(expr=expr):
+                return expr.static_type is not None
+            case Assign(variable=variable):
+                # The runtime must check every assignment to a variable
+                # of unknown type.
+                return self.variable_types.get(variable.variable_name) is not _UNKNOWN
+            case BinaryOperator(left=left, right=right):
+                if left.static_type is None or right.static_type is None:
+                    return False
+                if type(expression) in _COMPARISONS:
+                    return left.static_type != Unit()
+                return True
+            case _:
+                return True
+
+    def _infer(self, expression: Expr) -> Optional[Type]:
+        match expression:
+            case Ren():
+                return Unit()
+
+            case IntLiteral():
+                return Integer()
+
+            case FloatingPointLiteral():
+                return FloatingPoint()
+
+            case StringLiteral():
+                return String()
+
+            case BooleanLiteral():
+                return Boolean()
+
+            case Print(to_print=to_print):
+                return self.infer(to_print)
+
+            case Sequence(exprs=exprs) | Program(exprs=exprs):
+                result_type = Unit()
+                for expr in exprs:
+                    result_type = self.infer(expr)
+                return result_type
+
+            case Variable(variable_name=variable_name):
+                variable_type = self.variable_types.get(variable_name)
+                return None if variable_type is _UNKNOWN else variable_type
+
+            case Assign(variable=variable, value=value):
+                value_type = self.infer(value)
+                if value_type is None:
+                    self.variable_types[variable.variable_name] = _UNKNOWN
+                    return None
+
+                variable_type = self.variable_types.get(variable.variable_name)
+                if variable_type is None:
+                    self.variable_types[variable.variable_name] = value_type
+                elif variable_type is not _UNKNOWN and variable_type != value_type:
+                    raise InterpTypeError(f"""Mismatched types for Assignment:
+            Cannot assign {value_type} to {variable_type}""")
+                return value_type
+
+            case Not(expr=expr):
+                value_type = self.infer(expr)
+                if value_type is not None and value_type != Boolean():
+                    raise InterpTypeError(
+                        "Cannot perform logical not on non-boolean operand.")
+                return Boolean()
+
+            case If(condition=condition, true=true, false=false):
+                self.check_condition(condition, "an If")
+                true_type = self.infer(true)
+                false_type = self.infer(false)
+                if true_type is not None and true_type == false_type:
+                    return true_type
+                return None
+
+            case While(condition=condition, body=body):
+                self.check_condition(condition, "a While")
+                self.infer(body)
+                return Boolean()
+
+            case BinaryOperator(left=left, right=right):
+                left_type = self.infer(left)
+                right_type = self.infer(right)
+                return self.binary(expression, left_type, right_type)
+
+            case _:
+                raise InterpSyntaxError("Unhandled!")
+
+    def check_condition(self, condition: Expr, kind: str) -> None:
+        condition_type = self.infer(condition)
+        if condition_type is not None and condition_type != Boolean():
+            raise InterpTypeError(
+                f"Cannot use {condition_type} as {kind} condition.")
+
+    def binary(self, expression: BinaryOperator, left_type: Optional[Type], right_type: Optional[Type]) -> Optional[Type]:
+        name = type(expression).__name__
+        known_type = left_type if left_type is not None else right_type
+
+        if left_type is not None and right_type is not None and left_type != right_type:
+            raise InterpTypeError(f"""Mismatched types for {name}:
+            Cannot combine {left_type} and {right_type}""")
+
+        if type(expression) in _ARITHMETIC:
+            verb, allowed = _ARITHMETIC[type(expression)]
+            if known_type is not None and not isinstance(known_type, allowed):
+                raise InterpTypeError(f"Cannot {verb} {known_type}s")
+            result_type = known_type
+        elif type(expression) in _LOGICAL:
+            if known_type is not None and known_type != Boolean():
+                raise InterpTypeError(
+                    f"Cannot perform logical {_LOGICAL[type(expression)]} on non-boolean operands.")
+            result_type = Boolean()
+        else:
+            # Relational operators accept every type and always produce a
+            # Boolean when they do not raise.
+            result_type = Boolean()
+
+        return result_type
+
+
+def typecheck(program: Expr, variable_types: Optional[Dict[str, Type]] = None) -> Dict[str, Type]:
+    """
+    Infer the type of every variable in program, raising InterpTypeError
+    for any type error, and annotate every node whose type is proven.
+    Returns the inferred variable types, leaving out variables whose type
+    cannot be proven.
+    """
+    checker = _TypeChecker(dict(variable_types or {}))
+
+    # Assignments can depend on variables that are only assigned later in
+    # the program (e.g., inside a loop), so iterate until nothing new is
+    # learned before annotating.
+    while True:
+        known = dict(checker.variable_types)
+        checker.infer(program)
+        if checker.variable_types == known:
+            break
+
+    checker.annotate = True
+    checker.infer(program)
+    return {variable_name: variable_type for variable_name, variable_type in checker.variable_types.items()
+            if variable_type is not _UNKNOWN}
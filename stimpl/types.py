@@ -1,12 +1,25 @@
 """
 Types
+
+Each type is an interned singleton: calling Integer() always returns the
+same object, so types compare (and hash) by identity.
 """
 
 
 class Type(object):
+    def __new__(cls):
+        instance = cls.__dict__.get("_instance")
+        if instance is None:
+            instance = super().__new__(cls)
+            cls._instance = instance
+        return instance
+
     def __init__(self):
         pass
 
+    def __reduce__(self):
+        return (type(self), ())
+
 
 class Unit(Type):
     def __init__(self):
@@ -15,13 +28,6 @@ class Unit(Type):
     def __repr__(self):
         return "Unit"
 
-    def __eq__(self, other):
-        match other:
-            case Unit():
-                return True
-            case _:
-                return False
-
 
 class Integer(Type):
     def __init__(self):
@@ -30,13 +36,6 @@ class Integer(Type):
     def __repr__(self):
         return "Integer"
 
-    def __eq__(self, other):
-        match other:
-            case Integer():
-                return True
-            case _:
-                return False
-
 
 class FloatingPoint(Type):
     def __init__(self):
@@ -45,13 +44,6 @@ class FloatingPoint(Type):
     def __repr__(self):
         return "FloatingPoint"
 
-    def __eq__(self, other):
-        match other:
-            case FloatingPoint():
-                return True
-            case _:
-                return False
-
 
 class String(Type):
     def __init__(self):
@@ -60,13 +52,6 @@ class String(Type):
     def __repr__(self):
         return "String"
 
-    def __eq__(self, other):
-        match other:
-            case String():
-                return True
-            case _:
-                return False
-
 
 class Boolean(Type):
     def __init__(self):
@@ -75,9 +60,27 @@ class Boolean(Type):
     def __repr__(self):
         return "Boolean"
 
-    def __eq__(self, other):
-        match other:
-            case Boolean():
-                return True
-            case _:
-                return False
+
+UNIT = Unit()
+INTEGER = Integer()
+FLOATING_POINT = FloatingPoint()
+STRING = String()
+BOOLEAN = Boolean()
+
+"""
+Tagged values
+
+Engines that keep the State out of their return values (the closure engine
+and the VM) represent a runtime value as a (value, type) pair -- the same
+pair a State stores for each variable -- so values read from variables and
+literals are passed along without being rebuilt. Results that can only
+take a few values are interned here.
+"""
+
+UNIT_VALUE = (None, UNIT)
+TRUE_VALUE = (True, BOOLEAN)
+FALSE_VALUE = (False, BOOLEAN)
+
+
+def tagged_boolean(value: bool):
+    return TRUE_VALUE if value else FALSE_VALUE
@@ -0,0 +1,206 @@
+import operator
+from typing import Any, Optional, Tuple
+
+from stimpl.bytecode import *
+from stimpl.expression import Expr
+from stimpl.types import *
+from stimpl.errors import *
+from stimpl.output import print_value
+from stimpl.runtime import State, EmptyState, evaluate
+
+"""
+Bytecode virtual machine.
+
+run_vm executes a CodeObject produced by compile_bytecode with a single
+dispatch loop. Values live on an operand stack as (value, type) pairs and
+variables live in a list of slots indexed by the operand of LOAD/STORE.
+"""
+
+
+class VMMismatchError(Exception):
+    def __init__(self, expected, actual):
+        super().__init__(f"VM produced {actual} but evaluate produced {expected}")
+
+
+_ADDABLE = frozenset((INTEGER, STRING, FLOATING_POINT))
+_NUMERIC = frozenset((INTEGER, FLOATING_POINT))
+_COMPARABLE = frozenset((INTEGER, BOOLEAN, STRING, FLOATING_POINT))
+
+_ARITHMETIC_NAMES = {
+    ADD: ("Add", "add"),
+    SUBTRACT: ("Subtract", "subtract"),
+    MULTIPLY: ("Multiply", "multiply"),
+    DIVIDE: ("Divide", "divide"),
+}
+
+_COMPARISONS = {
+    LT: ("Lt", "<", operator.lt, False),
+    LTE: ("Lte", "<=", operator.le, True),
+    GT: ("Gt", ">", operator.gt, False),
+    GTE: ("Gte", ">=", operator.ge, True),
+    EQ: ("Eq", "==", operator.eq, True),
+    NE: ("Ne", "!=", operator.ne, False),
+}
+
+
+def _mismatch(opcode: int, left_type: Type, right_type: Type) -> InterpTypeError:
+    if opcode == ADD:
+        return InterpTypeError(f"Mismatched types for Add: Cannot add {left_type} to {right_type}")
+    if opcode == SUBTRACT:
+        return InterpTypeError(f"Mismatched types for Subtract: Cannot subtract {right_type} from {left_type}")
+    if opcode == MULTIPLY:
+        return InterpTypeError(f"Mismatched types for Multiply: Cannot multiply {left_type} and {right_type}")
+    if opcode == DIVIDE:
+        return InterpTypeError(f"Mismatched types for Divide: Cannot divide {left_type} by {right_type}")
+    if opcode == AND:
+        return InterpTypeError(f"Mismatched types for And: Cannot evaluate {left_type} and {right_type}")
+    if opcode == OR:
+        return InterpTypeError(f"Mismatched types for Or: Cannot evaluate {left_type} or {right_type}")
+    name = _COMPARISONS[opcode][0]
+    return InterpTypeError(f"Mismatched types for {name}: Cannot compare {left_type} and {right_type}")
+
+
+def binary_operation(opcode: int, left: Tuple[Any, Type], right: Tuple[Any, Type]) -> Tuple[Any, Type]:
+    left_value, left_type = left
+    right_value, right_type = right
+
+    if left_type != right_type:
+        raise _mismatch(opcode, left_type, right_type)
+
+    if opcode in _ARITHMETIC_NAMES:
+        if opcode == ADD and left_type in _ADDABLE:
+            return (left_value + right_value, left_type)
+        if left_type in _NUMERIC:
+            if opcode == SUBTRACT:
+                return (left_value - right_value, left_type)
+            if opcode == MULTIPLY:
+                return (left_value * right_value, left_type)
+            if right_value == 0:
+                raise InterpMathError("Cannot divide by zero.")
+            if left_type is INTEGER:
+                return (left_value // right_value, left_type)
+            return (left_value / right_value, left_type)
+        raise InterpTypeError(f"Cannot {_ARITHMETIC_NAMES[opcode][1]} {left_type}s")
+
+    if opcode == AND or opcode == OR:
+        if left_type is not BOOLEAN:
+            operation = "and" if opcode == AND else "or"
+            raise InterpTypeError(
+                f"Cannot perform logical {operation} on non-boolean operands.")
+        if opcode == AND:
+            return tagged_boolean(left_value and right_value)
+        return tagged_boolean(left_value or right_value)
+
+    _, symbol, compare, unit_result = _COMPARISONS[opcode]
+    if left_type is UNIT:
+        return tagged_boolean(unit_result)
+    if left_type not in _COMPARABLE:
+        raise InterpTypeError(f"Cannot perform {symbol} on {left_type} type.")
+    return TRUE_VALUE if compare(left_value, right_value) else FALSE_VALUE
+
+
+def run_vm(code_object: CodeObject, state: Optional[State] = None) -> Tuple[Optional[Any], Type, State]:
+    if state is None:
+        state = EmptyState()
+
+    code = code_object.code
+    constants = code_object.constants
+    names = code_object.names
+    initial_slots = [state.get_value(name) for name in names]
+    slots = list(initial_slots)
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    pc = 0
+
+    while True:
+        opcode = code[pc]
+        operand = code[pc + 1]
+        pc += 2
+
+        if opcode == LOAD:
+            value = slots[operand]
+            if value == None:
+                raise InterpSyntaxError(
+                    f"Cannot read from {names[operand]} before assignment.")
+            push(value)
+        elif opcode == PUSH_CONST:
+            push(constants[operand])
+        elif opcode == STORE:
+            value = stack[-1]
+            current = slots[operand]
+            if current != None and value[1] != current[1]:
+                raise InterpTypeError(f"""Mismatched types for Assignment:
+            Cannot assign {value[1]} to {current[1]}""")
+            slots[operand] = value
+        elif opcode == POP:
+            pop()
+        elif opcode == JUMP:
+            pc = operand
+        elif opcode == BRANCH_WHILE or opcode == BRANCH_IF:
+            condition_value, condition_type = pop()
+            if condition_type is not BOOLEAN:
+                kind = "a While" if opcode == BRANCH_WHILE else "an If"
+                raise InterpTypeError(
+                    f"Cannot use {condition_type} as {kind} condition.")
+            if not condition_value:
+                pc = operand
+        elif opcode >= ADD and opcode <= NE:
+            right = pop()
+            stack[-1] = binary_operation(opcode, stack[-1], right)
+        elif opcode == NOT:
+            value, value_type = stack[-1]
+            if value_type is not BOOLEAN:
+                raise InterpTypeError(
+                    "Cannot perform logical not on non-boolean operand.")
+            stack[-1] = FALSE_VALUE if value else TRUE_VALUE
+        elif opcode == PRINT:
+            print_value(*stack[-1])
+        elif opcode == HALT:
+            break
+        else:
+            raise InterpSyntaxError(f"Unknown opcode {opcode}.")
+
+    value, value_type = pop()
+    for name, initial, final in zip(names, initial_slots, slots):
+        if final is not initial:
+            state = state.set_value(name, final[0], final[1])
+    return (value, value_type, state)
+
+
+def run_vm_checked(program: Expr, state: Optional[State] = None) -> Tuple[Optional[Any], Type, State]:
+    """
+    Run program with both evaluate and the VM and raise VMMismatchError if
+    they disagree on the result, the final value of any variable or the
+    kind of error raised. Side effects (Print) happen twice.
+    """
+    if state is None:
+        state = EmptyState()
+    code_object = compile_bytecode(program)
+
+    # Both runs must start from the same bindings, so a MutableState has
+    # to be copied before the first run updates it in place.
+    try:
+        expected = evaluate(program, state.copy())
+    except InterpError as e:
+        expected = e
+    try:
+        actual = run_vm(code_object, state.copy())
+    except InterpError as e:
+        actual = e
+
+    if isinstance(expected, InterpError) or isinstance(actual, InterpError):
+        if type(expected) != type(actual):
+            raise VMMismatchError(repr(expected), repr(actual))
+        raise expected
+
+    expected_value, expected_type, expected_state = expected
+    actual_value, actual_type, actual_state = actual
+    if (expected_value, expected_type) != (actual_value, actual_type):
+        raise VMMismatchError((expected_value, expected_type),
+                              (actual_value, actual_type))
+    for name in code_object.names:
+        if expected_state.get_value(name) != actual_state.get_value(name):
+            raise VMMismatchError(f"{name} = {expected_state.get_value(name)}",
+                                  f"{name} = {actual_state.get_value(name)}")
+    return expected